@@ -1,6 +1,5 @@
 #!/usr/bin/env python3
 import argparse
-import csv
 import json
 import subprocess
 import sys
@@ -8,6 +7,29 @@ import time
 from pathlib import Path
 import os
 
+# Bootstrap sys.path for scripts.* imports when run as a file.
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from scripts.ass_slice import ass_event_boundaries, seconds_to_ass_time, slice_events
+from scripts.audio_cache import DEFAULT_BITRATE, DEFAULT_CODEC, audio_input_and_args
+from scripts.catalog import update_slug
+from scripts.common import Paths, atomic_output, atomic_outputs, atomic_write_text
+from scripts.journal import slug_lock
+from scripts.encoders import keyframe_times, video_args
+from scripts.offset_tuner import choose_preview_window
+from scripts.render_modes import (
+    GIF_SECS,
+    render_incremental,
+    render_multi,
+    render_segmented,
+    render_side_outputs,
+    render_vfr,
+    side_output_graph,
+)
+from scripts.timeline import load_timeline, warp_path_for
+
 RESET = "\033[0m"
 BOLD = "\033[1m"
 CYAN = "\033[36m"
@@ -23,9 +45,28 @@ MIXES_DIR = BASE_DIR / "mixes"
 TIMINGS_DIR = BASE_DIR / "timings"
 OUTPUT_DIR = BASE_DIR / "output"
 META_DIR = BASE_DIR / "meta"
+CACHE_DIR = BASE_DIR / ".cache" / "mixterioso"
 
 VIDEO_WIDTH = 1280
 VIDEO_HEIGHT = 720
+
+# Encoded frame (the ASS PlayRes above is scaled by libass).
+OUT_WIDTH = 854
+OUT_HEIGHT = 480
+OUT_FPS = 5
+
+# Multi-target outputs (--profiles): name -> (encode width, encode height, ASS canvas).
+# Profiles sharing a canvas share one subtitle render (split + scale in one graph).
+OUTPUT_PROFILES = {
+    "720p": (1280, 720, (VIDEO_WIDTH, VIDEO_HEIGHT)),
+    "480p": (854, 480, (VIDEO_WIDTH, VIDEO_HEIGHT)),
+    "vertical": (720, 1280, (720, 1280)),
+}
+
+# Draft render (--draft): a short low-res window for visual offset checks.
+DRAFT_WIDTH = 640
+DRAFT_HEIGHT = 360
+DRAFT_FPS = 5
 # =============================================================================
 # LAYOUT CONSTANTS
 # =============================================================================
@@ -154,19 +195,6 @@ def slugify(text: str) -> str:
     return base or "song"
 
 
-def seconds_to_ass_time(sec: float) -> str:
-    # ASS time format: H:MM:SS.cs (centiseconds)
-    if sec < 0:
-        sec = 0.0
-    total_cs = int(round(sec * 100))
-    if total_cs < 0:
-        total_cs = 0
-    total_seconds, cs = divmod(total_cs, 100)
-    h, rem = divmod(total_seconds, 3600)
-    m, s = divmod(rem, 60)
-    return f"{h}:{m:02d}:{s:02d}.{cs:02d}"
-
-
 def rgb_to_bgr(rrggbb: str) -> str:
     """
     Convert an RRGGBB hex string into BGR order as required by ASS (&HAABBGGRR).
@@ -228,10 +256,12 @@ def read_meta(slug: str) -> tuple[str, str]:
             log("META", f"Failed to read meta {meta_path}: {e}", YELLOW)
     return artist, title
 
-def read_timings(slug: str):
+def read_timings(slug: str, *, warp: bool = True):
     """
     Return list of (time_secs, text, line_index).
-    Preferred CSV format:
+    timings/<slug>.warp.json (drift correction, see time_warp.py) is applied
+    when present unless warp=False.
+    Parsing is shared with the rest of the pipeline (scripts/timeline.py):
         line_index,time_secs,text
     Fallback 2-column format:
         time_secs,text   (line_index is treated as 0).
@@ -241,61 +271,10 @@ def read_timings(slug: str):
         print(f"Timing CSV not found for slug={slug}: {timing_path}")
         sys.exit(1)
 
-    rows = []
-    with timing_path.open(newline="", encoding="utf-8") as f:
-        reader = csv.reader(f)
-        header = next(reader, None)
-
-        if header and "time_secs" in header:
-            try:
-                idx_time = header.index("time_secs")
-            except ValueError:
-                idx_time = 1
-            try:
-                idx_li = header.index("line_index")
-            except ValueError:
-                idx_li = None
-            idx_text = header.index("text") if "text" in header else None
-
-            for row in reader:
-                if not row or len(row) <= idx_time:
-                    continue
-                t_str = row[idx_time].strip()
-                if not t_str:
-                    continue
-                try:
-                    t = float(t_str)
-                except ValueError:
-                    continue
-
-                if idx_li is not None and len(row) > idx_li:
-                    try:
-                        line_index = int(row[idx_li])
-                    except ValueError:
-                        line_index = 0
-                else:
-                    line_index = 0
-
-                text = ""
-                if idx_text is not None and len(row) > idx_text:
-                    text = row[idx_text]
-
-                rows.append((t, text, line_index))
-        else:
-            for row in reader:
-                if len(row) < 2:
-                    continue
-                t_str = row[0].strip()
-                if not t_str:
-                    continue
-                try:
-                    t = float(t_str)
-                except ValueError:
-                    continue
-                text = row[1]
-                rows.append((t, text, 0))
-
-    rows.sort(key=lambda x: x[0])
+    tl = load_timeline(timing_path, warp=warp)
+    if tl.time_map is not None:
+        log("TIMINGS", f"Applying drift correction ({len(tl.time_map.src)} knots) from {warp_path_for(timing_path)}", CYAN)
+    rows = list(tl.rows())
     log("TIMINGS", f"Loaded {len(rows)} timing rows from {timing_path}", CYAN)
     return rows
 
@@ -388,10 +367,12 @@ def build_ass(
     font_name: str,
     font_size_script: int,
     title_card_lines: list[str] | None = None,
+    ass_path: Path | None = None,
+    play_res: tuple[int, int] | None = None,
 ) -> Path:
 
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    ass_path = OUTPUT_DIR / f"{slug}.ass"
+    ass_path = ass_path or OUTPUT_DIR / f"{slug}.ass"
 
     if audio_duration <= 0.0:
         if timings:
@@ -399,8 +380,18 @@ def build_ass(
         else:
             audio_duration = 5.0
 
-    playresx = VIDEO_WIDTH
-    playresy = VIDEO_HEIGHT
+    playresx, playresy = play_res or (VIDEO_WIDTH, VIDEO_HEIGHT)
+
+    # The layout constants are tuned for VIDEO_WIDTH x VIDEO_HEIGHT; other
+    # targets (e.g. the vertical profile) scale them to their own canvas.
+    sx = playresx / VIDEO_WIDTH
+    sy = playresy / VIDEO_HEIGHT
+    font_size_script = max(1, int(round(font_size_script * min(sx, sy))))
+    next_top_margin = int(round(NEXT_LYRIC_TOP_MARGIN_PX * sy))
+    next_bottom_margin = int(round(NEXT_LYRIC_BOTTOM_MARGIN_PX * sy))
+    divider_offset_up = int(round(DIVIDER_LINE_OFFSET_UP_PX * sy))
+    label_top_margin = int(round(NEXT_LABEL_TOP_MARGIN_PX * sy))
+    label_left_margin = NEXT_LABEL_LEFT_MARGIN_PX * sx
 
     # Geometry
     top_band_height = int(playresy * TOP_BAND_FRACTION)
@@ -414,10 +405,10 @@ def build_ass(
     # Divider + next baseline
     inner_bottom = max(
         1,
-        bottom_band_height - NEXT_LYRIC_TOP_MARGIN_PX - NEXT_LYRIC_BOTTOM_MARGIN_PX,
+        bottom_band_height - next_top_margin - next_bottom_margin,
     )
-    y_next = y_divider_nominal + NEXT_LYRIC_TOP_MARGIN_PX + inner_bottom // 2
-    line_y = max(0, y_divider_nominal - DIVIDER_LINE_OFFSET_UP_PX)
+    y_next = y_divider_nominal + next_top_margin + inner_bottom // 2
+    line_y = max(0, y_divider_nominal - divider_offset_up)
 
     # Fonts
     preview_font = max(1, int(font_size_script * NEXT_LINE_FONT_SCALE))
@@ -485,7 +476,7 @@ def build_ass(
                 f"{{\\an5\\pos({playresx//2},{playresy//2})}}{intro_text}",
             )
         )
-        ass_path.write_text("\n".join(header_lines + events), encoding="utf-8")
+        atomic_write_text(ass_path, "\n".join(header_lines + events))
         return ass_path
 
     # CASE B — NORMAL SONG WITH INTRO (first lyric ≥ 0)
@@ -506,8 +497,8 @@ def build_ass(
         fade_tag_main = f"\\fad({FADE_IN_MS},{FADE_OUT_MS})"
 
     # Render lyrics + next preview
-    left = float(DIVIDER_LEFT_MARGIN_PX)
-    right = float(playresx - DIVIDER_RIGHT_MARGIN_PX)
+    left = float(DIVIDER_LEFT_MARGIN_PX * sx)
+    right = float(playresx - DIVIDER_RIGHT_MARGIN_PX * sx)
     divider_height = max(0.5, float(DIVIDER_HEIGHT_PX))
     next_color_bgr = rgb_to_bgr(GLOBAL_NEXT_COLOR_RGB)
     divider_color_bgr = rgb_to_bgr(DIVIDER_COLOR_RGB)
@@ -563,7 +554,7 @@ def build_ass(
                 seconds_to_ass_time(start),
                 seconds_to_ass_time(end),
                 (
-                    f"{{\\an7\\pos({NEXT_LABEL_LEFT_MARGIN_PX},{line_y + NEXT_LABEL_TOP_MARGIN_PX})"
+                    f"{{\\an7\\pos({label_left_margin},{line_y + label_top_margin})"
                     f"\\fs{next_label_font}"
                     f"\\1c&H{next_label_color_bgr}&"
                     f"\\1a&H{NEXT_LABEL_ALPHA_HEX}&}}Next:"
@@ -587,9 +578,66 @@ def build_ass(
             )
         )
 
-    ass_path.write_text("\n".join(header_lines + events), encoding="utf-8")
+    atomic_write_text(ass_path, "\n".join(header_lines + events))
     return ass_path
 
+def clip_ass_to_window(ass_path: Path, start: float, dur: float) -> int:
+    """
+    Rewrite ass_path keeping only Dialogue events visible in [start, start + dur),
+    clipped to the window and shifted so the window starts at 0.
+    Returns the number of events kept.
+    """
+    text, kept = slice_events(ass_path.read_text(encoding="utf-8"), start, start + dur)
+    atomic_write_text(ass_path, text)
+    return kept
+
+
+def render_draft(slug: str, audio_path: Path, ass_path: Path, start: float, dur: float) -> Path:
+    """Low-res, ultrafast encode of [start, start + dur) with the clipped ASS."""
+    out_mp4 = OUTPUT_DIR / f"{slug}.draft.mp4"
+    t0 = time.perf_counter()
+    with atomic_output(out_mp4) as tmp:
+        cmd = [
+            "ffmpeg",
+            "-y",
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-f",
+            "lavfi",
+            "-i",
+            f"color=c=black:s={DRAFT_WIDTH}x{DRAFT_HEIGHT}:r={DRAFT_FPS}:d={dur:.3f}",
+            "-ss",
+            f"{start:.3f}",
+            "-t",
+            f"{dur:.3f}",
+            "-i",
+            str(audio_path),
+            "-vf",
+            f"subtitles={ass_path}",
+            *video_args(fps=DRAFT_FPS, preset="ultrafast", crf=32),
+            "-c:a",
+            "aac",
+            "-b:a",
+            "96k",
+            "-shortest",
+            str(tmp),
+        ]
+        log("FFMPEG", " ".join(cmd), BLUE)
+        subprocess.run(cmd, check=True)
+    log("DRAFT", f"Wrote draft {out_mp4} ({start:.2f}s..{start + dur:.2f}s) in {time.perf_counter() - t0:6.2f} s", GREEN)
+    return out_mp4
+
+
+def touch_side_outputs(side: dict) -> None:
+    """Stamp thumbnails/previews after the MP4 so 5_upload sees them as current."""
+    for key in ("thumb_path", "poster_path", "gif_path"):
+        p = side.get(key)
+        if p is not None and p.exists():
+            os.utime(p)
+            log("SIDE", f"Wrote {p}", GREEN)
+
+
 def choose_audio(slug: str) -> Path:
     """
     Always use mixes/<slug>.wav if it exists.
@@ -636,12 +684,77 @@ def parse_args(argv=None):
         default="0.0",
         help="Offset in seconds",
     )
+    p.add_argument(
+        "--no-warp",
+        action="store_true",
+        help="Ignore timings/<slug>.warp.json (drift correction).",
+    )
+    p.add_argument(
+        "--vfr",
+        action="store_true",
+        help="Encode one frame per on-screen lyric state (variable frame rate, ms-accurate timing).",
+    )
+    p.add_argument(
+        "--segments",
+        type=int,
+        default=1,
+        help="Encode N lyric-aligned segments in parallel and join by stream copy (0 = one per core).",
+    )
+    p.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Reuse cached ~20s segments whose lyrics did not change; re-encode the rest and join by stream copy.",
+    )
+    p.add_argument(
+        "--profiles",
+        type=str,
+        default=None,
+        help=f"Comma-separated output profiles rendered in one pass to output/<slug>.<profile>.mp4 ({', '.join(OUTPUT_PROFILES)}).",
+    )
+    p.add_argument(
+        "--preview-gif",
+        action="store_true",
+        help=f"Also write output/<slug>.preview.gif ({GIF_SECS:.0f}s from the first lyric).",
+    )
+    p.add_argument(
+        "--audio-codec",
+        choices=["aac", "opus"],
+        default=DEFAULT_CODEC,
+        help="Audio codec of the cached, stream-copied track (default aac).",
+    )
+    p.add_argument(
+        "--audio-bitrate",
+        default=DEFAULT_BITRATE,
+        help="Audio bitrate of the cached track (default 192k).",
+    )
+    p.add_argument(
+        "--draft",
+        action="store_true",
+        help="Render only a short low-res window around the first lyrics to output/<slug>.draft.mp4.",
+    )
+    p.add_argument(
+        "--draft-start",
+        type=float,
+        default=None,
+        help="Draft window start in seconds (default: first lyric - 6s, as in the offset tuner).",
+    )
+    p.add_argument(
+        "--draft-dur",
+        type=float,
+        default=None,
+        help="Draft window length in seconds (default: 25-40s, as in the offset tuner).",
+    )
     return p.parse_args(argv)
 
 
 def main(argv=None):
     args = parse_args(argv or sys.argv[1:])
+    # No-op under main.py, which already holds the slug lock.
+    with slug_lock(Paths.from_scripts_dir(Path(__file__).resolve().parent), slugify(args.slug), tag="MP4GEN"):
+        render(args)
 
+
+def render(args):
     global LYRICS_OFFSET_SECS
     if args.offset is not None:
         LYRICS_OFFSET_SECS = float(args.offset)
@@ -672,9 +785,31 @@ def main(argv=None):
         log("DUR", f"Audio duration unknown or zero for {audio_path}", YELLOW)
 
     artist, title = read_meta(slug)
-    timings = read_timings(slug)
+    timings = read_timings(slug, warp=not args.no_warp)
     log("META", f'Artist="{artist}", Title="{title}", entries={len(timings)}', CYAN)
 
+    if args.draft:
+        start, dur = choose_preview_window([(t, txt) for t, txt, _ in timings if (txt or "").strip()])
+        if args.draft_start is not None:
+            start = max(0.0, args.draft_start)
+        if args.draft_dur is not None:
+            dur = max(1.0, args.draft_dur)
+        ass_path = build_ass(
+            slug,
+            artist,
+            title,
+            timings,
+            audio_duration,
+            args.font_name,
+            ass_font_size,
+            compute_default_title_card_lines(slug, artist, title),
+            ass_path=OUTPUT_DIR / f"{slug}.draft.ass",
+        )
+        kept = clip_ass_to_window(ass_path, start, dur)
+        log("DRAFT", f"{kept} ASS events in window {start:.2f}s..{start + dur:.2f}s", CYAN)
+        render_draft(slug, audio_path, ass_path, start, dur)
+        return
+
     # Per-render title card override (does NOT touch meta.json).
     title_card_lines = prompt_title_card_lines(slug, artist, title)
 
@@ -689,42 +824,158 @@ def main(argv=None):
         title_card_lines,
     )
 
-    cmd = [
-        "ffmpeg",
-        "-y",
-        "-f",
-        "lavfi",
-        "-i",
-        f"color=c=black:s=854x480:r=5:d={max(audio_duration, 1.0)}",
-        "-i",
-        str(audio_path),
-        "-vf",
-        f"subtitles={ass_path}",
-        "-c:v",
-        "h264_videotoolbox",
-        "-b:v",
-        "1200k",
-        "-maxrate",
-        "1800k",
-        "-bufsize",
-        "2400k",
-        "-pix_fmt",
-        "yuv420p",
-        "-c:a",
-        "aac",
-        "-b:a",
-        "192k",
-        "-movflags",
-        "+faststart",
-        "-shortest",
-        str(out_mp4),
-    ]
+    # Side outputs tapped off the frame source (5_upload reuses output/<slug>.jpg).
+    lyric_starts = [t + LYRICS_OFFSET_SECS for t, txt, _ in timings if (txt or "").strip()]
+    first_lyric = max(0.0, min(lyric_starts)) if lyric_starts else None
+    side = dict(
+        thumb_path=OUTPUT_DIR / f"{slug}.jpg",
+        poster_path=OUTPUT_DIR / f"{slug}.poster.jpg" if first_lyric is not None else None,
+        poster_at=first_lyric,
+        gif_path=OUTPUT_DIR / f"{slug}.preview.gif" if args.preview_gif else None,
+        gif_start=max(0.0, (first_lyric or 0.0) - 1.0),
+    )
 
-    log("FFMPEG", " ".join(cmd), BLUE)
-    t0 = time.perf_counter()
-    subprocess.run(cmd, check=True)
-    t1 = time.perf_counter()
-    log("MP4", f"Wrote MP4 to {out_mp4} in {t1 - t0:6.2f} s", GREEN)
+    # Encoded once per mix (hash + codec + bitrate) and stream-copied into every render.
+    mux_audio, audio_args = audio_input_and_args(audio_path, CACHE_DIR, codec=args.audio_codec, bitrate=args.audio_bitrate)
+    boundaries = ass_event_boundaries(ass_path)
+
+    if args.profiles:
+        names = [n.strip() for n in args.profiles.split(",") if n.strip()]
+        unknown = [n for n in names if n not in OUTPUT_PROFILES]
+        if unknown:
+            print(f"Unknown profile(s): {', '.join(unknown)} (known: {', '.join(OUTPUT_PROFILES)})")
+            sys.exit(1)
+        layouts = {}
+        canvases = {}
+        for name in names:
+            w, h, canvas = OUTPUT_PROFILES[name]
+            if canvas == (VIDEO_WIDTH, VIDEO_HEIGHT):
+                layout_ass = ass_path
+            else:
+                layout_ass = build_ass(
+                    slug,
+                    artist,
+                    title,
+                    timings,
+                    audio_duration,
+                    args.font_name,
+                    ass_font_size,
+                    title_card_lines,
+                    ass_path=OUTPUT_DIR / f"{slug}.{canvas[0]}x{canvas[1]}.ass",
+                    play_res=canvas,
+                )
+            canvases[layout_ass] = canvas
+            layouts.setdefault(layout_ass, []).append((w, h, OUTPUT_DIR / f"{slug}.{name}.mp4"))
+        render_multi(
+            layouts=layouts,
+            canvases=canvases,
+            audio_path=mux_audio,
+            audio_args=audio_args,
+            boundaries=boundaries,
+            duration=audio_duration if audio_duration > 0 else max(boundaries + [1.0]),
+            fps=OUT_FPS,
+        )
+        render_side_outputs(
+            ass_path=ass_path,
+            width=OUT_WIDTH,
+            height=OUT_HEIGHT,
+            fps=OUT_FPS,
+            duration=audio_duration,
+            **side,
+        )
+        touch_side_outputs(side)
+        print()
+        print(f"{BOLD}{BLUE}MP4 generation complete:{RESET} " + ", ".join(str(p) for ps in layouts.values() for _, _, p in ps))
+        return
+
+    if args.vfr:
+        render_vfr(
+            ass_path=ass_path,
+            audio_path=mux_audio,
+            out_path=out_mp4,
+            boundaries=boundaries,
+            duration=audio_duration if audio_duration > 0 else max(boundaries + [1.0]),
+            width=OUT_WIDTH,
+            height=OUT_HEIGHT,
+            cache_dir=CACHE_DIR,
+            audio_args=audio_args,
+        )
+    elif args.incremental:
+        render_incremental(
+            ass_path=ass_path,
+            audio_path=mux_audio,
+            out_path=out_mp4,
+            boundaries=boundaries,
+            duration=audio_duration if audio_duration > 0 else max(boundaries + [1.0]),
+            width=OUT_WIDTH,
+            height=OUT_HEIGHT,
+            fps=OUT_FPS,
+            cache_dir=CACHE_DIR / "segments" / slug,
+            audio_args=audio_args,
+        )
+    elif args.segments != 1:
+        render_segmented(
+            ass_path=ass_path,
+            audio_path=mux_audio,
+            out_path=out_mp4,
+            boundaries=boundaries,
+            duration=audio_duration if audio_duration > 0 else max(boundaries + [1.0]),
+            width=OUT_WIDTH,
+            height=OUT_HEIGHT,
+            fps=OUT_FPS,
+            segments=args.segments,
+            work_dir=CACHE_DIR / "segments_tmp" / slug,
+            audio_args=audio_args,
+        )
+    else:
+        t0 = time.perf_counter()
+        side_keys = ("thumb_path", "poster_path", "gif_path")
+        with atomic_outputs([out_mp4] + [side[k] for k in side_keys]) as tmps:
+            tmp_side = {**side, **dict(zip(side_keys, tmps[1:]))}
+            side_chains, side_args = side_output_graph("frames", fps=OUT_FPS, main="main", **tmp_side)
+            cmd = [
+                "ffmpeg",
+                "-y",
+                "-f",
+                "lavfi",
+                "-i",
+                f"color=c=black:s={OUT_WIDTH}x{OUT_HEIGHT}:r={OUT_FPS}:d={max(audio_duration, 1.0)}",
+                "-i",
+                str(mux_audio),
+                "-filter_complex",
+                ";".join([f"[0:v]subtitles={ass_path}[frames]"] + side_chains),
+                "-map",
+                "[main]",
+                "-map",
+                "1:a:0",
+                *video_args(
+                    fps=OUT_FPS,
+                    keyframes=keyframe_times(boundaries, fps=OUT_FPS, duration=audio_duration or None),
+                ),
+                *audio_args,
+                "-movflags",
+                "+faststart",
+                "-shortest",
+                str(tmps[0]),
+                *side_args,
+            ]
+
+            log("FFMPEG", " ".join(cmd), BLUE)
+            subprocess.run(cmd, check=True)
+        t1 = time.perf_counter()
+        log("MP4", f"Wrote MP4 to {out_mp4} in {t1 - t0:6.2f} s", GREEN)
+
+    if args.vfr or args.incremental or args.segments != 1:
+        render_side_outputs(
+            ass_path=ass_path,
+            width=OUT_WIDTH,
+            height=OUT_HEIGHT,
+            fps=OUT_FPS,
+            duration=audio_duration,
+            **side,
+        )
+    touch_side_outputs(side)
+    update_slug(Paths.from_scripts_dir(Path(__file__).resolve().parent), slug, offset_secs=LYRICS_OFFSET_SECS)
 
     print()
     print(f"{BOLD}{BLUE}MP4 generation complete:{RESET} {out_mp4}")
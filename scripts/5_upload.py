@@ -5,6 +5,11 @@ Minimal YouTube uploader for Mixterioso.
 Usage:
     python3 scripts/5_upload.py --slug mujer_hilandera
 
+Uploads are resumable across crashes: the session is kept in
+meta/<slug>.upload.json and a rerun continues where the last one stopped
+(see scripts/resumable_upload.py). MIXTERIOSO_YOUTUBE_ENDPOINT / --endpoint
+point the uploader at scripts/mock_youtube.py instead of Google.
+
 Requirements:
     - Environment variable YOUTUBE_CLIENT_SECRETS_JSON must point to:
         * client_secret.json  OR
@@ -14,7 +19,7 @@ Requirements:
 """
 
 import argparse
-import os
+import json
 import re
 import sys
 import subprocess
@@ -22,14 +27,6 @@ from pathlib import Path
 
 from dotenv import load_dotenv
 
-# Google API imports
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-from googleapiclient.http import MediaFileUpload
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-
 # ─────────────────────────────────────────────
 # Bootstrap sys.path for scripts.common import
 # ─────────────────────────────────────────────
@@ -39,8 +36,12 @@ if str(ROOT) not in sys.path:
 
 from scripts.common import (
     log, CYAN, GREEN, YELLOW, RED,
-    slugify,
+    Paths, file_sha1, slugify,
 )
+from scripts import resumable_upload
+from scripts.catalog import song_meta, update_slug
+from scripts.upload_registry import UploadRegistry, registry_path
+from scripts.youtube_client import get_client
 
 OUT_DIR  = ROOT / "output"
 META_DIR = ROOT / "meta"
@@ -79,81 +80,12 @@ def open_path(path: Path) -> None:
 # Load .env (for YOUTUBE_CLIENT_SECRETS_JSON, etc.)
 load_dotenv()
 
-# Scope required for uploading videos
-YOUTUBE_UPLOAD_SCOPE = ["https://www.googleapis.com/auth/youtube.upload"]
-
-
 # ─────────────────────────────────────────────
-# Secrets / OAuth helpers
+# Session
 # ─────────────────────────────────────────────
-def load_secrets_path() -> Path:
-    """
-    Resolve the location of client_secret.json based on YOUTUBE_CLIENT_SECRETS_JSON.
-
-    Accepts:
-      - exact file path to client_secret.json
-      - directory containing client_secret.json
-    """
-    raw = os.getenv("YOUTUBE_CLIENT_SECRETS_JSON")
-
-    if not raw:
-        log("SECRETS", "YOUTUBE_CLIENT_SECRETS_JSON is not set.", RED)
-        sys.exit(1)
-
-    p = Path(raw).expanduser()
-
-    if p.is_file():
-        return p
-
-    if p.is_dir():
-        guess = p / "client_secret.json"
-        if guess.exists():
-            return guess
-
-    log("SECRETS", f"Invalid secrets path: {p}", RED)
-    sys.exit(1)
-
-
-def get_credentials(secrets_path: Path):
-    """
-    Get or create OAuth credentials for the YouTube upload scope.
-
-    Token is stored as youtube_token.json next to client_secret.json.
-    """
-    token_path = secrets_path.parent / "youtube_token.json"
-    creds = None
-
-    # Try to load existing token
-    if token_path.exists():
-        try:
-            creds = Credentials.from_authorized_user_file(
-                str(token_path),
-                YOUTUBE_UPLOAD_SCOPE,
-            )
-        except Exception:
-            creds = None
-
-    # Refresh or run new OAuth flow if needed
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            try:
-                log("OAUTH", "Refreshing existing OAuth token...", CYAN)
-                creds.refresh(Request())
-            except Exception:
-                creds = None
-
-        if not creds or not creds.valid:
-            log("OAUTH", "Running OAuth login flow...", CYAN)
-            flow = InstalledAppFlow.from_client_secrets_file(
-                str(secrets_path),
-                scopes=YOUTUBE_UPLOAD_SCOPE,
-            )
-            # This opens a browser and listens on localhost
-            creds = flow.run_local_server(port=0)
-            token_path.write_text(creds.to_json(), encoding="utf-8")
-            log("OAUTH", f"Saved OAuth token to {token_path}", GREEN)
-
-    return creds
+def open_session(endpoint: str):
+    """This thread's HTTP session from the process-wide client (OAuth for Google, plain for a mock)."""
+    return get_client(endpoint).session()
 
 
 # ─────────────────────────────────────────────
@@ -183,19 +115,8 @@ def extract_thumbnail(video_path: Path, out_path: Path, time_sec: float) -> None
 # ─────────────────────────────────────────────
 # Upload logic
 # ─────────────────────────────────────────────
-def upload_video(
-    youtube,
-    video_path: Path,
-    title: str,
-    description: str,
-    tags: list[str],
-    category_id: str,
-    privacy: str,
-) -> str:
-    """
-    Perform the actual YouTube upload and return the new video ID.
-    """
-    body = {
+def video_body(title: str, description: str, tags: list[str], category_id: str, privacy: str) -> dict:
+    return {
         "snippet": {
             "title": title,
             "description": description,
@@ -208,39 +129,142 @@ def upload_video(
         },
     }
 
-    media = MediaFileUpload(str(video_path), mimetype="video/mp4", resumable=True)
+
+def upload_video(
+    session,
+    video_path: Path,
+    title: str,
+    description: str,
+    tags: list[str],
+    category_id: str,
+    privacy: str,
+    *,
+    state_file: Path,
+    endpoint: str,
+    chunk_size: int = resumable_upload.DEFAULT_CHUNK_BYTES,
+    progress=None,
+) -> str:
+    """
+    Perform the actual YouTube upload and return the new video ID.
+    Resumes the session saved in state_file when the file is unchanged.
+    progress(done_bytes, total_bytes) replaces the default percentage log.
+    """
+    body = video_body(title, description, tags, category_id, privacy)
 
     log("UPLOAD", f"Starting upload: {video_path}", CYAN)
-    request = youtube.videos().insert(
-        part="snippet,status",
-        body=body,
-        media_body=media,
-    )
+    last_pct = [-1]
+
+    def log_progress(done: int, total: int) -> None:
+        pct = int(done * 100 / max(1, total))
+        if pct != last_pct[0]:
+            last_pct[0] = pct
+            log("UPLOAD", f"Progress: {pct}%", CYAN)
+
+    try:
+        video_id = resumable_upload.upload_resumable(
+            session,
+            video_path,
+            body,
+            state_file=state_file,
+            endpoint=endpoint,
+            chunk_size=chunk_size,
+            progress=progress or log_progress,
+        )
+    except resumable_upload.UploadError as e:
+        log("ERROR", f"Upload failed: {e} (rerun to resume)", RED)
+        raise
 
-    response = None
-    while response is None:
-        try:
-            status, response = request.next_chunk()
-            if status:
-                pct = int(status.progress() * 100)
-                log("UPLOAD", f"Progress: {pct}%", CYAN)
-        except HttpError as e:
-            log("ERROR", f"Upload failed: {e}", RED)
-            raise
-
-    video_id = response.get("id")
     log("UPLOAD", f"Upload complete. video_id={video_id}", GREEN)
     return video_id
 
 
-def set_thumbnail(youtube, video_id: str, thumb_path: Path) -> None:
+def update_video_metadata(endpoint: str, video_id: str, body: dict) -> None:
+    """
+    Metadata-only update (title, tags, privacy) of an existing video.
+    API errors (including quotaExceeded) are raised as UploadError.
+    """
+    from googleapiclient.errors import HttpError
+
+    service = get_client(endpoint).service()
+    try:
+        service.videos().update(part="snippet,status", body={"id": video_id, **body}).execute()
+    except HttpError as e:
+        text = e.content.decode("utf-8", "replace") if isinstance(e.content, bytes) else str(e.content)
+        try:
+            reasons = [err.get("reason", "") for err in json.loads(text)["error"].get("errors", [])]
+        except Exception:
+            reasons = []
+        # batch_upload looks for "quotaExceeded" in the message; keep the reasons ahead of the body.
+        why = f"HTTP {e.resp.status}" + (f" ({', '.join(reasons)})" if reasons else "")
+        log("ERROR", f"Metadata update of {video_id} failed: {why}", RED)
+        raise resumable_upload.UploadError(f"Metadata update failed: {why} {text[:300]}") from e
+
+
+def publish(
+    session,
+    slug: str,
+    video_path: Path,
+    title: str,
+    description: str,
+    tags: list[str],
+    *,
+    privacy: str,
+    endpoint: str,
+    chunk_size: int = resumable_upload.DEFAULT_CHUNK_BYTES,
+    progress=None,
+) -> tuple[str, str]:
+    """
+    Upload video_path unless the same bytes are already live (meta/uploads.sqlite).
+    Returns (video_id, action) with action "upload", "update" (metadata only) or "skip".
+    """
+    registry = UploadRegistry(registry_path(META_DIR))
+    sha1 = file_sha1(video_path)
+    action, record = registry.plan(sha1, endpoint, title=title, privacy=privacy)
+
+    if action == "skip":
+        log("UPLOAD", f"Identical render already live as {record.video_id} ({record.title}); skipping upload", GREEN)
+        return record.video_id, action
+
+    body = video_body(title, description, tags, "10", privacy)  # Music
+    if action == "update":
+        log("UPLOAD", f"Identical render already live as {record.video_id}; updating title/privacy only", CYAN)
+        update_video_metadata(endpoint, record.video_id, body)
+        registry.record_update(record.video_id, endpoint, title=title, privacy=privacy)
+        return record.video_id, action
+
+    video_id = upload_video(
+        session,
+        video_path,
+        title,
+        description,
+        tags,
+        category_id="10",  # Music
+        privacy=privacy,
+        state_file=resumable_upload.state_path(META_DIR, slug),
+        endpoint=endpoint,
+        chunk_size=chunk_size,
+        progress=progress,
+    )
+    registry.record_upload(
+        slug=slug,
+        content_sha1=sha1,
+        size_bytes=video_path.stat().st_size,
+        endpoint=endpoint,
+        video_id=video_id,
+        title=title,
+        privacy=privacy,
+    )
+    if endpoint == resumable_upload.DEFAULT_ENDPOINT:
+        update_slug(Paths.from_scripts_dir(Path(__file__)), slug, video_id=video_id)
+    return video_id, action
+
+
+def set_thumbnail(session, video_id: str, thumb_path: Path, *, endpoint: str) -> None:
     """
     Upload a thumbnail for a video.
     """
     log("THUMB", f"Uploading thumbnail for {video_id}: {thumb_path}", CYAN)
-    media = MediaFileUpload(str(thumb_path), mimetype="image/jpeg")
-    request = youtube.thumbnails().set(videoId=video_id, media_body=media)
-    _ = request.execute()
+    resumable_upload.set_thumbnail(session, video_id, thumb_path, endpoint=endpoint)
     log("THUMB", "Thumbnail set.", GREEN)
 
 
@@ -291,7 +315,11 @@ def _infer_artist_title_from_lrc(slug: str) -> dict | None:
 
 
 def load_meta_for_slug(slug: str) -> dict | None:
-    """Load best-effort metadata for a slug."""
+    """Load best-effort metadata for a slug (meta/catalog.sqlite first, then the meta JSONs)."""
+    cataloged = song_meta(META_DIR, slug)
+    if cataloged and (cataloged.get("artist") or "").strip() and (cataloged.get("title") or "").strip():
+        return cataloged
+
     candidates = [
         META_DIR / f"{slug}.json",
         META_DIR / f"{slug}.step1.json",
@@ -510,6 +538,17 @@ def parse_args(argv=None):
         default="unlisted",
         help="Privacy status for the video (default: unlisted).",
     )
+    p.add_argument(
+        "--chunk-mb",
+        type=float,
+        default=resumable_upload.DEFAULT_CHUNK_BYTES / (1024 * 1024),
+        help="Upload chunk size in MiB (rounded up to 256 KiB; default 8).",
+    )
+    p.add_argument(
+        "--endpoint",
+        default=None,
+        help="API root (default: MIXTERIOSO_YOUTUBE_ENDPOINT or https://www.googleapis.com).",
+    )
 
     return p.parse_args(argv)
 
@@ -566,26 +605,33 @@ def main(argv=None):
         log("ABORT", "User cancelled upload.", YELLOW)
         sys.exit(0)
 
-    secrets_path = load_secrets_path()
-    creds = get_credentials(secrets_path)
-    youtube = build("youtube", "v3", credentials=creds)
+    endpoint = (args.endpoint or resumable_upload.endpoint_from_env()).rstrip("/")
+    session = open_session(endpoint)
 
-    video_id = upload_video(
-        youtube,
+    video_id, action = publish(
+        session,
+        slug,
         video_path,
         title,
         description,
         tags,
-        category_id="10",  # Music
         privacy=args.privacy,
+        endpoint=endpoint,
+        chunk_size=resumable_upload.chunk_bytes(args.chunk_mb),
     )
 
+    # Skipped/metadata-only: same bytes as the live video, so its thumbnail is already right.
     thumb_path = video_path.with_suffix(".jpg")
-    try:
-        extract_thumbnail(video_path, thumb_path, time_sec=0.5)
-        set_thumbnail(youtube, video_id, thumb_path)
-    except Exception as e:
-        log("THUMB", f"Thumbnail failed: {e}", YELLOW)
+    if action == "upload":
+        try:
+            # 4_mp4.py writes output/<slug>.jpg during the render; only decode the MP4 if it is missing or stale.
+            if thumb_path.exists() and thumb_path.stat().st_mtime >= video_path.stat().st_mtime:
+                log("THUMB", f"Reusing render thumbnail {thumb_path}", CYAN)
+            else:
+                extract_thumbnail(video_path, thumb_path, time_sec=0.5)
+            set_thumbnail(session, video_id, thumb_path, endpoint=endpoint)
+        except Exception as e:
+            log("THUMB", f"Thumbnail failed: {e}", YELLOW)
 
     log("DONE", f"Video available at: https://youtube.com/watch?v={video_id}", GREEN)
 
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""Forced alignment of plain lyrics to the vocals stem.
+
+Used by Step 3 when there is no LRC and no captions: txts/<slug>.txt is aligned
+against separated/htdemucs/<slug>/vocals.wav (falls back to mixes/<slug>.wav).
+
+Pipeline:
+1) Decode 16 kHz mono, energy VAD -> voiced chunks (<= 28 s each)
+2) faster-whisper (CPU, int8) word-timestamped transcription of the chunks,
+   batched in one call through the shared model pool (whisper_pool)
+3) Match lyric words to recognized words (difflib), interpolate unmatched words
+4) Line start = first word time; confidence = matched fraction x mean word probability
+
+Recognized words are cached per audio hash in .cache/mixterioso/align/, so
+editing the lyrics text re-runs only the (cheap) matching step.
+"""
+
+from __future__ import annotations
+
+import argparse
+import difflib
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .audio_io import SR, decode_mono_f32, frame_rms_db
+from .common import Paths, atomic_write_text, file_sha1, log, GREEN, YELLOW
+from .whisper_pool import AsrWord, transcribe_windows
+
+DEFAULT_MODEL_SIZE = "base"
+BATCH_SIZE = 8
+CPU_THREADS = 4
+
+# Energy VAD
+VAD_HOP_MS = 30.0
+VAD_DB_ABOVE_FLOOR = 10.0
+VAD_MERGE_GAP_SECS = 0.6
+VAD_PAD_SECS = 0.2
+MAX_CHUNK_SECS = 28.0
+
+LOW_CONFIDENCE = 0.35
+NOMINAL_WORD_SECS = 0.4
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_SECTION = re.compile(r"^\s*[\[(].*[\])]\s*$")  # [Chorus], (x2)
+
+
+@dataclass
+class AlignedLine:
+    start: float
+    text: str
+    confidence: float
+    words: List[Tuple[float, str]] = field(default_factory=list)
+
+
+def _norm(w: str) -> str:
+    return "".join(_WORD.findall(w.lower()))
+
+
+def read_lyric_lines(txt_path: Path) -> List[str]:
+    out: List[str] = []
+    for raw in txt_path.read_text(encoding="utf-8", errors="replace").splitlines():
+        s = raw.strip()
+        if s and not _SECTION.match(s):
+            out.append(s)
+    return out
+
+
+# ─────────────────────────────────────────────
+# VAD
+# ─────────────────────────────────────────────
+def vad_chunks(audio: np.ndarray, *, sr: int = SR) -> List[Tuple[float, float]]:
+    """Voiced regions (seconds), merged across short gaps and split to <= MAX_CHUNK_SECS."""
+    db = frame_rms_db(audio, sr=sr, hop_ms=VAD_HOP_MS)
+    if db.size == 0:
+        return []
+    hop_s = VAD_HOP_MS / 1000.0
+    floor = float(np.percentile(db, 20.0))
+    voiced = db >= floor + VAD_DB_ABOVE_FLOOR
+
+    # Rising/falling edges of the voiced mask.
+    edges = np.diff(np.concatenate(([0], voiced.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1) * hop_s
+    ends = np.flatnonzero(edges == -1) * hop_s
+
+    regions: List[List[float]] = []
+    for s, e in zip(starts.tolist(), ends.tolist()):
+        if regions and s - regions[-1][1] <= VAD_MERGE_GAP_SECS:
+            regions[-1][1] = e
+        else:
+            regions.append([s, e])
+
+    total = len(audio) / float(sr)
+    chunks: List[Tuple[float, float]] = []
+    for s, e in regions:
+        s = max(0.0, s - VAD_PAD_SECS)
+        e = min(total, e + VAD_PAD_SECS)
+        while e - s > MAX_CHUNK_SECS:
+            chunks.append((s, s + MAX_CHUNK_SECS))
+            s += MAX_CHUNK_SECS
+        if e - s >= 0.3:
+            chunks.append((s, e))
+    return chunks
+
+
+# ─────────────────────────────────────────────
+# ASR
+# ─────────────────────────────────────────────
+def _transcribe_words(
+    audio: np.ndarray,
+    chunks: List[Tuple[float, float]],
+    *,
+    model_size: str,
+    language: Optional[str],
+) -> List[AsrWord]:
+    per_chunk = transcribe_windows(audio, chunks, model_size=model_size, language=language, cpu_threads=CPU_THREADS, batch_size=BATCH_SIZE)
+    return sorted((w for ws in per_chunk for w in ws), key=lambda w: w[0])
+
+
+def recognize_words(
+    audio_path: Path,
+    cache_dir: Path,
+    *,
+    model_size: str = DEFAULT_MODEL_SIZE,
+    language: Optional[str] = None,
+) -> List[AsrWord]:
+    """Word-level transcription of the voiced parts of audio_path (cached by audio hash)."""
+    key = f"{file_sha1(audio_path)}_{model_size}_{language or 'auto'}"
+    cache_path = cache_dir / "align" / f"{key}.json"
+    if cache_path.exists():
+        try:
+            return [tuple(w) for w in json.loads(cache_path.read_text(encoding="utf-8"))["words"]]  # type: ignore[misc]
+        except Exception:
+            pass
+
+    t0 = time.perf_counter()
+    audio = decode_mono_f32(audio_path, af="highpass=f=80,lowpass=f=6000")
+    chunks = vad_chunks(audio)
+    voiced = sum(e - s for s, e in chunks)
+    log("ALIGN", f"VAD: {len(chunks)} chunks, {voiced:.1f}s voiced of {len(audio) / SR:.1f}s", YELLOW)
+    words = _transcribe_words(audio, chunks, model_size=model_size, language=language) if chunks else []
+    log("ALIGN", f"Recognized {len(words)} words in {time.perf_counter() - t0:.2f}s (model={model_size})")
+
+    atomic_write_text(cache_path, json.dumps({"audio": str(audio_path), "words": words}))
+    return words
+
+
+# ─────────────────────────────────────────────
+# Matching
+# ─────────────────────────────────────────────
+def align_lines(lines: List[str], asr: List[AsrWord]) -> List[AlignedLine]:
+    """Assign start times to lyric lines/words from recognized words."""
+    lyric_words: List[Tuple[int, str]] = []  # (line_no, word)
+    for li, line in enumerate(lines):
+        for w in line.split():
+            if _norm(w):
+                lyric_words.append((li, w))
+    if not lyric_words or not asr:
+        return []
+
+    a = [_norm(w) for _, w in lyric_words]
+    b = [_norm(w[2]) for w in asr]
+    times = np.full(len(a), np.nan)
+    probs = np.zeros(len(a))
+    sm = difflib.SequenceMatcher(a=a, b=b, autojunk=False)
+    for blk in sm.get_matching_blocks():
+        for k in range(blk.size):
+            times[blk.a + k] = asr[blk.b + k][0]
+            probs[blk.a + k] = asr[blk.b + k][3]
+
+    matched = ~np.isnan(times)
+    if not matched.any():
+        return []
+    idx = np.arange(len(a))
+    known = idx[matched]
+    filled = np.interp(idx, known, times[matched])
+    # np.interp clamps at the ends; extrapolate at a nominal word rate instead.
+    filled[: known[0]] -= (known[0] - idx[: known[0]]) * NOMINAL_WORD_SECS
+    filled[known[-1] + 1:] += (idx[known[-1] + 1:] - known[-1]) * NOMINAL_WORD_SECS
+    filled = np.maximum(filled, 0.0)
+    filled = np.maximum.accumulate(filled)  # monotone word starts
+
+    out: List[AlignedLine] = []
+    line_nos = np.array([li for li, _ in lyric_words])
+    for li, text in enumerate(lines):
+        sel = np.flatnonzero(line_nos == li)
+        if sel.size == 0:
+            continue
+        m = matched[sel]
+        conf = float(m.mean() * (probs[sel][m].mean() if m.any() else 0.0))
+        out.append(
+            AlignedLine(
+                start=float(filled[sel[0]]),
+                text=text,
+                confidence=round(conf, 3),
+                words=[(float(filled[j]), lyric_words[j][1]) for j in sel],
+            )
+        )
+    return out
+
+
+def pick_alignment_audio(paths: Paths, slug: str) -> Optional[Path]:
+    for p in (paths.separated / "htdemucs" / slug / "vocals.wav", paths.mixes / f"{slug}.wav"):
+        if p.exists():
+            return p
+    return None
+
+
+def align_slug(paths: Paths, slug: str, *, model_size: str = DEFAULT_MODEL_SIZE, language: Optional[str] = None) -> List[AlignedLine]:
+    txt_path = paths.txts / f"{slug}.txt"
+    if not txt_path.exists():
+        return []
+    lines = read_lyric_lines(txt_path)
+    audio_path = pick_alignment_audio(paths, slug)
+    if not lines or audio_path is None:
+        return []
+    if audio_path.name != "vocals.wav":
+        log("ALIGN", f"No vocals stem for {slug}; aligning against the full mix (lower accuracy)", YELLOW)
+
+    asr = recognize_words(audio_path, paths.cache, model_size=model_size, language=language)
+    aligned = align_lines(lines, asr)
+    low = [a for a in aligned if a.confidence < LOW_CONFIDENCE]
+    if aligned:
+        mean_conf = sum(a.confidence for a in aligned) / len(aligned)
+        log("ALIGN", f"Aligned {len(aligned)} lines (mean confidence {mean_conf:.2f}, {len(low)} low)", GREEN)
+    for a in low:
+        log("ALIGN", f"  low confidence {a.confidence:.2f} @ {a.start:7.2f}s  {a.text}", YELLOW)
+    return aligned
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Align txts/<slug>.txt to the vocals stem")
+    ap.add_argument("--slug", required=True)
+    ap.add_argument("--model", default=DEFAULT_MODEL_SIZE)
+    ap.add_argument("--language", default=None)
+    args = ap.parse_args()
+
+    paths = Paths.from_scripts_dir(Path(__file__).resolve().parent)
+    for a in align_slug(paths, args.slug, model_size=args.model, language=args.language):
+        print(f"{a.start:8.3f}  {a.confidence:4.2f}  {a.text}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
+# end of align_lyrics.py
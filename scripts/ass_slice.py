@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""ASS (Advanced SubStation) timing helpers shared by the renderers.
+
+Only the Dialogue timing fields are touched; headers, styles and the event
+text/override tags pass through unchanged.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List, Tuple
+
+
+def seconds_to_ass_time(sec: float) -> str:
+    # ASS time format: H:MM:SS.cs (centiseconds)
+    if sec < 0:
+        sec = 0.0
+    total_cs = int(round(sec * 100))
+    if total_cs < 0:
+        total_cs = 0
+    total_seconds, cs = divmod(total_cs, 100)
+    h, rem = divmod(total_seconds, 3600)
+    m, s = divmod(rem, 60)
+    return f"{h}:{m:02d}:{s:02d}.{cs:02d}"
+
+
+def ass_time_to_seconds(ts: str) -> float:
+    # Inverse of seconds_to_ass_time: H:MM:SS.cs
+    h, m, s = ts.strip().split(":")
+    return int(h) * 3600 + int(m) * 60 + float(s)
+
+
+def event_boundaries(ass_text: str) -> List[float]:
+    """Sorted distinct Dialogue start/end times: the only moments the picture changes."""
+    times = set()
+    for line in ass_text.split("\n"):
+        if line.startswith("Dialogue:"):
+            _, ev_start, ev_end, _ = line.split(",", 3)
+            times.add(ass_time_to_seconds(ev_start))
+            times.add(ass_time_to_seconds(ev_end))
+    return sorted(times)
+
+
+def slice_events(ass_text: str, start: float, end: float) -> Tuple[str, int]:
+    """
+    Keep only Dialogue events visible in [start, end), clipped to the window and
+    shifted so the window starts at 0. Returns (ass_text, number of events kept).
+    """
+    out_lines = []
+    kept = 0
+    for line in ass_text.split("\n"):
+        if not line.startswith("Dialogue:"):
+            out_lines.append(line)
+            continue
+        head, ev_start, ev_end, rest = line.split(",", 3)
+        s = ass_time_to_seconds(ev_start)
+        e = ass_time_to_seconds(ev_end)
+        if e <= start or s >= end:
+            continue
+        out_lines.append(
+            "{},{},{},{}".format(
+                head,
+                seconds_to_ass_time(max(s, start) - start),
+                seconds_to_ass_time(min(e, end) - start),
+                rest,
+            )
+        )
+        kept += 1
+    return "\n".join(out_lines), kept
+
+
+def ass_event_boundaries(ass_path: Path) -> List[float]:
+    return event_boundaries(ass_path.read_text(encoding="utf-8"))
+
+
+# end of ass_slice.py
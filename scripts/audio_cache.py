@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Encoded audio track cache for the renderers.
+
+The mix only changes when Step 2 re-runs, but every render used to re-encode
+mixes/<slug>.wav to AAC. The encoded track is cached per (mix SHA-1, codec,
+bitrate) in .cache/mixterioso/audio/, and renders mux it with -c:a copy, so a
+re-render after an offset or style change costs only the video encode.
+"""
+
+from __future__ import annotations
+
+import subprocess
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from .common import atomic_output, file_sha1, log, CYAN, GREEN
+
+DEFAULT_CODEC = "aac"
+DEFAULT_BITRATE = "192k"
+
+_CODECS = {
+    "aac": ["-c:a", "aac"],
+    "opus": ["-c:a", "libopus"],
+}
+# Container for the cached track: ffmpeg's ipod (.m4a) muxer only takes AAC/ALAC.
+CONTAINERS = {
+    "aac": ".m4a",
+    "opus": ".ogg",
+}
+
+
+def cached_audio_path(audio_path: Path, cache_dir: Path, *, codec: str = DEFAULT_CODEC, bitrate: str = DEFAULT_BITRATE) -> Path:
+    if codec not in _CODECS:
+        raise ValueError(f"Unsupported audio codec {codec!r} (expected one of {sorted(_CODECS)})")
+    return cache_dir / "audio" / f"{file_sha1(audio_path)[:20]}_{codec}_{bitrate}{CONTAINERS[codec]}"
+
+
+def encoded_audio(
+    audio_path: Path,
+    cache_dir: Path,
+    *,
+    codec: str = DEFAULT_CODEC,
+    bitrate: str = DEFAULT_BITRATE,
+) -> Path:
+    """Path to the encoded track for audio_path, encoding it on first use."""
+    out = cached_audio_path(audio_path, cache_dir, codec=codec, bitrate=bitrate)
+    if out.exists():
+        log("AUDIO", f"Reusing encoded audio {out.name} ({codec} {bitrate})", CYAN)
+        return out
+
+    t0 = time.perf_counter()
+    with atomic_output(out) as tmp:
+        cmd = [
+            "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+            "-i", str(audio_path),
+            "-vn",
+            *_CODECS[codec],
+            "-b:a", bitrate,
+            str(tmp),
+        ]
+        subprocess.run(cmd, check=True)
+    log("AUDIO", f"Encoded {audio_path.name} -> {out} in {time.perf_counter() - t0:.2f}s", GREEN)
+    return out
+
+
+def audio_input_and_args(
+    audio_path: Path,
+    cache_dir: Path,
+    *,
+    codec: str = DEFAULT_CODEC,
+    bitrate: str = DEFAULT_BITRATE,
+) -> Tuple[Path, List[str]]:
+    """(audio input for the final mux, its output args): the cached track with -c:a copy."""
+    return encoded_audio(audio_path, cache_dir, codec=codec, bitrate=bitrate), ["-c:a", "copy"]
+
+
+# end of audio_cache.py
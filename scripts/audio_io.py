@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Small ffmpeg -> NumPy audio helpers shared by the analysis stages."""
+
+from __future__ import annotations
+
+import subprocess
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+SR = 16000
+
+
+def decode_pcm_s16le(
+    audio_path: Path | str,
+    *,
+    sr: int = SR,
+    channels: int = 1,
+    start_secs: float = 0.0,
+    max_secs: Optional[float] = None,
+    af: Optional[str] = None,
+) -> bytes:
+    """Decode audio to interleaved signed 16-bit little-endian PCM via ffmpeg."""
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error"]
+    if start_secs > 0:
+        cmd += ["-ss", f"{start_secs:.3f}"]
+    if max_secs is not None:
+        cmd += ["-t", f"{max_secs:.3f}"]
+    cmd += ["-i", str(audio_path), "-vn", "-ac", str(channels), "-ar", str(sr)]
+    if af:
+        cmd += ["-af", af]
+    cmd += ["-f", "s16le", "pipe:1"]
+    p = subprocess.run(cmd, check=True, stdout=subprocess.PIPE)
+    return p.stdout
+
+
+def decode_mono_f32(
+    audio_path: Path | str,
+    *,
+    sr: int = SR,
+    start_secs: float = 0.0,
+    max_secs: Optional[float] = None,
+    af: Optional[str] = None,
+) -> np.ndarray:
+    """Decode audio to mono float32 in [-1, 1) at `sr` Hz via ffmpeg (s16le pipe)."""
+    raw = decode_pcm_s16le(audio_path, sr=sr, start_secs=start_secs, max_secs=max_secs, af=af)
+    pcm16 = np.frombuffer(raw, dtype=np.int16)
+    return pcm16.astype(np.float32) * (1.0 / 32768.0)
+
+
+def frame_rms_db(audio: np.ndarray, *, sr: int = SR, hop_ms: float = 10.0) -> np.ndarray:
+    """Per-hop RMS level in dB (vectorized; trailing partial frame dropped)."""
+    hop = max(1, int(sr * hop_ms / 1000.0))
+    n = len(audio) // hop
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = audio[: n * hop].reshape(n, hop)
+    rms = np.sqrt(np.mean(frames * frames, axis=1, dtype=np.float32))
+    return (20.0 * np.log10(rms + 1e-6)).astype(np.float32)
+
+
+# end of audio_io.py
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""Non-interactive, quota-aware batch uploader.
+
+Uploads many slugs with a bounded worker pool, reusing 5_upload.py's title,
+tag and thumbnail helpers and the crash-safe resumable uploads
+(scripts/resumable_upload.py).
+
+YouTube Data API quota is tracked per call (videos.insert = 1600,
+thumbnails.set = 50 units; 10 000 units/day by default) in
+.cache/mixterioso/youtube_quota.json. The day rolls over at midnight
+Pacific time, like the API's. When the next call does not fit, workers wait
+for the reset (or, with --no-wait, the remaining slugs are left for the next
+run). A quotaExceeded answer from the API marks the day as used up.
+Resumed sessions are not charged again, and renders already live
+(meta/uploads.sqlite) are skipped or get a metadata-only update (50 units).
+
+Titles are never prompted: --titles maps slug -> full title (JSON), otherwise
+"<Artist - Title> (<ending>)" with --ending or the ending suggested from the
+stem levels in meta.
+
+Usage:
+    python3 -m scripts.batch_upload slug_a slug_b --ending Karaoke --workers 3
+    python3 -m scripts.batch_upload --slugs-file tonight.txt --titles titles.json
+    python3 -m scripts.batch_upload slug_a --endpoint http://127.0.0.1:8765   # mock_youtube
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import importlib.util
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+from . import resumable_upload
+from .common import Paths, atomic_write_text, file_sha1, log, slugify, CYAN, GREEN, RED, YELLOW
+from .upload_registry import UploadRegistry, registry_path
+
+QUOTA_COSTS = {"videos.insert": 1600, "videos.update": 50, "thumbnails.set": 50}
+DEFAULT_DAILY_QUOTA = 10000
+QUOTA_TZ = ZoneInfo("America/Los_Angeles")
+DEFAULT_WORKERS = 3
+PROGRESS_EVERY_SECS = 5.0
+
+
+def _load_uploader():
+    """5_upload.py as a module (its file name is not importable)."""
+    path = Path(__file__).resolve().parent / "5_upload.py"
+    spec = importlib.util.spec_from_file_location("mixterioso_5_upload", path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+# ─────────────────────────────────────────────
+# Quota
+# ─────────────────────────────────────────────
+def quota_day(now: Optional[dt.datetime] = None) -> str:
+    return (now or dt.datetime.now(QUOTA_TZ)).astimezone(QUOTA_TZ).date().isoformat()
+
+
+def secs_until_reset(now: Optional[dt.datetime] = None) -> float:
+    now = (now or dt.datetime.now(QUOTA_TZ)).astimezone(QUOTA_TZ)
+    midnight = dt.datetime.combine(now.date() + dt.timedelta(days=1), dt.time(0), tzinfo=QUOTA_TZ)
+    return max(1.0, (midnight - now).total_seconds())
+
+
+class QuotaTracker:
+    """Units used today (Pacific), shared by the workers and persisted across runs.
+
+    clock/sleep default to the wall clock and the stop event's wait; tests pass
+    a fake pair to cross the midnight reset without waiting for it.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        daily_limit: int = DEFAULT_DAILY_QUOTA,
+        *,
+        clock: Optional[Callable[[], dt.datetime]] = None,
+        sleep: Optional[Callable[[float], None]] = None,
+    ) -> None:
+        self.path = path
+        self.daily_limit = daily_limit
+        self.clock = clock or (lambda: dt.datetime.now(QUOTA_TZ))
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._state = self._load()
+
+    def _load(self) -> Dict:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if isinstance(data, dict):
+                return data
+        except Exception:
+            pass
+        return {}
+
+    def _save(self) -> None:
+        atomic_write_text(self.path, json.dumps(self._state, indent=2) + "\n")
+
+    def _roll(self) -> None:
+        day = quota_day(self.clock())
+        if self._state.get("day") != day:
+            self._state = {"day": day, "used": 0, "calls": {}}
+
+    def remaining(self) -> int:
+        with self._lock:
+            self._roll()
+            return self.daily_limit - int(self._state["used"])
+
+    def try_reserve(self, call: str) -> bool:
+        cost = QUOTA_COSTS[call]
+        with self._lock:
+            self._roll()
+            if int(self._state["used"]) + cost > self.daily_limit:
+                return False
+            self._state["used"] = int(self._state["used"]) + cost
+            calls = self._state.setdefault("calls", {})
+            calls[call] = int(calls.get(call, 0)) + 1
+            self._save()
+            return True
+
+    def reserve(self, call: str, *, wait: bool, stop: threading.Event) -> bool:
+        """Charge one call; with wait, block until the Pacific-midnight reset if it does not fit."""
+        while not self.try_reserve(call):
+            if not wait or stop.is_set():
+                return False
+            delay = secs_until_reset(self.clock())
+            log("QUOTA", f"{call} needs {QUOTA_COSTS[call]} units, {self.remaining()} left; waiting {delay / 3600:.1f}h for the reset", YELLOW)
+            if self._sleep is None:
+                stop.wait(min(delay, 600.0))
+            else:
+                self._sleep(min(delay, 600.0))
+        return True
+
+    def exhaust(self) -> None:
+        """The API said quotaExceeded: treat today's quota as used up."""
+        with self._lock:
+            self._roll()
+            self._state["used"] = self.daily_limit
+            self._save()
+
+
+# ─────────────────────────────────────────────
+# Uploads
+# ─────────────────────────────────────────────
+@dataclass
+class UploadJob:
+    slug: str
+    video_path: Path
+    title: str
+    tags: List[str]
+
+
+@dataclass
+class UploadOutcome:
+    slug: str
+    status: str  # uploaded | updated | skipped | deferred | failed
+    video_id: str = ""
+    size_bytes: int = 0
+    secs: float = 0.0
+    detail: str = ""
+
+
+class _Progress:
+    """Per-upload progress + throughput, logged at most every PROGRESS_EVERY_SECS."""
+
+    def __init__(self, slug: str) -> None:
+        self.slug = slug
+        self.t0 = time.perf_counter()
+        self.first: Optional[int] = None
+        self.last_log = 0.0
+
+    def __call__(self, done: int, total: int) -> None:
+        now = time.perf_counter()
+        if self.first is None:
+            self.first = done
+            self.t0 = now
+            return
+        if done < total and now - self.last_log < PROGRESS_EVERY_SECS:
+            return
+        self.last_log = now
+        rate = (done - self.first) / max(1e-6, now - self.t0)
+        log("BATCH", f"{self.slug}: {100 * done // max(1, total)}% ({done / 1e6:.1f}/{total / 1e6:.1f} MB, {rate / 1e6:.2f} MB/s)", CYAN)
+
+
+def build_jobs(uploader, slugs: List[str], *, titles: Dict[str, str], ending: Optional[str]) -> List[UploadJob]:
+    jobs: List[UploadJob] = []
+    for slug in slugs:
+        video_path = uploader._resolve_video_path(slug)
+        if not video_path.exists():
+            log("BATCH", f"{slug}: no MP4 at {video_path}; skipping", YELLOW)
+            continue
+        meta = uploader.load_meta_for_slug(slug)
+        title = titles.get(slug)
+        if not title:
+            suffix = ending or uploader.suggest_ending_from_stems(meta)
+            if not suffix:
+                log("BATCH", f"{slug}: no title in --titles and no ending (use --ending); skipping", YELLOW)
+                continue
+            title = f"{uploader.auto_main_title(slug, meta)} ({suffix})"
+        jobs.append(UploadJob(slug, video_path, title, uploader.build_tags(meta)))
+    return jobs
+
+
+def run_batch(
+    uploader,
+    jobs: List[UploadJob],
+    *,
+    endpoint: str,
+    privacy: str,
+    quota: QuotaTracker,
+    workers: int,
+    chunk_size: int,
+    wait: bool,
+) -> List[UploadOutcome]:
+    stop = threading.Event()
+    registry = UploadRegistry(registry_path(uploader.META_DIR))
+
+    def session():
+        # Per-thread session from the shared client (token refreshed only near expiry).
+        return uploader.open_session(endpoint)
+
+    def one(job: UploadJob) -> UploadOutcome:
+        state_file = resumable_upload.state_path(uploader.META_DIR, job.slug)
+        size = job.video_path.stat().st_size
+        action, record = registry.plan(file_sha1(job.video_path), endpoint, title=job.title, privacy=privacy)
+        if action == "skip":
+            return UploadOutcome(job.slug, "skipped", video_id=record.video_id, detail="identical render already live")
+        prior = resumable_upload.saved_status(state_file, job.video_path, endpoint)
+        call = "videos.update" if action == "update" else "videos.insert"
+        # A resumed session was charged when it started.
+        if (action == "update" or prior is None) and not quota.reserve(call, wait=wait, stop=stop):
+            return UploadOutcome(job.slug, "deferred", detail="quota")
+
+        t0 = time.perf_counter()
+        try:
+            video_id, action = uploader.publish(
+                session(),
+                job.slug,
+                job.video_path,
+                job.title,
+                "",
+                job.tags,
+                privacy=privacy,
+                endpoint=endpoint,
+                chunk_size=chunk_size,
+                progress=_Progress(job.slug),
+            )
+        except resumable_upload.UploadError as e:
+            if "quotaExceeded" in str(e):
+                quota.exhaust()
+                return UploadOutcome(job.slug, "deferred", detail="quotaExceeded from API")
+            return UploadOutcome(job.slug, "failed", detail=str(e))
+        secs = time.perf_counter() - t0
+        if action == "update":
+            return UploadOutcome(job.slug, "updated", video_id=video_id, secs=secs, detail="metadata only")
+
+        thumb_path = job.video_path.with_suffix(".jpg")
+        try:
+            if not (thumb_path.exists() and thumb_path.stat().st_mtime >= job.video_path.stat().st_mtime):
+                uploader.extract_thumbnail(job.video_path, thumb_path, time_sec=0.5)
+            if quota.reserve("thumbnails.set", wait=wait, stop=stop):
+                uploader.set_thumbnail(session(), video_id, thumb_path, endpoint=endpoint)
+            else:
+                log("BATCH", f"{job.slug}: no quota left for the thumbnail", YELLOW)
+        except Exception as e:
+            log("THUMB", f"{job.slug}: thumbnail failed: {e}", YELLOW)
+        return UploadOutcome(job.slug, "uploaded", video_id=video_id, size_bytes=size, secs=secs)
+
+    outcomes: List[UploadOutcome] = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(one, job): job for job in jobs}
+        try:
+            for fut in as_completed(futures):
+                try:
+                    out = fut.result()
+                except Exception as e:
+                    out = UploadOutcome(futures[fut].slug, "failed", detail=f"{type(e).__name__}: {e}")
+                color = {"uploaded": GREEN, "updated": GREEN, "skipped": CYAN, "deferred": YELLOW}.get(out.status, RED)
+                log("BATCH", f"{out.slug}: {out.status}" + (f" ({out.detail})" if out.detail else ""), color)
+                outcomes.append(out)
+        except KeyboardInterrupt:
+            stop.set()
+            raise
+    return outcomes
+
+
+def print_summary(outcomes: List[UploadOutcome], quota: QuotaTracker) -> None:
+    print()
+    print(f"{'slug':32s} {'status':9s} {'video_id':12s} {'MB':>7s} {'secs':>7s} {'MB/s':>6s}")
+    for o in sorted(outcomes, key=lambda o: o.slug):
+        rate = o.size_bytes / o.secs / 1e6 if o.secs > 0 else 0.0
+        print(f"{o.slug[:32]:32s} {o.status:9s} {o.video_id:12s} {o.size_bytes / 1e6:>7.1f} {o.secs:>7.1f} {rate:>6.2f}")
+    print(f"\nQuota left today (Pacific): {quota.remaining()} units")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Upload many slugs concurrently within the YouTube API quota")
+    ap.add_argument("slugs", nargs="*")
+    ap.add_argument("--slugs-file", default=None, help="One slug per line")
+    ap.add_argument("--titles", default=None, help="JSON object slug -> full title")
+    ap.add_argument("--ending", default=None, help='Title ending for every slug, e.g. "Karaoke"')
+    ap.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    ap.add_argument("--quota", type=int, default=DEFAULT_DAILY_QUOTA, help="Daily quota units")
+    ap.add_argument("--no-wait", action="store_true", help="Defer slugs instead of waiting for the quota reset")
+    ap.add_argument("--chunk-mb", type=float, default=resumable_upload.DEFAULT_CHUNK_BYTES / (1024 * 1024))
+    ap.add_argument("--endpoint", default=None, help="API root (default: MIXTERIOSO_YOUTUBE_ENDPOINT or Google)")
+    args = ap.parse_args(argv)
+
+    slugs = list(args.slugs)
+    if args.slugs_file:
+        slugs += [ln.strip() for ln in Path(args.slugs_file).read_text(encoding="utf-8").splitlines() if ln.strip() and not ln.startswith("#")]
+    slugs = list(dict.fromkeys(slugify(s) for s in slugs))
+    if not slugs:
+        ap.error("no slugs given")
+    titles = json.loads(Path(args.titles).read_text(encoding="utf-8")) if args.titles else {}
+
+    paths = Paths.from_scripts_dir(Path(__file__).resolve().parent)
+    uploader = _load_uploader()
+    endpoint = (args.endpoint or resumable_upload.endpoint_from_env()).rstrip("/")
+    quota = QuotaTracker(paths.cache / "youtube_quota.json", args.quota)
+
+    jobs = build_jobs(uploader, slugs, titles={slugify(k): v for k, v in titles.items()}, ending=args.ending)
+    log("BATCH", f"{len(jobs)} upload(s), {args.workers} worker(s), {quota.remaining()} quota units left today", CYAN)
+    outcomes = run_batch(
+        uploader,
+        jobs,
+        endpoint=endpoint,
+        privacy="unlisted",  # same policy as 5_upload.py
+        quota=quota,
+        workers=args.workers,
+        chunk_size=resumable_upload.chunk_bytes(args.chunk_mb),
+        wait=not args.no_wait,
+    )
+    print_summary(outcomes, quota)
+    return 0 if all(o.status in ("uploaded", "updated", "skipped") for o in outcomes) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
+# end of batch_upload.py
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""Encoder / preset / CRF / fps / resolution benchmark on lyric-video content.
+
+Renders representative cases through the real subtitle path (4_mp4.py build_ass
++ black canvas + libass) and records, per configuration:
+- wall time and speed (x realtime), CPU time of the ffmpeg child
+- output size and video bitrate
+- SSIM / PSNR against a lossless (ffv1) reference of the same case/size/fps
+
+Cases are synthetic timelines (sparse ballad, dense rap, long wrapped lines)
+plus, with --slug, real timings/<slug>.csv. Only the video stream is encoded:
+the renderers stream-copy the cached audio track (audio_cache.py), so audio
+costs nothing per render.
+
+Results are printed as a table and written to output/bench_render.json. The
+recommended profile is the smallest output whose worst-case SSIM and speed
+pass --min-ssim / --min-speed; --apply stores it in meta/render_profile.json,
+which encoders.py uses as the renderer default.
+
+Usage:
+    python3 -m scripts.bench_render
+    python3 -m scripts.bench_render --slug my_song --encoders libx264 --apply
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import re
+import resource
+import subprocess
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .ass_slice import ass_event_boundaries
+from .common import Paths, atomic_write_text, log, CYAN, GREEN, YELLOW
+from .encoders import ENCODER_PREFERENCE, PROFILE_PATH, encoder_works, keyframe_times, video_args
+
+DEFAULT_SECS = 30.0
+DEFAULT_PRESETS = ["ultrafast", "superfast", "veryfast", "faster", "medium"]
+DEFAULT_CRFS = [22, 26, 30]
+DEFAULT_FPS = [5, 10]
+DEFAULT_SIZES = ["854x480", "1280x720"]
+MIN_SSIM = 0.985
+MIN_SPEED = 20.0  # x realtime
+
+Timing = Tuple[float, str, int]
+
+
+@dataclass
+class BenchResult:
+    case: str
+    encoder: str
+    preset: str
+    crf: int
+    fps: float
+    width: int
+    height: int
+    secs: float
+    wall_s: float
+    cpu_s: float
+    speed: float
+    size_bytes: int
+    kbps: float
+    ssim: float
+    psnr: float
+
+
+def _load_renderer():
+    """4_mp4.py as a module (its file name is not importable)."""
+    path = Path(__file__).resolve().parent / "4_mp4.py"
+    spec = importlib.util.spec_from_file_location("mixterioso_4_mp4", path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+# ─────────────────────────────────────────────
+# Cases
+# ─────────────────────────────────────────────
+def synthetic_timings(kind: str, secs: float) -> List[Timing]:
+    """Deterministic timelines covering our extremes of on-screen change rate and text length."""
+    step, words = {
+        "sparse": (6.0, "hold me closer tiny dancer"),
+        "dense": (1.5, "rapid fire syllables stacking up on every beat"),
+        "long": (4.0, " ".join(["a long wrapped lyric line that spans the whole width"] * 2)),
+    }[kind]
+    rows: List[Timing] = []
+    t, idx = 2.0, 0
+    while t < secs - 1.0:
+        rows.append((round(t, 2), f"{words} {idx + 1}", idx))
+        t += step
+        idx += 1
+    return rows
+
+
+def build_cases(renderer, slug: Optional[str], secs: float, work: Path) -> Dict[str, Tuple[Path, List[float]]]:
+    """case name -> (ASS path, lyric boundaries)."""
+    timings: Dict[str, List[Timing]] = {k: synthetic_timings(k, secs) for k in ("sparse", "dense", "long")}
+    if slug:
+        rows = [r for r in renderer.read_timings(slug) if r[0] < secs]
+        if rows:
+            timings[slug] = rows
+        else:
+            log("BENCH", f"No timings for {slug} in the first {secs:.0f}s; skipping", YELLOW)
+
+    ui_size = renderer.DEFAULT_UI_FONT_SIZE
+    cases: Dict[str, Tuple[Path, List[float]]] = {}
+    for name, rows in timings.items():
+        ass_path = renderer.build_ass(
+            name, "Bench", name, rows, secs, "Helvetica",
+            int(ui_size * renderer.ASS_FONT_MULTIPLIER),
+            title_card_lines=["Bench", name],
+            ass_path=work / f"{name}.ass",
+        )
+        cases[name] = (ass_path, ass_event_boundaries(ass_path))
+    return cases
+
+
+# ─────────────────────────────────────────────
+# Encoding + measurement
+# ─────────────────────────────────────────────
+def _source_args(ass_path: Path, width: int, height: int, fps: float, secs: float) -> List[str]:
+    return [
+        "-f", "lavfi", "-i", f"color=c=black:s={width}x{height}:r={fps}:d={secs}",
+        "-vf", f"subtitles={ass_path}",
+    ]
+
+
+def _child_cpu() -> float:
+    ru = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return ru.ru_utime + ru.ru_stime
+
+
+def encode(cmd: Sequence[str]) -> Tuple[float, float]:
+    """Run ffmpeg; returns (wall seconds, child CPU seconds)."""
+    cpu0 = _child_cpu()
+    t0 = time.perf_counter()
+    subprocess.run(list(cmd), check=True)
+    return time.perf_counter() - t0, _child_cpu() - cpu0
+
+
+def reference(ass_path: Path, width: int, height: int, fps: float, secs: float, out: Path) -> Path:
+    if not out.exists():
+        encode([
+            "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+            *_source_args(ass_path, width, height, fps, secs),
+            "-c:v", "ffv1", "-pix_fmt", "yuv420p",
+            str(out),
+        ])
+    return out
+
+
+_SSIM_RE = re.compile(r"SSIM .*All:([0-9.]+)")
+_PSNR_RE = re.compile(r"PSNR .*average:([0-9.]+|inf)")
+
+
+def quality(test: Path, ref: Path) -> Tuple[float, float]:
+    """(SSIM All, PSNR average) of test against ref."""
+    proc = subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-nostats",
+            "-i", str(test), "-i", str(ref),
+            "-filter_complex", "[0:v]split[a0][a1];[1:v]split[b0][b1];[a0][b0]ssim;[a1][b1]psnr",
+            "-f", "null", "-",
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    ssim = _SSIM_RE.search(proc.stderr)
+    psnr = _PSNR_RE.search(proc.stderr)
+    return (
+        float(ssim.group(1)) if ssim else 0.0,
+        float(psnr.group(1)) if psnr else 0.0,
+    )
+
+
+def _settings(encoder: str, presets: Sequence[str], crfs: Sequence[int]) -> List[Tuple[str, int]]:
+    # Preset/CRF only mean something for libx264; other encoders run once at their fixed rate control.
+    if encoder == "libx264":
+        return [(p, c) for p in presets for c in crfs]
+    return [("-", 0)]
+
+
+def run_matrix(
+    cases: Dict[str, Tuple[Path, List[float]]],
+    *,
+    encoders: Sequence[str],
+    presets: Sequence[str],
+    crfs: Sequence[int],
+    fps_list: Sequence[float],
+    sizes: Sequence[Tuple[int, int]],
+    secs: float,
+    work: Path,
+) -> List[BenchResult]:
+    results: List[BenchResult] = []
+    for name, (ass_path, boundaries) in cases.items():
+        for width, height in sizes:
+            for fps in fps_list:
+                ref = reference(ass_path, width, height, fps, secs, work / f"{name}_{width}x{height}_{fps}_ref.mkv")
+                keyframes = keyframe_times(boundaries, fps=fps, duration=secs)
+                for enc in encoders:
+                    for preset, crf in _settings(enc, presets, crfs):
+                        out = work / f"{name}_{width}x{height}_{fps}_{enc}_{preset}_{crf}.mp4"
+                        wall, cpu = encode([
+                            "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+                            *_source_args(ass_path, width, height, fps, secs),
+                            *video_args(
+                                fps=fps,
+                                keyframes=keyframes,
+                                encoder=enc,
+                                preset=None if preset == "-" else preset,
+                                crf=crf if enc == "libx264" else None,
+                            ),
+                            "-an",
+                            str(out),
+                        ])
+                        ssim, psnr = quality(out, ref)
+                        size = out.stat().st_size
+                        r = BenchResult(
+                            case=name, encoder=enc, preset=preset, crf=crf, fps=fps,
+                            width=width, height=height, secs=secs,
+                            wall_s=round(wall, 3), cpu_s=round(cpu, 3),
+                            speed=round(secs / wall, 1) if wall > 0 else 0.0,
+                            size_bytes=size, kbps=round(size * 8 / secs / 1000, 1),
+                            ssim=ssim, psnr=psnr,
+                        )
+                        results.append(r)
+                        log(
+                            "BENCH",
+                            f"{name:8s} {width}x{height}@{fps:g} {enc} {preset}/{crf}: "
+                            f"{r.speed:.1f}x, {r.kbps:.0f} kbps, SSIM {ssim:.4f}",
+                            CYAN,
+                        )
+                        out.unlink(missing_ok=True)
+    return results
+
+
+# ─────────────────────────────────────────────
+# Report
+# ─────────────────────────────────────────────
+def print_table(results: Sequence[BenchResult]) -> None:
+    header = f"{'case':10s} {'size':>9s} {'fps':>4s} {'encoder':18s} {'preset':10s} {'crf':>3s} {'speed':>7s} {'cpu s':>6s} {'kbps':>7s} {'ssim':>7s} {'psnr':>6s}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r.case[:10]:10s} {f'{r.width}x{r.height}':>9s} {r.fps:>4g} {r.encoder:18s} {r.preset:10s} "
+            f"{r.crf:>3d} {r.speed:>6.1f}x {r.cpu_s:>6.2f} {r.kbps:>7.1f} {r.ssim:>7.4f} {r.psnr:>6.2f}"
+        )
+
+
+def recommend(results: Sequence[BenchResult], *, min_ssim: float, min_speed: float) -> Optional[Dict[str, object]]:
+    """Smallest total output among (encoder, preset, crf) whose worst case passes both thresholds."""
+    groups: Dict[Tuple[str, str, int], List[BenchResult]] = {}
+    for r in results:
+        groups.setdefault((r.encoder, r.preset, r.crf), []).append(r)
+
+    best = None
+    for (enc, preset, crf), rs in groups.items():
+        worst_ssim = min(r.ssim for r in rs)
+        worst_speed = min(r.speed for r in rs)
+        if worst_ssim < min_ssim or worst_speed < min_speed:
+            continue
+        total = sum(r.size_bytes for r in rs)
+        if best is None or total < best["total_bytes"]:
+            best = {
+                "encoder": enc,
+                "preset": None if preset == "-" else preset,
+                "crf": crf if enc == "libx264" else None,
+                "worst_ssim": worst_ssim,
+                "worst_speed": worst_speed,
+                "total_bytes": total,
+            }
+    return best
+
+
+def _parse_sizes(text: str) -> List[Tuple[int, int]]:
+    out = []
+    for part in text.split(","):
+        w, h = part.lower().split("x")
+        out.append((int(w), int(h)))
+    return out
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark encoders/presets/CRF/fps/sizes on lyric-video content")
+    ap.add_argument("--slug", default=None, help="Also bench real timings/<slug>.csv")
+    ap.add_argument("--secs", type=float, default=DEFAULT_SECS, help="Rendered length per case")
+    ap.add_argument("--encoders", default=None, help="Comma list (default: every working encoder)")
+    ap.add_argument("--presets", default=",".join(DEFAULT_PRESETS))
+    ap.add_argument("--crfs", default=",".join(map(str, DEFAULT_CRFS)))
+    ap.add_argument("--fps", default=",".join(map(str, DEFAULT_FPS)))
+    ap.add_argument("--sizes", default=",".join(DEFAULT_SIZES))
+    ap.add_argument("--min-ssim", type=float, default=MIN_SSIM)
+    ap.add_argument("--min-speed", type=float, default=MIN_SPEED, help="Minimum x realtime")
+    ap.add_argument("--json", default=None, help="Results path (default output/bench_render.json)")
+    ap.add_argument("--apply", action="store_true", help=f"Write the recommendation to {PROFILE_PATH}")
+    args = ap.parse_args(argv)
+
+    paths = Paths.from_scripts_dir(Path(__file__).resolve().parent)
+    encoders = args.encoders.split(",") if args.encoders else [e for e in ENCODER_PREFERENCE if encoder_works(e)]
+    encoders = [e for e in encoders if encoder_works(e)]
+    if not encoders:
+        log("BENCH", "No working encoders to benchmark", YELLOW)
+        return 1
+
+    renderer = _load_renderer()
+    with tempfile.TemporaryDirectory(prefix="mixterioso_bench_") as tmp:
+        work = Path(tmp)
+        cases = build_cases(renderer, args.slug, args.secs, work)
+        results = run_matrix(
+            cases,
+            encoders=encoders,
+            presets=args.presets.split(","),
+            crfs=[int(c) for c in args.crfs.split(",")],
+            fps_list=[float(f) for f in args.fps.split(",")],
+            sizes=_parse_sizes(args.sizes),
+            secs=args.secs,
+            work=work,
+        )
+
+    print_table(results)
+    best = recommend(results, min_ssim=args.min_ssim, min_speed=args.min_speed)
+
+    json_path = Path(args.json) if args.json else paths.output / "bench_render.json"
+    atomic_write_text(
+        json_path,
+        json.dumps(
+            {
+                "min_ssim": args.min_ssim,
+                "min_speed": args.min_speed,
+                "recommended": best,
+                "results": [asdict(r) for r in results],
+            },
+            indent=2,
+        ) + "\n",
+    )
+    log("BENCH", f"Wrote {len(results)} results to {json_path}", GREEN)
+
+    if best is None:
+        log("BENCH", f"No configuration reached SSIM >= {args.min_ssim} at >= {args.min_speed}x realtime", YELLOW)
+        return 0
+    log(
+        "BENCH",
+        f"Recommended: {best['encoder']} preset={best['preset']} crf={best['crf']} "
+        f"(worst SSIM {best['worst_ssim']:.4f}, worst speed {best['worst_speed']:.1f}x)",
+        GREEN,
+    )
+    if args.apply:
+        profile = {k: best[k] for k in ("encoder", "preset", "crf") if best[k] is not None}
+        atomic_write_text(PROFILE_PATH, json.dumps(profile, indent=2) + "\n")
+        log("BENCH", f"Wrote render profile to {PROFILE_PATH}", GREEN)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
+# end of bench_render.py
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""Keep derivable artifacts within a disk budget.
+
+Evictable (rebuilt offline by the pipeline when needed), per category:
+- mix_wav    mixes/<slug>.wav, only while mixes/ or mp3s/<slug>.mp3 exists
+- stems      separated/htdemucs/<slug>/ (Demucs re-runs on the next stems mix)
+- segments   .cache/mixterioso/segments/<slug>/ and segments_tmp/<slug>/
+- audio      .cache/mixterioso/audio/*.m4a|*.ogg (encoded AAC/Opus tracks)
+- previews   .cache/mixterioso/previews/*.wav (offset tuner clips)
+- asr        .cache/mixterioso/align/*.json (recognized words)
+- scratch    .cache/mixterioso/<slug>.srt, black_*.png
+- ass        output/*.ass, output/*.ffconcat, output/<slug>.draft.mp4
+
+Never touched: mp3s/, txts/, timings/ (LRC, CSV, offsets, warps, edits),
+meta/, mixes/*.mp3, final output/<slug>.mp4 and thumbnails, and the small
+state files in .cache/mixterioso (quota, discovery, watch index, encoders).
+
+Items are evicted least recently used first, where last use is the newest
+atime/mtime of the file (or of any file inside a directory), until the
+evictable total fits the budget. Items used within --min-age, and items of
+slugs a worker holds locked, are kept, so a render that is still reading its
+stems is not pulled out from under it.
+
+Background policy: with MIXTERIOSO_CACHE_BUDGET set (e.g. "20G"), main.py
+starts a detached collection after each pipeline run.
+
+Usage:
+    python3 -m scripts.cache_gc --budget 20G
+    python3 -m scripts.cache_gc --budget 5G --dry-run
+    python3 -m scripts.cache_gc                    # report sizes only
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .audio_cache import CONTAINERS
+from .common import Paths, log, BOLD, CYAN, GREEN, RESET, WHITE, YELLOW
+from .journal import slug_locked
+
+BUDGET_ENV = "MIXTERIOSO_CACHE_BUDGET"
+DEFAULT_MIN_AGE_SECS = 600
+
+CATEGORIES = ("mix_wav", "stems", "segments", "audio", "previews", "asr", "scratch", "ass")
+
+
+@dataclass
+class CacheItem:
+    category: str
+    path: Path
+    size: int
+    last_used: float
+    slug: Optional[str] = None
+
+
+# ─────────────────────────────────────────────
+# Sizes
+# ─────────────────────────────────────────────
+_SIZE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([kmgt]?)i?b?\s*$", re.IGNORECASE)
+_UNITS = {"": 1, "k": 1 << 10, "m": 1 << 20, "g": 1 << 30, "t": 1 << 40}
+
+
+def parse_size(text: str) -> int:
+    """'20G' / '512M' / '1.5t' / '1048576' -> bytes (binary units)."""
+    m = _SIZE_RE.match(text)
+    if not m:
+        raise ValueError(f"Bad size: {text!r} (expected e.g. 20G, 512M)")
+    return int(float(m.group(1)) * _UNITS[m.group(2).lower()])
+
+
+def human(n: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(n) < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TiB"
+
+
+# ─────────────────────────────────────────────
+# Scan
+# ─────────────────────────────────────────────
+def _file_item(category: str, p: Path, slug: Optional[str] = None) -> Optional[CacheItem]:
+    try:
+        st = p.stat()
+    except OSError:
+        return None
+    return CacheItem(category, p, st.st_size, max(st.st_atime, st.st_mtime), slug)
+
+
+def _dir_item(category: str, d: Path, slug: Optional[str] = None) -> Optional[CacheItem]:
+    size, last = 0, 0.0
+    for root, _, names in os.walk(d):
+        for name in names:
+            try:
+                st = os.stat(os.path.join(root, name))
+            except OSError:
+                continue
+            size += st.st_size
+            last = max(last, st.st_atime, st.st_mtime)
+    if last == 0.0:
+        try:
+            last = d.stat().st_mtime
+        except OSError:
+            return None
+    return CacheItem(category, d, size, last, slug)
+
+
+def _subdirs(d: Path) -> Iterable[Path]:
+    try:
+        return [p for p in d.iterdir() if p.is_dir()]
+    except OSError:
+        return []
+
+
+def _files(d: Path, pattern: str) -> Iterable[Path]:
+    try:
+        return [p for p in d.glob(pattern) if p.is_file()]
+    except OSError:
+        return []
+
+
+def scan(paths: Paths) -> List[CacheItem]:
+    """Every evictable item in the tree (see module docstring for the rules).
+
+    Items of slugs a worker currently holds locked (journal.slug_lock) are left out.
+    """
+    items: List[Optional[CacheItem]] = []
+
+    for wav in _files(paths.mixes, "*.wav"):
+        slug = wav.stem
+        if (paths.mixes / f"{slug}.mp3").exists() or (paths.mp3s / f"{slug}.mp3").exists():
+            items.append(_file_item("mix_wav", wav, slug))
+
+    for d in _subdirs(paths.separated / "htdemucs"):
+        items.append(_dir_item("stems", d, d.name))
+
+    for sub in ("segments", "segments_tmp"):
+        for d in _subdirs(paths.cache / sub):
+            items.append(_dir_item("segments", d, d.name))
+
+    for ext in sorted(set(CONTAINERS.values())):
+        for p in _files(paths.cache / "audio", f"*{ext}"):
+            items.append(_file_item("audio", p))
+    for p in _files(paths.cache / "previews", "*.wav"):
+        items.append(_file_item("previews", p))
+    for p in _files(paths.cache / "align", "*.json"):
+        items.append(_file_item("asr", p))
+    for pattern in ("*.srt", "black_*.png"):
+        for p in _files(paths.cache, pattern):
+            items.append(_file_item("scratch", p, p.stem if p.suffix == ".srt" else None))
+
+    for pattern in ("*.ass", "*.ffconcat", "*.draft.mp4"):
+        for p in _files(paths.output, pattern):
+            items.append(_file_item("ass", p, p.name.split(".", 1)[0]))
+
+    locked: Dict[str, bool] = {}
+    out = []
+    for it in items:
+        if it is None:
+            continue
+        if it.slug is not None:
+            if it.slug not in locked:
+                locked[it.slug] = slug_locked(paths, it.slug)
+            if locked[it.slug]:
+                continue
+        out.append(it)
+    return out
+
+
+# ─────────────────────────────────────────────
+# Plan / evict
+# ─────────────────────────────────────────────
+def plan_eviction(
+    items: List[CacheItem],
+    budget: int,
+    *,
+    min_age_secs: float = DEFAULT_MIN_AGE_SECS,
+    now: Optional[float] = None,
+) -> List[CacheItem]:
+    """Least recently used items to drop so the evictable total fits budget."""
+    now = time.time() if now is None else now
+    total = sum(it.size for it in items)
+    victims: List[CacheItem] = []
+    for it in sorted(items, key=lambda it: it.last_used):
+        if total <= budget:
+            break
+        if now - it.last_used < min_age_secs:
+            continue
+        victims.append(it)
+        total -= it.size
+    return victims
+
+
+def evict(items: Iterable[CacheItem]) -> Tuple[int, List[CacheItem]]:
+    """Delete items; (bytes reclaimed, items actually removed)."""
+    reclaimed = 0
+    removed: List[CacheItem] = []
+    for it in items:
+        try:
+            if it.path.is_dir():
+                shutil.rmtree(it.path)
+            else:
+                it.path.unlink()
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            log("GC", f"Could not remove {it.path}: {e}", YELLOW)
+            continue
+        reclaimed += it.size
+        removed.append(it)
+    return reclaimed, removed
+
+
+def _by_category(items: Iterable[CacheItem]) -> Dict[str, Tuple[int, int]]:
+    out: Dict[str, Tuple[int, int]] = {c: (0, 0) for c in CATEGORIES}
+    for it in items:
+        n, size = out[it.category]
+        out[it.category] = (n + 1, size + it.size)
+    return out
+
+
+def print_report(items: List[CacheItem], removed: List[CacheItem], budget: Optional[int], *, dry_run: bool) -> None:
+    before = _by_category(items)
+    gone = _by_category(removed)
+    print()
+    print(f"{BOLD}{'category':10s} {'items':>6s} {'size':>11s} {'evicted':>11s} {'after':>11s}{RESET}")
+    for cat in CATEGORIES:
+        n, size = before[cat]
+        _, freed = gone[cat]
+        print(f"{cat:10s} {n:6d} {human(size):>11s} {human(freed):>11s} {human(size - freed):>11s}")
+    total = sum(it.size for it in items)
+    freed = sum(it.size for it in removed)
+    print(f"{'total':10s} {len(items):6d} {human(total):>11s} {human(freed):>11s} {human(total - freed):>11s}")
+    if budget is not None:
+        verb = "Would reclaim" if dry_run else "Reclaimed"
+        color = GREEN if total - freed <= budget else YELLOW
+        log("GC", f"{verb} {human(freed)} from {len(removed)} items; {human(total - freed)} of {human(budget)} budget used", color)
+
+
+def _refresh_catalog(paths: Paths, removed: Iterable[CacheItem]) -> None:
+    from .catalog import catalog_path, update_slug
+
+    if not catalog_path(paths.meta).exists():
+        return
+    for slug in sorted({it.slug for it in removed if it.slug and it.category in ("mix_wav", "stems")}):
+        update_slug(paths, slug)
+
+
+def collect(
+    paths: Paths,
+    budget: int,
+    *,
+    min_age_secs: float = DEFAULT_MIN_AGE_SECS,
+    dry_run: bool = False,
+    report: bool = True,
+) -> int:
+    """Scan, evict LRU items over budget, print the report; returns bytes reclaimed (or that would be)."""
+    t0 = time.perf_counter()
+    items = scan(paths)
+    victims = plan_eviction(items, budget, min_age_secs=min_age_secs)
+    if dry_run:
+        reclaimed, removed = sum(it.size for it in victims), victims
+    else:
+        reclaimed, removed = evict(victims)
+    if report:
+        for it in removed:
+            age_h = (time.time() - it.last_used) / 3600
+            log("GC", f"{'would evict' if dry_run else 'evicted'} {it.category:9s} {human(it.size):>10s}  idle {age_h:6.1f}h  {it.path}", WHITE)
+        print_report(items, removed, budget, dry_run=dry_run)
+        log("GC", f"Scanned {len(items)} items in {time.perf_counter() - t0:.2f}s", CYAN)
+    if not dry_run:
+        _refresh_catalog(paths, removed)
+    return reclaimed
+
+
+def budget_from_env() -> Optional[int]:
+    raw = os.getenv(BUDGET_ENV, "").strip()
+    if not raw:
+        return None
+    try:
+        return parse_size(raw)
+    except ValueError as e:
+        log("GC", f"Ignoring {BUDGET_ENV}: {e}", YELLOW)
+        return None
+
+
+def collect_in_background(paths: Paths) -> bool:
+    """Start a detached GC run if MIXTERIOSO_CACHE_BUDGET is set; output goes to meta/cache_gc.log."""
+    budget = budget_from_env()
+    if budget is None:
+        return False
+    paths.meta.mkdir(parents=True, exist_ok=True)
+    with (paths.meta / "cache_gc.log").open("ab") as out:
+        subprocess.Popen(
+            [sys.executable, "-m", "scripts.cache_gc", "--budget", str(budget)],
+            cwd=str(paths.root),
+            stdin=subprocess.DEVNULL,
+            stdout=out,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+    log("GC", f"Background cache GC started (budget {human(budget)})", CYAN)
+    return True
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Evict derivable artifacts (LRU) to fit a disk budget")
+    ap.add_argument("--budget", default=None, help=f"e.g. 20G, 512M (default: ${BUDGET_ENV}; none = report only)")
+    ap.add_argument("--min-age", type=float, default=DEFAULT_MIN_AGE_SECS / 60, help="Keep items used in the last N minutes")
+    ap.add_argument("--dry-run", action="store_true", help="Show what would be evicted")
+    args = ap.parse_args(argv)
+
+    paths = Paths.from_scripts_dir(Path(__file__).resolve().parent)
+    budget = parse_size(args.budget) if args.budget else budget_from_env()
+    if budget is None:
+        print_report(scan(paths), [], None, dry_run=True)
+        return 0
+    collect(paths, budget, min_age_secs=args.min_age * 60, dry_run=args.dry_run)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
+# end of cache_gc.py
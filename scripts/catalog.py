@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""Pipeline catalog: one SQLite index of every slug's state.
+
+meta/catalog.sqlite holds, per slug:
+- songs      artist/title/query, lyric + audio + caption sources, language,
+             mix mode and stem levels, sync source, offset, duration, video id
+- artifacts  one row per produced file (kind, path, size, mtime, SHA-1)
+
+Every stage calls update_slug() when it finishes; it reads the step meta
+files (step1 summary, mix.json, offset), stats the slug's known artifact paths (re-hashing only files whose size/mtime changed) and upserts
+the song fields it was given, so the catalog never needs a directory walk to
+answer questions. `rebuild` backfills it from an existing tree.
+
+Usage:
+    python3 -m scripts.catalog status                      # counts per artifact kind
+    python3 -m scripts.catalog status --has stems --missing mp4
+    python3 -m scripts.catalog status --slug my_song
+    python3 -m scripts.catalog rebuild
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import json
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .common import Paths, ffprobe_duration_secs, file_sha1, log, CYAN, GREEN, YELLOW
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS songs (
+    slug            TEXT PRIMARY KEY,
+    artist          TEXT,
+    title           TEXT,
+    query           TEXT,
+    lang            TEXT,
+    lyrics_source   TEXT,
+    audio_source    TEXT,
+    captions_source TEXT,
+    youtube_source  TEXT,
+    mix_mode        TEXT,
+    vocals_pct      REAL,
+    bass_pct        REAL,
+    drums_pct       REAL,
+    other_pct       REAL,
+    sync_source     TEXT,
+    offset_secs     REAL,
+    duration_secs   REAL,
+    video_id        TEXT,
+    updated_at      REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    slug       TEXT NOT NULL,
+    kind       TEXT NOT NULL,
+    path       TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    mtime_ns   INTEGER NOT NULL,
+    sha1       TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (slug, kind)
+);
+CREATE INDEX IF NOT EXISTS artifacts_kind ON artifacts (kind, slug);
+CREATE INDEX IF NOT EXISTS songs_artist ON songs (artist);
+CREATE INDEX IF NOT EXISTS songs_sync ON songs (sync_source);
+"""
+
+SONG_FIELDS = (
+    "artist", "title", "query", "lang", "lyrics_source", "audio_source", "captions_source",
+    "youtube_source", "mix_mode", "vocals_pct", "bass_pct", "drums_pct", "other_pct",
+    "sync_source", "offset_secs", "duration_secs", "video_id",
+)
+
+# Directories (stems) are recorded without a hash.
+NO_HASH_KINDS = {"stems"}
+
+
+def artifact_paths(paths: Paths, slug: str, vtt_names: Optional[List[str]] = None) -> Dict[str, Path]:
+    """kind -> where that artifact lives for slug (vtt_names: pre-sorted timings/*.vtt names, for bulk scans)."""
+    out = {
+        "txt": paths.txts / f"{slug}.txt",
+        "mp3": paths.mp3s / f"{slug}.mp3",
+        "lrc": paths.timings / f"{slug}.lrc",
+        "csv": paths.timings / f"{slug}.csv",
+        "offset": paths.timings / f"{slug}.offset",
+        "warp": paths.timings / f"{slug}.warp.json",
+        "stems": paths.separated / "htdemucs" / slug,
+        "mix_mp3": paths.mixes / f"{slug}.mp3",
+        "mix_wav": paths.mixes / f"{slug}.wav",
+        "mp4": paths.output / f"{slug}.mp4",
+        "thumb": paths.output / f"{slug}.jpg",
+    }
+    if vtt_names is None:
+        vtt_names = sorted(p.name for p in paths.timings.glob(f"{slug}*.vtt")) if paths.timings.exists() else []
+    i = bisect.bisect_left(vtt_names, slug)
+    if i < len(vtt_names) and vtt_names[i].startswith(slug):
+        out["vtt"] = paths.timings / vtt_names[i]
+    return out
+
+
+class Catalog:
+    """Short-lived connections per call (safe to share between threads and processes)."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as db, db:
+            db.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(str(self.path), timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    # ── writes ───────────────────────────────
+    def upsert_song(self, db: sqlite3.Connection, slug: str, fields: Dict[str, Any]) -> None:
+        fields = {k: v for k, v in fields.items() if k in SONG_FIELDS and v is not None}
+        now = time.time()
+        db.execute("INSERT OR IGNORE INTO songs (slug, updated_at) VALUES (?, ?)", (slug, now))
+        if fields:
+            sets = ", ".join(f"{k} = ?" for k in fields)
+            db.execute(f"UPDATE songs SET {sets}, updated_at = ? WHERE slug = ?", (*fields.values(), now, slug))
+
+    def scan_artifacts(self, db: sqlite3.Connection, slug: str, found: Dict[str, Path]) -> Optional[Path]:
+        """Sync artifact rows with the filesystem; returns the audio file if it changed (for duration)."""
+        known = {
+            kind: (size, mtime, sha1)
+            for kind, size, mtime, sha1 in db.execute(
+                "SELECT kind, size_bytes, mtime_ns, sha1 FROM artifacts WHERE slug = ?", (slug,)
+            )
+        }
+        changed_audio = None
+        now = time.time()
+        for kind, p in found.items():
+            try:
+                st = p.stat()
+            except OSError:
+                if kind in known:
+                    db.execute("DELETE FROM artifacts WHERE slug = ? AND kind = ?", (slug, kind))
+                continue
+            prev = known.get(kind)
+            if prev and prev[0] == st.st_size and prev[1] == st.st_mtime_ns:
+                continue
+            sha1 = None if kind in NO_HASH_KINDS or p.is_dir() else file_sha1(p)
+            db.execute(
+                "INSERT OR REPLACE INTO artifacts (slug, kind, path, size_bytes, mtime_ns, sha1, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (slug, kind, str(p), st.st_size, st.st_mtime_ns, sha1, now),
+            )
+            if kind in ("mix_mp3", "mp3") and (changed_audio is None or kind == "mix_mp3"):
+                changed_audio = p
+        return changed_audio
+
+    def update(self, paths: Paths, slug: str, *, vtt_names: Optional[List[str]] = None, **fields: Any) -> None:
+        with closing(self._connect()) as db, db:
+            self.upsert_song(db, slug, fields)
+            audio = self.scan_artifacts(db, slug, artifact_paths(paths, slug, vtt_names))
+            if audio is not None and "duration_secs" not in fields:
+                dur = ffprobe_duration_secs(audio)
+                if dur > 0:
+                    db.execute("UPDATE songs SET duration_secs = ? WHERE slug = ?", (dur, slug))
+
+    # ── reads ────────────────────────────────
+    def song(self, slug: str) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as db:
+            db.row_factory = sqlite3.Row
+            row = db.execute("SELECT * FROM songs WHERE slug = ?", (slug,)).fetchone()
+        return dict(row) if row else None
+
+    def artifacts(self, slug: str) -> List[Tuple[str, str, int, Optional[str]]]:
+        with closing(self._connect()) as db:
+            return db.execute(
+                "SELECT kind, path, size_bytes, sha1 FROM artifacts WHERE slug = ? ORDER BY kind", (slug,)
+            ).fetchall()
+
+    def kind_counts(self) -> List[Tuple[str, int]]:
+        with closing(self._connect()) as db:
+            return db.execute("SELECT kind, COUNT(*) FROM artifacts GROUP BY kind ORDER BY kind").fetchall()
+
+    def song_count(self) -> int:
+        with closing(self._connect()) as db:
+            return int(db.execute("SELECT COUNT(*) FROM songs").fetchone()[0])
+
+    def slugs_where(self, *, has: Sequence[str] = (), missing: Sequence[str] = ()) -> List[str]:
+        """Slugs that have every kind in `has` and none of `missing` (indexed EXISTS lookups)."""
+        clauses, args = [], []
+        for kind in has:
+            clauses.append("EXISTS (SELECT 1 FROM artifacts a WHERE a.slug = s.slug AND a.kind = ?)")
+            args.append(kind)
+        for kind in missing:
+            clauses.append("NOT EXISTS (SELECT 1 FROM artifacts a WHERE a.slug = s.slug AND a.kind = ?)")
+            args.append(kind)
+        where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+        with closing(self._connect()) as db:
+            return [r[0] for r in db.execute(f"SELECT slug FROM songs s {where} ORDER BY slug", args)]
+
+
+def catalog_path(meta_dir: Path) -> Path:
+    return meta_dir / "catalog.sqlite"
+
+
+def update_slug(paths: Paths, slug: str, **fields: Any) -> None:
+    """
+    Record a finished stage: explicit fields over what the step meta files say.
+    Never lets a catalog problem fail the pipeline.
+    """
+    try:
+        t0 = time.perf_counter()
+        merged = {**fields_from_files(paths, slug), **{k: v for k, v in fields.items() if v is not None}}
+        Catalog(catalog_path(paths.meta)).update(paths, slug, **merged)
+        log("CATALOG", f"Updated {slug} in {1000 * (time.perf_counter() - t0):.0f} ms", CYAN)
+    except Exception as e:
+        log("CATALOG", f"Could not update catalog for {slug}: {e}", YELLOW)
+
+
+def song_meta(meta_dir: Path, slug: str) -> Optional[Dict[str, Any]]:
+    """Song row as a meta dict (None if there is no catalog or no row); does not create the DB."""
+    path = catalog_path(meta_dir)
+    if not path.exists():
+        return None
+    try:
+        row = Catalog(path).song(slug)
+    except Exception:
+        return None
+    if row is None:
+        return None
+    meta = {k: v for k, v in row.items() if v is not None}
+    if meta.get("mix_mode") != "stems":
+        # Full mixes keep every stem at 100%; that is not worth a title suffix.
+        for stem in ("vocals", "bass", "drums", "other"):
+            meta.pop(f"{stem}_pct", None)
+    meta["_meta_path"] = str(path)
+    return meta
+
+
+# ─────────────────────────────────────────────
+# Backfill
+# ─────────────────────────────────────────────
+def _read_json(path: Path) -> Dict[str, Any]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def fields_from_files(paths: Paths, slug: str) -> Dict[str, Any]:
+    """Song fields recoverable from meta/<slug>.step1.json, mixes/<slug>.mix.json and the offset file."""
+    fields: Dict[str, Any] = {}
+    step1 = _read_json(paths.meta / f"{slug}.step1.json")
+    for k in ("artist", "title", "query", "lang", "lyrics_source", "audio_source", "captions_source"):
+        if step1.get(k):
+            fields[k] = step1[k]
+    picked = step1.get("youtube_picked")
+    if isinstance(picked, dict) and picked.get("id"):
+        fields["youtube_source"] = picked["id"]
+    mix = _read_json(paths.mixes / f"{slug}.mix.json")
+    if mix.get("mode"):
+        fields["mix_mode"] = mix["mode"]
+    for stem, pct in (mix.get("levels_percent") or {}).items():
+        if stem in ("vocals", "bass", "drums", "other"):
+            fields[f"{stem}_pct"] = float(pct)
+    try:
+        fields["offset_secs"] = float((paths.timings / f"{slug}.offset").read_text(encoding="utf-8").strip())
+    except Exception:
+        pass
+    return fields
+
+
+def known_slugs(paths: Paths) -> List[str]:
+    slugs = set()
+    for d, pattern, suffix in (
+        (paths.mp3s, "*.mp3", ".mp3"),
+        (paths.timings, "*.csv", ".csv"),
+        (paths.output, "*.mp4", ".mp4"),
+        (paths.meta, "*.step1.json", ".step1.json"),
+    ):
+        if d.exists():
+            for p in d.glob(pattern):
+                name = p.name[: -len(suffix)]
+                if d == paths.timings and name.endswith(".words"):
+                    continue
+                slugs.add(name)
+    return sorted(slugs)
+
+
+def rebuild(paths: Paths, slugs: Optional[Iterable[str]] = None) -> int:
+    cat = Catalog(catalog_path(paths.meta))
+    vtt_names = sorted(p.name for p in paths.timings.glob("*.vtt")) if paths.timings.exists() else []
+    n = 0
+    for slug in slugs or known_slugs(paths):
+        cat.update(paths, slug, vtt_names=vtt_names, **fields_from_files(paths, slug))
+        n += 1
+    return n
+
+
+# ─────────────────────────────────────────────
+# CLI
+# ─────────────────────────────────────────────
+def _print_slug(cat: Catalog, slug: str) -> None:
+    song = cat.song(slug)
+    if song is None:
+        print(f"'{slug}' is not in the catalog")
+        return
+    print(f"Pipeline status for '{slug}':")
+    for k in SONG_FIELDS:
+        if song.get(k) is not None:
+            print(f"  {k:16s}: {song[k]}")
+    print("  artifacts:")
+    for kind, path, size, sha1 in cat.artifacts(slug):
+        print(f"    {kind:8s} {size / 1e6:9.2f} MB  {(sha1 or '')[:12]:12s}  {path}")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Query or rebuild the pipeline catalog (meta/catalog.sqlite)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    st = sub.add_parser("status", help="Catalog-wide or per-slug status")
+    st.add_argument("--slug", default=None)
+    st.add_argument("--has", action="append", default=[], help="Artifact kind that must exist (repeatable)")
+    st.add_argument("--missing", action="append", default=[], help="Artifact kind that must be absent (repeatable)")
+    rb = sub.add_parser("rebuild", help="Backfill from the files on disk")
+    rb.add_argument("--slug", action="append", default=None)
+    args = ap.parse_args(argv)
+
+    paths = Paths.from_scripts_dir(Path(__file__).resolve().parent)
+    if args.cmd == "rebuild":
+        t0 = time.perf_counter()
+        n = rebuild(paths, args.slug)
+        log("CATALOG", f"Indexed {n} slug(s) in {time.perf_counter() - t0:.2f}s", GREEN)
+        return 0
+
+    cat = Catalog(catalog_path(paths.meta))
+    t0 = time.perf_counter()
+    if args.slug:
+        _print_slug(cat, args.slug)
+    elif args.has or args.missing:
+        slugs = cat.slugs_where(has=args.has, missing=args.missing)
+        for s in slugs:
+            print(s)
+        print(f"{len(slugs)} slug(s)")
+    else:
+        print(f"{cat.song_count()} song(s)")
+        for kind, n in cat.kind_counts():
+            print(f"  {kind:8s} {n}")
+    log("CATALOG", f"Query took {1000 * (time.perf_counter() - t0):.1f} ms", CYAN)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
+# end of catalog.py
@@ -12,16 +12,19 @@ Design goals:
 from __future__ import annotations
 
 import csv
+import hashlib
 import json
 import os
 import re
 import shutil
 import subprocess
 import sys
+import threading
 import time
+from contextlib import ExitStack, contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Iterable, List, Optional, Tuple
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 # -----------------------------
 # Logging
@@ -57,6 +60,7 @@ class Paths:
     output: Path
     meta: Path
     cache: Path
+    inbox: Path
 
     @staticmethod
     def from_scripts_dir(scripts_path: Path) -> "Paths":
@@ -77,6 +81,7 @@ class Paths:
             output=root / "output",
             meta=root / "meta",
             cache=root / ".cache" / "mixterioso",
+            inbox=root / "timings_inbox",
         )
 
     def ensure(self) -> None:
@@ -90,6 +95,7 @@ class Paths:
             self.output,
             self.meta,
             self.cache,
+            self.inbox,
         ]:
             d.mkdir(parents=True, exist_ok=True)
 
@@ -189,6 +195,58 @@ def slugify(title: str) -> str:
 # -----------------------------
 # IO helpers
 # -----------------------------
+def temp_path_for(path: Path, *, keep_suffix: bool = False) -> Path:
+    """Unique sibling of path for an in-progress write.
+
+    keep_suffix keeps the real extension last (<stem>.<pid>-<tid>.tmp.mp4) so
+    ffmpeg can infer the container; otherwise ".tmp" is last, which keeps
+    half-written .csv/.lrc/.offset files out of extension-based globs.
+    """
+    tag = f"{os.getpid()}-{threading.get_ident()}"
+    if keep_suffix and path.suffix:
+        return path.with_name(f"{path.stem}.{tag}.tmp{path.suffix}")
+    return path.with_name(f"{path.name}.{tag}.tmp")
+
+
+@contextmanager
+def atomic_output(path: Path, *, keep_suffix: bool = True) -> Iterator[Path]:
+    """Yield a temp path to write instead of path; renamed over path only if the block succeeds.
+
+    Readers never see a truncated artifact: path is either the old file or the
+    complete new one. Raise inside the block on tool failure, so the partial
+    output is discarded instead of committed. A block that finishes without
+    writing the temp file raises too, rather than leaving the old path in place
+    as if it were the new output.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = temp_path_for(path, keep_suffix=keep_suffix)
+    try:
+        yield tmp
+        if not tmp.exists():
+            raise RuntimeError(f"{tmp} was not produced")
+        os.replace(tmp, path)
+    finally:
+        try:
+            tmp.unlink()
+        except FileNotFoundError:
+            pass
+
+
+@contextmanager
+def atomic_outputs(paths: Sequence[Optional[Path]]) -> Iterator[List[Optional[Path]]]:
+    """atomic_output for several files written by one command (None entries pass through)."""
+    with ExitStack() as stack:
+        yield [stack.enter_context(atomic_output(p)) if p is not None else None for p in paths]
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    with atomic_output(path, keep_suffix=False) as tmp:
+        with tmp.open("w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+
+
 def write_text(path: Path, text: str, flags: IOFlags, *, label: str) -> None:
     if not should_write(path, flags, label=label):
         log(label.upper(), f"Reusing existing: {path}", YELLOW)
@@ -196,8 +254,7 @@ def write_text(path: Path, text: str, flags: IOFlags, *, label: str) -> None:
     if flags.dry_run:
         log(label.upper(), f"[dry-run] Would write {path}", BLUE)
         return
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(text, encoding="utf-8")
+    atomic_write_text(path, text)
     log(label.upper(), f"Wrote {path}", GREEN)
 
 
@@ -208,8 +265,7 @@ def write_json(path: Path, obj: Any, flags: IOFlags, *, label: str) -> None:
     if flags.dry_run:
         log(label.upper(), f"[dry-run] Would write {path}", BLUE)
         return
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(obj, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    atomic_write_text(path, json.dumps(obj, indent=2, ensure_ascii=False) + "\n")
     log(label.upper(), f"Wrote {path}", GREEN)
 
 
@@ -220,15 +276,34 @@ def write_csv_rows(path: Path, rows: List[Tuple[int, float, str]], flags: IOFlag
     if flags.dry_run:
         log(label.upper(), f"[dry-run] Would write {path} ({len(rows)} rows)", BLUE)
         return
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        w.writerow(["line_index", "time_secs", "text"])
-        for li, t, txt in rows:
-            w.writerow([li, f"{t:.3f}", txt])
+    with atomic_output(path, keep_suffix=False) as tmp:
+        with tmp.open("w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["line_index", "time_secs", "text"])
+            for li, t, txt in rows:
+                w.writerow([li, f"{t:.3f}", txt])
     log(label.upper(), f"Wrote {path} ({len(rows)} rows)", GREEN)
 
 
+_SHA1_MEMO: dict[tuple[str, int, int], str] = {}
+
+
+def file_sha1(path: Path) -> str:
+    """SHA-1 of a file's bytes, memoized per process by (path, size, mtime_ns)."""
+    st = path.stat()
+    key = (str(path), st.st_size, st.st_mtime_ns)
+    hit = _SHA1_MEMO.get(key)
+    if hit is not None:
+        return hit
+    h = hashlib.sha1()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    _SHA1_MEMO[key] = digest
+    return digest
+
+
 def have_exe(name: str) -> bool:
     return shutil.which(name) is not None
 
@@ -298,20 +373,20 @@ def clamp(v: float, lo: float, hi: float) -> float:
     return max(lo, min(hi, v))
 
 
-def write_csv(path: Path, header: list[str], rows: list[list[str]], flags: IOFlags, *, label: str) -> None:
-    """Write CSV safely with the overwrite/confirm contract."""
+def write_csv(path: Path, header: list[str], rows: list[list[str]], flags: IOFlags, *, label: str) -> bool:
+    """Write CSV safely with the overwrite/confirm contract; True if the file was written."""
     if not should_write(path, flags, label=label):
-        return
+        return False
     if flags.dry_run:
         log('DRYRUN', f"Would write CSV: {path}", YELLOW)
-        return
-    path.parent.mkdir(parents=True, exist_ok=True)
-    import csv
-    with path.open('w', encoding='utf-8', newline='') as f:
-        w = csv.writer(f)
-        w.writerow(header)
-        w.writerows(rows)
+        return False
+    with atomic_output(path, keep_suffix=False) as tmp:
+        with tmp.open('w', encoding='utf-8', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(header)
+            w.writerows(rows)
     log(label.upper(), f"Wrote {path}", GREEN)
+    return True
 
 
 # end of common.py
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""Portable H.264 encoder selection + encoding profile for lyric videos.
+
+Our video is a black background with static text that changes only at lyric
+boundaries, so the profile is:
+- libx264 -tune stillimage (CRF, veryfast) when available
+- long GOP (GOP_SECS), scene-cut keyframes off
+- keyframes forced at lyric boundaries only (-force_key_frames)
+
+The x264 preset and CRF below come from scripts/bench_render.py (numbers next
+to the constants). bench_render.py --apply on the target machine stores its
+own pick in meta/render_profile.json, which takes precedence. GOP_SECS and the
+hardware-encoder bitrates are not benchmarked: keyframes at lyric boundaries
+are forced anyway, so GOP_SECS only caps the distance between them.
+
+The available encoders are probed once (ffmpeg -encoders + a tiny test encode,
+since e.g. h264_videotoolbox/h264_nvenc can be listed but unusable) and cached
+in .cache/mixterioso/encoders.json per ffmpeg binary.
+
+Env:
+    MIXTERIOSO_VIDEO_ENCODER   force an encoder name (still test-encoded)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import subprocess
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from .common import atomic_write_text, log, CYAN, YELLOW
+
+CACHE_PATH = Path(__file__).resolve().parent.parent / ".cache" / "mixterioso" / "encoders.json"
+PROFILE_PATH = Path(__file__).resolve().parent.parent / "meta" / "render_profile.json"
+
+# Best first. libx264 wins for still text (stillimage tune, CRF); hardware
+# encoders are kept as fallbacks for ffmpeg builds without GPL x264.
+ENCODER_PREFERENCE = [
+    "libx264",
+    "h264_videotoolbox",
+    "h264_nvenc",
+    "h264_qsv",
+    "libopenh264",
+    "mpeg4",
+]
+
+# x264 defaults from the bench_render.py default matrix (sparse/dense/long lyric
+# cases, 30 s each, 854x480 + 1280x720 at 5 + 10 fps, ultrafast..medium x CRF
+# 22/26/30; ffmpeg 7.0.2, one Xeon core). Every setting cleared SSIM 0.985;
+# veryfast/30 was the smallest output:
+#   all 12 runs: worst SSIM 0.9985, worst PSNR 41.2 dB, 2.62 MB total
+#                (CRF 26: 3.23 MB, +23%; ultrafast/30: 7.88 MB; superfast/30: 2.81 MB)
+#   854x480@5 (the renderer default): 14 / 77 / 56 kbps, SSIM 0.9996 / 0.9993 / 0.9990,
+#                16-32x realtime including libass (CRF 26: 17 / 94 / 70 kbps)
+# faster/medium were 12-19% larger at the same CRF and ~25% slower at 480p@5.
+# Speed never reached bench_render's --min-speed 20 on the 720p@10 cases on one
+# core (libass dominates there), so the pick was made at --min-speed 4.
+GOP_SECS = 60.0
+X264_PRESET = "veryfast"
+X264_CRF = 30
+HW_BITRATE = "1200k"
+HW_MAXRATE = "1800k"
+HW_BUFSIZE = "2400k"
+
+
+def _ffmpeg() -> str:
+    return shutil.which("ffmpeg") or "ffmpeg"
+
+
+@lru_cache(maxsize=4)
+def _listed_encoders(ffmpeg: str) -> List[str]:
+    try:
+        out = subprocess.run(
+            [ffmpeg, "-hide_banner", "-encoders"],
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).stdout
+    except Exception:
+        return []
+    names = []
+    for line in out.splitlines():
+        parts = line.split()
+        # " V....D libx264   libx264 H.264 / AVC ..."
+        if len(parts) >= 2 and parts[0].startswith("V"):
+            names.append(parts[1])
+    return names
+
+
+def _test_encode(ffmpeg: str, encoder: str) -> bool:
+    cmd = [
+        ffmpeg, "-hide_banner", "-loglevel", "error",
+        "-f", "lavfi", "-i", "color=c=black:s=256x144:r=5:d=0.4",
+        "-c:v", encoder, "-pix_fmt", "yuv420p",
+        "-f", "null", "-",
+    ]
+    try:
+        return subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=20).returncode == 0
+    except Exception:
+        return False
+
+
+def _ffmpeg_key(ffmpeg: str) -> str:
+    try:
+        st = Path(ffmpeg).stat()
+        return f"{ffmpeg}:{st.st_size}:{st.st_mtime_ns}"
+    except Exception:
+        return ffmpeg
+
+
+def _load_cache() -> Dict[str, Dict[str, bool]]:
+    try:
+        return json.loads(CACHE_PATH.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
+def _save_cache(data: Dict[str, Dict[str, bool]]) -> None:
+    try:
+        atomic_write_text(CACHE_PATH, json.dumps(data, indent=2) + "\n")
+    except Exception:
+        pass
+
+
+def encoder_works(encoder: str) -> bool:
+    """Listed by this ffmpeg and passes a test encode (cached per ffmpeg binary)."""
+    ffmpeg = _ffmpeg()
+    key = _ffmpeg_key(ffmpeg)
+    cache = _load_cache()
+    known = cache.setdefault(key, {})
+    if encoder not in known:
+        known[encoder] = encoder in _listed_encoders(ffmpeg) and _test_encode(ffmpeg, encoder)
+        _save_cache(cache)
+    return bool(known[encoder])
+
+
+@lru_cache(maxsize=1)
+def render_profile() -> Dict[str, object]:
+    """Benchmarked defaults ({encoder, preset, crf}) if bench_render.py --apply wrote them."""
+    try:
+        data = json.loads(PROFILE_PATH.read_text(encoding="utf-8"))
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+@lru_cache(maxsize=1)
+def pick_encoder() -> str:
+    forced = os.environ.get("MIXTERIOSO_VIDEO_ENCODER", "").strip()
+    benchmarked = str(render_profile().get("encoder") or "")
+    candidates = [e for e in (forced, benchmarked) if e] + ENCODER_PREFERENCE
+    for enc in candidates:
+        if encoder_works(enc):
+            log("ENCODER", f"Using video encoder {enc}", CYAN)
+            return enc
+        if enc == forced:
+            log("ENCODER", f"MIXTERIOSO_VIDEO_ENCODER={forced} is not usable here; probing defaults", YELLOW)
+    raise RuntimeError("No working H.264/MPEG-4 video encoder found in ffmpeg")
+
+
+def keyframe_times(times: Sequence[float], *, fps: float, duration: Optional[float] = None) -> List[float]:
+    """Sorted lyric boundary times snapped to the frame grid, deduplicated, 0 excluded."""
+    out: List[float] = []
+    for t in sorted(times):
+        t = round(t * fps) / fps
+        if t <= 0 or (duration is not None and t >= duration):
+            continue
+        if not out or t - out[-1] >= 1.0 / fps:
+            out.append(t)
+    return out
+
+
+def video_args(
+    *,
+    fps: float,
+    keyframes: Sequence[float] = (),
+    encoder: Optional[str] = None,
+    preset: Optional[str] = None,
+    crf: Optional[int] = None,
+    gop_frames: Optional[int] = None,
+) -> List[str]:
+    """ffmpeg output args for the video stream (codec, rate control, GOP, pix_fmt).
+
+    gop_frames overrides the GOP_SECS-based GOP (VFR streams count frames, not seconds).
+    """
+    enc = encoder or pick_encoder()
+    profile = render_profile() if enc == render_profile().get("encoder") else {}
+    preset = preset or str(profile.get("preset") or X264_PRESET)
+    crf = crf if crf is not None else int(profile.get("crf") or X264_CRF)
+    gop = gop_frames or max(1, int(round(GOP_SECS * fps)))
+    args = ["-c:v", enc]
+    if enc == "libx264":
+        args += [
+            "-preset", preset,
+            "-tune", "stillimage",
+            "-crf", str(crf),
+            "-sc_threshold", "0",
+        ]
+    elif enc == "mpeg4":
+        args += ["-q:v", "5"]
+    else:
+        args += ["-b:v", HW_BITRATE, "-maxrate", HW_MAXRATE, "-bufsize", HW_BUFSIZE]
+    args += ["-g", str(gop), "-keyint_min", "1", "-pix_fmt", "yuv420p"]
+    if keyframes:
+        args += ["-force_key_frames", ",".join(f"{t:.3f}" for t in keyframes)]
+    return args
+
+
+def main() -> int:
+    for enc in ENCODER_PREFERENCE:
+        print(f"{enc:20s} {'ok' if encoder_works(enc) else '-'}")
+    print(f"selected: {pick_encoder()}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
+# end of encoders.py
@@ -4,25 +4,33 @@ Estimate the time (seconds) of the very first *word* in a song with minimal Whis
 
 Music‑tuned version:
 - Energy detector thresholds adjusted for *soft vocal entrances*
-- Still minimizes Whisper usage
+- Still minimizes Whisper usage: all candidate windows go through one batched
+  call on the shared model pool (whisper_pool), so guard re-runs reuse the model
+- Decodes only the first MAX_SCAN_SECS (+ window tail) once; guard re-runs hit the
+  decode cache, and Whisper windows are slices of that buffer
+- Opt-in: set MIXTERIOSO_FIRST_WORD_WHISPER=1 (otherwise returns None)
 """
 
 import argparse
-import subprocess
+import os
+import time
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional, Tuple, List
 
 import numpy as np
 
+from .audio_io import SR, decode_mono_f32
+from .whisper_pool import transcribe_windows
+
+MAX_SCAN_SECS = 300.0
+
+# Whisper first-word detection is opt-in (the xcorr estimator in main.py needs no model).
+ENV_ENABLE = "MIXTERIOSO_FIRST_WORD_WHISPER"
 
-try:
-    from faster_whisper import WhisperModel
-except Exception as e:
-    raise SystemExit(
-        "Missing dependency faster-whisper. Install with:\n"
-        "  pip3 install faster-whisper\n"
-        f"Original error: {e}"
-    )
+
+def whisper_enabled() -> bool:
+    return os.environ.get(ENV_ENABLE, "").strip().lower() in ("1", "true", "yes", "on")
 
 
 @dataclass
@@ -32,21 +40,21 @@ class FirstWordResult:
     confidence: Optional[float] = None
 
 
-def _ffmpeg_decode_s16le_16k_mono(audio_path: str, bandpass: bool = True) -> np.ndarray:
-    af = []
-    if bandpass:
-        af.append("highpass=f=80")
-        af.append("lowpass=f=6000")
-    af_str = ",".join(af) if af else "anull"
+# Whisper windows can start up to pre_roll before the last candidate and run window_secs past it.
+DECODE_TAIL_SECS = 20.0
+
 
-    cmd = [
-        "ffmpeg", "-hide_banner", "-loglevel", "error",
-        "-i", audio_path, "-ac", "1", "-ar", "16000",
-        "-af", af_str, "-f", "s16le", "pipe:1",
-    ]
-    p = subprocess.run(cmd, check=True, stdout=subprocess.PIPE)
-    pcm16 = np.frombuffer(p.stdout, dtype=np.int16)
-    return pcm16.astype(np.float32) / 32768.0
+@lru_cache(maxsize=2)
+def _decode_cached(audio_path: str, size: int, mtime_ns: int, max_secs: float, bandpass: bool) -> np.ndarray:
+    # size/mtime_ns are part of the key only, so an edited mix is decoded again.
+    af = "highpass=f=80,lowpass=f=6000" if bandpass else None
+    return decode_mono_f32(audio_path, sr=SR, max_secs=max_secs, af=af)
+
+
+def _ffmpeg_decode_s16le_16k_mono(audio_path: str, bandpass: bool = True, max_secs: Optional[float] = None) -> np.ndarray:
+    """First max_secs of audio_path as 16 kHz mono float32 (cached across calls for the same file)."""
+    st = os.stat(audio_path)
+    return _decode_cached(str(audio_path), st.st_size, st.st_mtime_ns, float(max_secs or 0.0) or None, bandpass)
 
 
 def _moving_average(x: np.ndarray, win: int) -> np.ndarray:
@@ -61,24 +69,20 @@ def _moving_average(x: np.ndarray, win: int) -> np.ndarray:
 def _find_voiced_candidates_energy(
     audio_16k: np.ndarray,
     *,
-    sr: int = 16000,
+    sr: int = SR,
     hop_ms: float = 10.0,
     smooth_ms: float = 60.0,
-    max_scan_secs: float = 300.0,
+    max_scan_secs: float = MAX_SCAN_SECS,
     max_candidates: int = 6,
     thresh_db_above_floor: float = 6.0,   # MUSIC‑TUNED (was 12.0)
     min_sustain_ms: float = 200.0,        # MUSIC‑TUNED (was 350.0)
 ) -> List[float]:
-    return []
     max_samples = int(min(len(audio_16k), max_scan_secs * sr))
     if max_samples <= 0:
         return []
 
-    x = audio_16k[:max_samples]
-    env = np.abs(x).astype(np.float32)
-
     hop = max(1, int(sr * hop_ms / 1000.0))
-    env_h = env[::hop]
+    env_h = np.abs(audio_16k[:max_samples:hop])
     smooth_win = max(1, int((smooth_ms / hop_ms)))
     env_s = _moving_average(env_h, smooth_win)
 
@@ -90,43 +94,12 @@ def _find_voiced_candidates_energy(
 
     sustain_frames = max(1, int(min_sustain_ms / hop_ms))
 
-    candidates: List[float] = []
-    run = 0
-    in_region = False
-    region_start_i = 0
-
-    for i in range(len(db)):
-        above = db[i] >= thresh
-        if above:
-            if not in_region:
-                in_region = True
-                region_start_i = i
-                run = 1
-            else:
-                run += 1
-
-            if run == sustain_frames:
-                t = region_start_i * (hop_ms / 1000.0)
-                candidates.append(float(t))
-                if len(candidates) >= max_candidates:
-                    break
-        else:
-            in_region = False
-            run = 0
-
-    return candidates
-
-
-def _ffmpeg_extract_s16le_16k_mono(audio_path: str, start_sec: float, duration_sec: float) -> Tuple[np.ndarray, int]:
-    cmd = [
-        "ffmpeg", "-hide_banner", "-loglevel", "error",
-        "-ss", f"{start_sec:.3f}", "-t", f"{duration_sec:.3f}",
-        "-i", audio_path, "-ac", "1", "-ar", "16000",
-        "-f", "s16le", "pipe:1",
-    ]
-    p = subprocess.run(cmd, check=True, stdout=subprocess.PIPE)
-    pcm16 = np.frombuffer(p.stdout, dtype=np.int16)
-    return pcm16.astype(np.float32) / 32768.0, 16000
+    # Runs of frames above threshold: a candidate is the start of each run lasting >= sustain_frames.
+    edges = np.diff(np.concatenate(([0], (db >= thresh).astype(np.int8), [0])))
+    run_starts = np.flatnonzero(edges == 1)
+    run_lens = np.flatnonzero(edges == -1) - run_starts
+    hits = run_starts[run_lens >= sustain_frames][:max_candidates]
+    return [float(i * (hop_ms / 1000.0)) for i in hits]
 
 
 def estimate_first_word_time(
@@ -138,12 +111,16 @@ def estimate_first_word_time(
     window_secs: float = 16.0,
     max_whisper_windows: int = 6,
     min_time_secs: Optional[float] = None,
+    max_scan_secs: float = MAX_SCAN_SECS,
     verbose: bool = False,
 ) -> Optional[FirstWordResult]:
-    return None
-    audio_16k = _ffmpeg_decode_s16le_16k_mono(audio_path)
+    if not whisper_enabled():
+        return None
+    t0 = time.perf_counter()
+    audio_16k = _ffmpeg_decode_s16le_16k_mono(audio_path, max_secs=max_scan_secs + DECODE_TAIL_SECS)
+    t1 = time.perf_counter()
 
-    candidates = _find_voiced_candidates_energy(audio_16k)
+    candidates = _find_voiced_candidates_energy(audio_16k, max_scan_secs=max_scan_secs)
     if min_time_secs is not None:
         try:
             mt = float(min_time_secs)
@@ -151,36 +128,26 @@ def estimate_first_word_time(
         except Exception:
             pass
     if verbose:
-        print(f"[DEBUG] energy_candidates={['%.2f' % c for c in candidates]}")
+        print(f"[DEBUG] decode={t1 - t0:.3f}s detect={time.perf_counter() - t1:.4f}s energy_candidates={['%.2f' % c for c in candidates]}")
 
     if not candidates:
         return None
 
-    model = WhisperModel(model_size, device="cpu", compute_type="int8")
-
-    for i, t0 in enumerate(candidates[:max_whisper_windows]):
-        clip_start = max(0.0, t0 - pre_roll_secs)
-        clip, _ = _ffmpeg_extract_s16le_16k_mono(audio_path, clip_start, window_secs)
-
-        segments, _ = model.transcribe(
-            clip,
-            language=language,
-            beam_size=1,
-            vad_filter=False,
-            word_timestamps=True,
-            condition_on_previous_text=False,
-            temperature=0.0,
-        )
-
-        for seg in segments:
-            if not seg.words:
-                continue
-            w = seg.words[0]
-            if w.word and len(w.word.strip()) > 1:
+    # Windows are ranges of the decoded buffer (no per-window ffmpeg); overlaps are transcribed once.
+    total = len(audio_16k) / float(SR)
+    windows: List[Tuple[float, float]] = []
+    for t in candidates[:max_whisper_windows]:
+        clip_start = max(0.0, t - pre_roll_secs)
+        windows.append((clip_start, min(total, clip_start + window_secs)))
+
+    per_window = transcribe_windows(audio_16k, windows, model_size=model_size, language=language)
+    for words in per_window:
+        for start, _, word, prob in words:
+            if len(word) > 1:
                 return FirstWordResult(
-                    first_word_time_secs=clip_start + float(w.start or seg.start),
-                    first_word=w.word.strip(),
-                    confidence=getattr(w, "probability", None),
+                    first_word_time_secs=start,
+                    first_word=word,
+                    confidence=prob,
                 )
 
     return None
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""Per-slug locks and the crash-recovery journal.
+
+Locks: meta/locks/<slug>.lock is held with an advisory fcntl lock for the
+whole pipeline run (and by 4_mp4.py when run on its own), so several
+workers can share one tree as long as they work on different slugs; a
+second worker on the same slug waits. The lock is released by the kernel
+when the process dies, so a crash never leaves a stale lock behind. Held
+locks are tracked per thread, so two threads of one process on the same slug
+exclude each other too. Child processes started while a lock is held
+(main.py -> 4_mp4.py) inherit it through MIXTERIOSO_HELD_LOCKS in the env
+they are given (child_env()) instead of deadlocking on it; the process-wide
+environment is never modified.
+
+Journal: meta/<slug>.journal.json records, per committed stage, the
+(size, mtime_ns) of the files it produced and the parameters it ran with.
+main.py skips a stage whose entry still matches, so an interrupted run
+resumes at the first uncommitted stage. Committing a stage drops the
+entries of every later stage (their inputs changed). Combined with atomic
+writes (common.atomic_output), an artifact either exists complete or not at
+all; temp files left by a killed run are swept when the slug lock is next
+taken. `main.py --force` resets the journal.
+
+Usage:
+    python3 -m scripts.journal --slug my_song        # show committed stages
+    python3 -m scripts.journal --slug my_song --reset
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from .common import Paths, atomic_write_text, log, CYAN, GREEN, WHITE, YELLOW
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: locks are a no-op
+    fcntl = None  # type: ignore[assignment]
+
+LOCKS_ENV = "MIXTERIOSO_HELD_LOCKS"
+STAGES = ("fetch", "mix", "sync", "render", "deliver")
+JOURNAL_VERSION = 1
+
+
+class SlugBusy(RuntimeError):
+    pass
+
+
+# ─────────────────────────────────────────────
+# Locks
+# ─────────────────────────────────────────────
+def lock_path(paths: Paths, slug: str) -> Path:
+    return paths.meta / "locks" / f"{slug}.lock"
+
+
+_local = threading.local()
+
+
+def _held() -> Set[str]:
+    """Slugs whose lock the current thread holds."""
+    held = getattr(_local, "held", None)
+    if held is None:
+        held = _local.held = set()
+    return held
+
+
+def _inherited() -> List[str]:
+    """Slugs locked by the parent process that started this one (see child_env)."""
+    return [s for s in os.environ.get(LOCKS_ENV, "").split(os.pathsep) if s]
+
+
+def child_env() -> Dict[str, str]:
+    """os.environ plus MIXTERIOSO_HELD_LOCKS for a child that runs under this thread's locks."""
+    env = dict(os.environ)
+    slugs = sorted(_held().union(_inherited()))
+    if slugs:
+        env[LOCKS_ENV] = os.pathsep.join(slugs)
+    else:
+        env.pop(LOCKS_ENV, None)
+    return env
+
+
+@contextmanager
+def slug_lock(paths: Paths, slug: str, *, wait: bool = True, tag: str = "LOCK") -> Iterator[None]:
+    """Hold the slug's advisory lock for the block (waits for other workers unless wait=False)."""
+    held = _held()
+    if fcntl is None or slug in held or slug in _inherited():
+        yield
+        return
+
+    path = lock_path(paths, slug)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a+", encoding="utf-8") as f:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            if not wait:
+                raise SlugBusy(f"{slug} is being processed by another worker ({path})")
+            log(tag, f"{slug} is locked by another worker; waiting", YELLOW)
+            t0 = time.perf_counter()
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            log(tag, f"Got lock for {slug} after {time.perf_counter() - t0:.1f}s", CYAN)
+        f.seek(0)
+        f.truncate()
+        f.write(f"{os.getpid()}\n")
+        f.flush()
+
+        held.add(slug)
+        try:
+            removed = sweep_temps(paths, slug)
+            if removed:
+                log(tag, f"Removed {removed} temp file(s) left by an interrupted run of {slug}", YELLOW)
+            yield
+        finally:
+            held.discard(slug)
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def slug_locked(paths: Paths, slug: str) -> bool:
+    """True if some process currently holds the slug's lock."""
+    path = lock_path(paths, slug)
+    if fcntl is None or not path.exists():
+        return False
+    with path.open("a+", encoding="utf-8") as f:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    return False
+
+
+def sweep_temps(paths: Paths, slug: str) -> int:
+    """Delete in-progress files of slug (common.temp_path_for names, Demucs/yt-dlp scratch dirs).
+
+    Only safe while holding the slug lock: then no live writer owns them.
+    meta/ is left alone because the uploaders write meta/<slug>.upload.json
+    without that lock; its temps are small and never match a *.json glob.
+    """
+    pat = re.compile(rf"^{re.escape(slug)}(\..*)?\.\d+-\d+\.tmp(\.[^.]+)?$")
+    removed = 0
+    for d in (paths.txts, paths.mp3s, paths.mixes, paths.timings, paths.output):
+        try:
+            names = [p for p in d.iterdir() if pat.match(p.name)]
+        except OSError:
+            continue
+        for p in names:
+            p.unlink(missing_ok=True)
+            removed += 1
+    scratch = [paths.cache / "ytdlp" / slug]
+    try:
+        scratch += [p for p in paths.separated.iterdir() if re.match(rf"^\.{re.escape(slug)}\.\d+\.tmp$", p.name)]
+    except OSError:
+        pass
+    for d in scratch:
+        if d.is_dir():
+            shutil.rmtree(d, ignore_errors=True)
+            removed += 1
+    return removed
+
+
+# ─────────────────────────────────────────────
+# Journal
+# ─────────────────────────────────────────────
+def journal_path(paths: Paths, slug: str) -> Path:
+    return paths.meta / f"{slug}.journal.json"
+
+
+def file_signature(p: Path) -> Optional[List[int]]:
+    try:
+        st = p.stat()
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _norm(params: Any) -> Any:
+    # Round-trip through JSON so tuples/ints compare like what was saved.
+    return json.loads(json.dumps(params, sort_keys=True))
+
+
+class SlugJournal:
+    """Committed stages of one slug; every change is written through atomically."""
+
+    def __init__(self, path: Path, data: Optional[Dict[str, Any]] = None) -> None:
+        self.path = path
+        self.data: Dict[str, Any] = data or {"version": JOURNAL_VERSION, "running": None, "stages": {}}
+
+    @classmethod
+    def load(cls, paths: Paths, slug: str) -> "SlugJournal":
+        path = journal_path(paths, slug)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("version") != JOURNAL_VERSION:
+                data = None
+        except Exception:
+            data = None
+        return cls(path, data)
+
+    def _save(self) -> None:
+        atomic_write_text(self.path, json.dumps(self.data, indent=2) + "\n")
+
+    @property
+    def interrupted(self) -> Optional[str]:
+        """Stage that was running when the previous run died, if any."""
+        return self.data.get("running")
+
+    def committed(self, stage: str, params: Any = None) -> bool:
+        """True if stage was committed with these params and its outputs are unchanged."""
+        entry = self.data["stages"].get(stage)
+        if not entry or entry.get("params") != _norm(params):
+            return False
+        return all(file_signature(Path(p)) == sig for p, sig in entry["outputs"].items())
+
+    def begin(self, stage: str) -> None:
+        self.data["running"] = stage
+        self._save()
+
+    def commit(self, stage: str, outputs: Iterable[Path] = (), params: Any = None, *, required: Iterable[Path] = ()) -> bool:
+        """Record stage as done (later stages must re-run); refused if a required output is missing."""
+        missing = [p for p in required if not p.exists()]
+        if missing:
+            log("JOURNAL", f"{stage}: not committed, missing {', '.join(p.name for p in missing)}", YELLOW)
+            return False
+        found = {str(p): file_signature(p) for p in outputs}
+        entry = {
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "params": _norm(params),
+            "outputs": {p: sig for p, sig in found.items() if sig is not None},
+        }
+        prev = self.data["stages"].get(stage) or {}
+        stages = dict(self.data["stages"])
+        if (prev.get("params"), prev.get("outputs")) != (entry["params"], entry["outputs"]):
+            # Reran with different results: everything downstream is stale.
+            for later in STAGES[STAGES.index(stage) + 1:]:
+                stages.pop(later, None)
+        stages[stage] = entry
+        self.data.update(running=None, stages=stages)
+        self._save()
+        return True
+
+    def reset(self) -> None:
+        self.data = {"version": JOURNAL_VERSION, "running": None, "stages": {}}
+        self._save()
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Show or reset a slug's pipeline journal")
+    ap.add_argument("--slug", required=True)
+    ap.add_argument("--reset", action="store_true", help="Forget committed stages (next run redoes everything)")
+    args = ap.parse_args(argv)
+
+    paths = Paths.from_scripts_dir(Path(__file__).resolve().parent)
+    with slug_lock(paths, args.slug):
+        j = SlugJournal.load(paths, args.slug)
+        if args.reset:
+            j.reset()
+            log("JOURNAL", f"Reset {j.path}", GREEN)
+            return 0
+        if j.interrupted:
+            log("JOURNAL", f"Last run stopped during: {j.interrupted}", YELLOW)
+        for stage in STAGES:
+            entry = j.data["stages"].get(stage)
+            if entry is None:
+                print(f"  {stage:8s} -")
+                continue
+            state = "ok" if j.committed(stage, entry.get("params")) else "stale"
+            print(f"  {stage:8s} {state:5s} {entry['at']}  {', '.join(Path(p).name for p in entry['outputs'])}")
+    log("JOURNAL", str(j.path), WHITE)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
+# end of journal.py
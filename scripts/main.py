@@ -5,15 +5,19 @@ import sys
 from pathlib import Path
 import re
 import time
-import csv
 
+from .cache_gc import collect_in_background
+from .catalog import update_slug
 from .common import IOFlags, Paths, log, slugify, YELLOW, WHITE, write_text
+from .journal import SlugJournal, child_env, file_signature, slug_lock
 from .offset_tuner import tune_offset
 from .step1_fetch import step1_fetch
 from .step2_split import step2_split
 from .step3_sync import step3_sync
 from .step5_deliver import step5_deliver
 from .first_word_time import estimate_first_word_time
+from .offset_xcorr import estimate_global_offset
+from .timeline import load_timeline, warp_path_for
 
 # ─────────────────────────────────────────────
 # Helpers
@@ -55,44 +59,30 @@ def resolve_renderer(scripts_dir: Path) -> Path:
 
 def _read_first_time_secs_from_csv(csv_path: Path) -> float | None:
     """Read the first (earliest) time_secs from a canonical timings CSV."""
-    if not csv_path.exists():
-        return None
     try:
-        with csv_path.open("r", encoding="utf-8", newline="") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if not row:
-                    continue
-                raw = (row.get("time_secs") or "").strip()
-                if not raw:
-                    continue
-                return float(raw)
+        return load_timeline(csv_path).first_start()
     except Exception:
         return None
-    return None
 
 
 def _read_first_lyrics_text_snippet(csv_path: Path, *, max_lines: int = 5) -> str | None:
     """Read a small snippet of early lyric text to sanity-check Whisper output."""
-    if not csv_path.exists():
-        return None
     try:
-        parts: list[str] = []
-        with csv_path.open("r", encoding="utf-8", newline="") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if not row:
-                    continue
-                txt = (row.get("text") or "").strip()
-                if not txt:
-                    continue
-                parts.append(txt)
-                if len(parts) >= max_lines:
-                    break
-        s = " ".join(parts).strip()
-        return s if s else None
+        tl = load_timeline(csv_path)
     except Exception:
         return None
+    parts: list[str] = []
+    for _, txt, _ in tl.rows(nonempty=True):
+        parts.append(txt.strip())
+        if len(parts) >= max_lines:
+            break
+    s = " ".join(parts).strip()
+    return s if s else None
+
+
+# Offset deltas smaller than this are treated as estimator noise.
+AUTOSHIFT_THRESH = 0.75
+XCORR_MIN_CONFIDENCE = 0.35
 
 
 def _norm_token(s: str) -> str:
@@ -134,11 +124,43 @@ def _pick_audio_for_first_word(paths: Paths, slug: str) -> Path | None:
     return None
 
 
+def _autoshift_offset_from_xcorr(csv_path: Path, audio_path: Path, offset_path: Path, flags: IOFlags) -> bool:
+    """Try the model-free estimator. Returns True if it settled the offset (written or not needed)."""
+    try:
+        starts = [t for t, _, _ in load_timeline(csv_path).rows(nonempty=True)]
+        t0 = time.perf_counter()
+        est = estimate_global_offset(audio_path, starts)
+    except Exception as e:
+        log("XCORR", f"Onset cross-correlation failed: {e}", WHITE)
+        return False
+    if est is None:
+        log("XCORR", "No onset cross-correlation estimate; falling back to first-word", WHITE)
+        return False
+
+    elapsed = time.perf_counter() - t0
+    log("XCORR", f"offset={est.offset_secs:+.3f}s confidence={est.confidence:.2f} peak_z={est.peak_z:.1f} ({elapsed:.2f}s, {audio_path.name})", WHITE)
+    if est.confidence < XCORR_MIN_CONFIDENCE:
+        log("XCORR", f"Confidence below {XCORR_MIN_CONFIDENCE:.2f}; falling back to first-word", WHITE)
+        return False
+
+    if abs(est.offset_secs) < AUTOSHIFT_THRESH:
+        log("XCORR", "Lyrics look aligned. No shift.", WHITE)
+        return True
+    log("XCORR", f"Auto-shifting lyrics by {est.offset_secs:+.3f}s -> {offset_path}", WHITE)
+    write_text(offset_path, f"{est.offset_secs:.3f}\n", flags, label="offset_auto")
+    return True
+
+
 def _maybe_autoshift_offset_from_first_word(paths: Paths, slug: str, flags: IOFlags) -> None:
     """
-    If timings and audio exist, compute an approximate first-word time.
-    If the first lyric line time is 'off' vs computed time, write timings/<slug>.offset
-    as a global shift (applies to all lyric lines at render time).
+    If timings and audio exist, estimate how far the lyrics are off and write
+    timings/<slug>.offset as a global shift (applies to all lyric lines at render time).
+
+    Estimators, in order:
+    1) Onset cross-correlation against all line starts (offset_xcorr, no model);
+       used when its confidence is at least XCORR_MIN_CONFIDENCE
+    2) Whisper first-word time vs the first lyric line (first_word_time; opt-in via
+       MIXTERIOSO_FIRST_WORD_WHISPER=1, model shared across guard passes)
 
     Safety:
     - If timings/<slug>.offset already exists: do not overwrite unless --force is used
@@ -165,6 +187,9 @@ def _maybe_autoshift_offset_from_first_word(paths: Paths, slug: str, flags: IOFl
         log("FIRSTWORD", f"No audio found for first-word compute; skipping (expected mixes/ or mp3s/)", WHITE)
         return
 
+    if _autoshift_offset_from_xcorr(csv_path, audio_path, offset_path, flags):
+        return
+
     lyric_snippet = _read_first_lyrics_text_snippet(csv_path, max_lines=5)
 
     # Pass 1: normal scan from start
@@ -201,8 +226,7 @@ def _maybe_autoshift_offset_from_first_word(paths: Paths, slug: str, flags: IOFl
     delta = computed_t - float(first_line_t)
 
     # Treat small differences as noise (first-word estimate is intentionally rough)
-    THRESH = 0.75
-    if abs(delta) < THRESH:
+    if abs(delta) < AUTOSHIFT_THRESH:
         log("FIRSTWORD", f"First line looks OK (csv={first_line_t:.3f}s, first_word={computed_t:.3f}s, delta={delta:+.3f}s). No shift.", WHITE)
         return
 
@@ -211,6 +235,12 @@ def _maybe_autoshift_offset_from_first_word(paths: Paths, slug: str, flags: IOFl
     write_text(offset_path, f"{delta:.3f}\n", flags, label="offset_auto")
 
 
+def _catalog(paths: Paths, slug: str, flags: IOFlags, **fields) -> None:
+    """Record the finished stage in meta/catalog.sqlite (skipped on --dry-run)."""
+    if not flags.dry_run:
+        update_slug(paths, slug, **fields)
+
+
 def read_saved_offset(paths: Paths, slug: str) -> float | None:
     """Read timings/<slug>.offset if it exists and contains a float."""
     p = paths.timings / f"{slug}.offset"
@@ -241,6 +271,7 @@ def main():
     p.add_argument("--bass", type=float, default=100.0, help="Bass level percent (100=unchanged, 0=mute)")
     p.add_argument("--drums", type=float, default=100.0, help="Drums level percent (100=unchanged, 0=mute)")
     p.add_argument("--other", type=float, default=100.0, help="Other level percent (100=unchanged, 0=mute)")
+    p.add_argument("--fit-warp", action="store_true", help="Fit a piecewise drift correction (timings/<slug>.warp.json) before rendering")
     args = p.parse_args()
 
     scripts_dir = Path(__file__).resolve().parent
@@ -260,15 +291,69 @@ def main():
     paths = Paths.from_scripts_dir(scripts_dir)
     paths.ensure()
 
+    if flags.dry_run:
+        return run_stages(paths, slug, artist, title, args, flags, renderer, None, t0)
+
+    # One worker per slug; the journal lets a rerun pick up after the last committed stage.
+    with slug_lock(paths, slug, tag="MAIN"):
+        journal = SlugJournal.load(paths, slug)
+        if flags.force:
+            journal.reset()
+        elif journal.interrupted:
+            log("JOURNAL", f"Previous run stopped during '{journal.interrupted}'; resuming after the last committed stage", YELLOW)
+        rc = run_stages(paths, slug, artist, title, args, flags, renderer, journal, t0)
+
+    # Optional disk budget (MIXTERIOSO_CACHE_BUDGET): evict derivable artifacts in the background
+    collect_in_background(paths)
+    return rc
+
+
+def _committed(journal: SlugJournal | None, stage: str, params=None) -> bool:
+    """True if the journal says stage is done with these params; otherwise marks it running."""
+    if journal is None:
+        return False
+    if journal.committed(stage, params):
+        log("JOURNAL", f"{stage}: committed earlier and outputs unchanged; skipping", WHITE)
+        return True
+    journal.begin(stage)
+    return False
+
+
+def _commit(journal: SlugJournal | None, stage: str, outputs: list[Path], params=None, *, required: int = 1) -> None:
+    """Commit stage with its outputs; the first `required` outputs must exist."""
+    if journal is not None:
+        journal.commit(stage, outputs, params, required=outputs[:required])
+
+
+def run_stages(
+    paths: Paths,
+    slug: str,
+    artist: str,
+    title: str,
+    args: argparse.Namespace,
+    flags: IOFlags,
+    renderer: Path,
+    journal: SlugJournal | None,
+    t0: float,
+) -> int:
+    """Steps 1-5; stages already committed in the journal (outputs unchanged) are skipped."""
     # Step 1: fetch (lyrics + audio + (optional) captions/lrc)
-    step1_fetch(
-        paths,
-        query=args.query,
-        artist=artist,
-        title=title,
-        slug=slug,
-        flags=flags,
-    )
+    if not _committed(journal, "fetch", {"query": args.query}):
+        step1_fetch(
+            paths,
+            query=args.query,
+            artist=artist,
+            title=title,
+            slug=slug,
+            flags=flags,
+        )
+        _catalog(paths, slug, flags)
+        _commit(
+            journal,
+            "fetch",
+            [paths.mp3s / f"{slug}.mp3", paths.txts / f"{slug}.txt", paths.timings / f"{slug}.lrc", paths.meta / f"{slug}.step1.json"],
+            {"query": args.query},
+        )
 
     log_elapsed('Step 1 (Fetch) End', t0)
 
@@ -281,25 +366,33 @@ def main():
     drums = args.drums
     other = args.other
 
-    step2_split(
-        paths,
-        slug=slug,
-        mix_mode=mix_mode,
-        vocals=vocals,
-        bass=bass,
-        drums=drums,
-        other=other,
-        flags=flags,
-    )
+    # mixes/<slug>.wav is not journaled: cache_gc may evict it and Step 2 rebuilds it from the MP3.
+    mix_params = {"mode": mix_mode, "levels": [vocals, bass, drums, other]}
+    if not _committed(journal, "mix", mix_params):
+        step2_split(
+            paths,
+            slug=slug,
+            mix_mode=mix_mode,
+            vocals=vocals,
+            bass=bass,
+            drums=drums,
+            other=other,
+            flags=flags,
+        )
+        _catalog(paths, slug, flags)
+        _commit(journal, "mix", [paths.mixes / f"{slug}.mp3", paths.mixes / f"{slug}.mix.json"], mix_params)
 
     log_elapsed('Step 2 (Split) End', t0)
 
-    # Step 3: sync (build timings CSV from LRC or VTT)
-    sync_source = step3_sync(paths, slug=slug, flags=flags)
+    # Step 3: sync (build timings CSV from LRC or VTT), then the automatic offset
+    if not _committed(journal, "sync"):
+        sync_source = step3_sync(paths, slug=slug, flags=flags)
+        _catalog(paths, slug, flags, sync_source=None if sync_source == "csv" else sync_source)
 
-    log_elapsed('Step 3 (Sync) End', t0)
+        log_elapsed('Step 3 (Sync) End', t0)
 
-    _maybe_autoshift_offset_from_first_word(paths, slug, flags)
+        _maybe_autoshift_offset_from_first_word(paths, slug, flags)
+        _commit(journal, "sync", [paths.timings / f"{slug}.csv", paths.timings / f"{slug}.offset"])
 
     # Default offset rule (locked):
     # - If LRC exists (and appears valid): +1.0s
@@ -317,6 +410,10 @@ def main():
         # - Otherwise (e.g., VTT): 0.0s
         offset = 0.0
 
+    if args.fit_warp and not flags.dry_run:
+        from .time_warp import fit_slug
+        fit_slug(paths, slug, offset=offset)
+
     if args.confirm_offset:
         offset = tune_offset(
             slug=slug,
@@ -335,17 +432,27 @@ def main():
         "--offset",
         str(offset),
     ]
-    log("RENDER", " ".join(render_cmd))
-    subprocess.run(render_cmd, check=True)
+    out_mp4 = paths.output / f"{slug}.mp4"
+    render_params = {"offset": offset, "warp": file_signature(warp_path_for(paths.timings / f"{slug}.csv"))}
+    if not _committed(journal, "render", render_params):
+        log("RENDER", " ".join(render_cmd))
+        subprocess.run(render_cmd, check=True, env=child_env())
+        _catalog(paths, slug, flags, offset_secs=offset)
+        _commit(journal, "render", [out_mp4, paths.output / f"{slug}.jpg"], render_params)
 
     log_elapsed('Step 4 (MP4 Gen) End', t0)
 
     # Step 5: deliver (package outputs)
-    step5_deliver(paths, slug=slug, flags=flags)
+    deliver_params = {"mp4": file_signature(out_mp4)}
+    if not _committed(journal, "deliver", deliver_params):
+        step5_deliver(paths, slug=slug, flags=flags)
+        _catalog(paths, slug, flags)
+        _commit(journal, "deliver", [], deliver_params, required=0)
 
     log_elapsed('Pipeline End', t0)
     return 0
 
+
 def log_elapsed(msg: str, t0: float):
     t1 = time.perf_counter()
     elapsed = t1 - t0
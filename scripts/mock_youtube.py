@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""Local stand-in for the YouTube Data API upload endpoints.
+
+Implements just enough for the uploader to run end to end without Google:
+- POST /upload/youtube/v3/videos?uploadType=resumable   -> 200 + Location session URI
+- PUT  <session>  Content-Range: bytes a-b/total         -> 308 Range / 201 video resource
+- PUT  <session>  Content-Range: bytes */total           -> status query
+- POST /upload/youtube/v3/thumbnails/set?videoId=...     -> 200
+- PUT  /youtube/v3/videos?part=...                       -> 200 (metadata update)
+
+Received bytes go to --store (default: a temp dir). Failure injection
+(--fail-rate, --drop-after) exercises the retry/resume paths. Auth headers are
+accepted and ignored.
+
+Usage:
+    python3 -m scripts.mock_youtube --port 8765 --fail-rate 0.2
+    MIXTERIOSO_YOUTUBE_ENDPOINT=http://127.0.0.1:8765 python3 scripts/5_upload.py --slug <slug>
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import tempfile
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+from .common import log, CYAN, GREEN
+
+
+class MockState:
+    def __init__(self, store: Path, *, fail_rate: float = 0.0, drop_after: int = 0) -> None:
+        self.store = store
+        self.fail_rate = fail_rate
+        self.drop_after = drop_after  # answer 503 once per session after this many bytes (0 = never)
+        self.lock = threading.Lock()
+        self.sessions: Dict[str, Dict] = {}
+        self.videos: Dict[str, Dict] = {}
+        self.calls: Dict[str, int] = {}
+
+    def count(self, name: str) -> None:
+        with self.lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "MockServer"
+
+    def log_message(self, fmt, *args) -> None:  # keep the console quiet
+        pass
+
+    def _reply(self, code: int, body: Optional[dict] = None, headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.send_response(code)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> bytes:
+        n = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(n) if n else b""
+
+    def _flaky(self) -> bool:
+        st = self.server.state
+        if st.fail_rate and random.random() < st.fail_rate:
+            self._body()
+            self._reply(503, {"error": {"code": 503, "message": "injected failure"}})
+            return True
+        return False
+
+    def do_POST(self) -> None:
+        st = self.server.state
+        url = urlparse(self.path)
+        qs = parse_qs(url.query)
+        if self._flaky():
+            return
+        if url.path == "/upload/youtube/v3/videos" and qs.get("uploadType") == ["resumable"]:
+            st.count("videos.insert")
+            meta = json.loads(self._body() or b"{}")
+            sid = uuid.uuid4().hex
+            with st.lock:
+                st.sessions[sid] = {
+                    "size": int(self.headers.get("X-Upload-Content-Length") or 0),
+                    "received": 0,
+                    "meta": meta,
+                    "dropped": False,
+                }
+            host = self.headers.get("Host") or f"127.0.0.1:{self.server.server_port}"
+            self._reply(200, headers={"Location": f"http://{host}/upload/session/{sid}"})
+            return
+        if url.path == "/upload/youtube/v3/thumbnails/set":
+            st.count("thumbnails.set")
+            vid = (qs.get("videoId") or [""])[0]
+            data = self._body()
+            if vid not in st.videos:
+                self._reply(404, {"error": {"code": 404, "message": "video not found"}})
+                return
+            (st.store / f"{vid}.jpg").write_bytes(data)
+            self._reply(200, {"kind": "youtube#thumbnailSetResponse"})
+            return
+        self._reply(404, {"error": {"code": 404, "message": f"no route {url.path}"}})
+
+    def do_PUT(self) -> None:
+        st = self.server.state
+        url = urlparse(self.path)
+        if url.path == "/youtube/v3/videos":
+            st.count("videos.update")
+            meta = json.loads(self._body() or b"{}")
+            vid = meta.get("id", "")
+            if vid not in st.videos:
+                self._reply(404, {"error": {"code": 404, "message": "video not found"}})
+                return
+            st.videos[vid].update({k: v for k, v in meta.items() if k != "id"})
+            self._reply(200, st.videos[vid])
+            return
+        if not url.path.startswith("/upload/session/"):
+            self._reply(404, {"error": {"code": 404, "message": f"no route {url.path}"}})
+            return
+        sid = url.path.rsplit("/", 1)[1]
+        sess = st.sessions.get(sid)
+        if sess is None:
+            self._body()
+            self._reply(404, {"error": {"code": 404, "message": "session not found"}})
+            return
+        if self._flaky():
+            return
+
+        crange = self.headers.get("Content-Range", "")
+        data = self._body()
+        part = st.store / f"{sid}.part"
+        with st.lock:
+            if not crange.startswith("bytes */"):
+                first = int(crange.split(" ", 1)[1].split("-", 1)[0])
+                if first == sess["received"]:
+                    if st.drop_after and not sess["dropped"] and sess["received"] + len(data) > st.drop_after:
+                        # Keep a partial chunk and fail, like a connection dying mid-request.
+                        data = data[: max(0, st.drop_after - sess["received"])]
+                        sess["dropped"] = True
+                        with part.open("ab") as f:
+                            f.write(data)
+                        sess["received"] += len(data)
+                        self._reply(503, {"error": {"code": 503, "message": "dropped"}})
+                        return
+                    with part.open("ab") as f:
+                        f.write(data)
+                    sess["received"] += len(data)
+            received, size = sess["received"], sess["size"]
+
+            if received >= size:
+                vid = sess.get("video_id")
+                if vid is None:
+                    vid = uuid.uuid4().hex[:11]
+                    sess["video_id"] = vid
+                    part.replace(st.store / f"{vid}.mp4")
+                    st.videos[vid] = {"id": vid, "kind": "youtube#video", **sess["meta"]}
+                    log("MOCK", f"Received video {vid} ({size} bytes)", GREEN)
+                self._reply(201, st.videos[vid])
+                return
+        headers = {"Range": f"bytes=0-{received - 1}"} if received else {}
+        self._reply(308, headers=headers)
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, state: MockState) -> None:
+        super().__init__(addr, _Handler)
+        self.state = state
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+def start(store: Optional[Path] = None, *, port: int = 0, fail_rate: float = 0.0, drop_after: int = 0) -> MockServer:
+    """Serve in a background thread; returns the server (see .endpoint, .state, .shutdown())."""
+    store = store or Path(tempfile.mkdtemp(prefix="mixterioso_mock_yt_"))
+    store.mkdir(parents=True, exist_ok=True)
+    srv = MockServer(("127.0.0.1", port), MockState(store, fail_rate=fail_rate, drop_after=drop_after))
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Local mock of the YouTube upload API")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--store", default=None, help="Directory for received files (default: temp dir)")
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    ap.add_argument("--drop-after", type=int, default=0, help="Cut each session once after N bytes")
+    args = ap.parse_args(argv)
+
+    store = Path(args.store) if args.store else Path(tempfile.mkdtemp(prefix="mixterioso_mock_yt_"))
+    store.mkdir(parents=True, exist_ok=True)
+    srv = MockServer(("127.0.0.1", args.port), MockState(store, fail_rate=args.fail_rate, drop_after=args.drop_after))
+    log("MOCK", f"Mock YouTube API on {srv.endpoint} (files in {store})", CYAN)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
+# end of mock_youtube.py
@@ -2,13 +2,15 @@
 """Interactive offset tuner (CLI-only).
 
 Intent:
-- No MP4 preview (final video only)
+- No full MP4 preview; [6] renders a short low-res draft of the preview window (4_mp4.py --draft)
 - Simple terminal UI with 0.25s steps, unlimited retries
 - Preview spans multiple lyric "borders" (line start moments), even if offset is off by several seconds
 - On lock: write timings/<slug>.offset
 
 Preview strategy:
 - Play an audio segment near the first lyric (duration ~25–40s)
+- The segment is decoded once per session (keyed by the mix's hash) and streamed as raw
+  PCM to one persistent ffplay, so replays after a nudge start immediately
 - While audio plays, emit terminal bell + print each lyric line at the moment it would appear (time_secs + offset)
 - During preview you can stop or adjust immediately:
     Enter        -> stop preview and return to menu
@@ -22,11 +24,12 @@ from __future__ import annotations
 
 import sys
 import time
-import csv
 import shutil
+import threading
 import subprocess
+import wave
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 
 try:
     import select  # POSIX (macOS)
@@ -40,6 +43,11 @@ except Exception:
     from .common import log  # type: ignore
     YELLOW = GREEN = RED = BLUE = ""
 
+from .audio_io import decode_pcm_s16le
+from .common import atomic_output, atomic_write_text, file_sha1
+from .journal import child_env
+from .timeline import load_timeline
+
 STEP = 0.25
 
 # Preview window selection
@@ -51,6 +59,12 @@ MAX_DUR = 40.0
 MAX_LINES_TO_PRINT = 14
 PLAY_START_PAD = 0.10
 
+# Preview audio: decoded once per session, fed to one long-lived ffplay over stdin
+PREVIEW_SR = 48000
+FEED_CHUNK_SECS = 0.02
+FEED_AHEAD_SECS = 0.15  # how far the writer runs ahead of real time (bounds stop latency)
+PREVIEW_CACHE_MAX_BYTES = 200 * 1024 * 1024  # afplay clips in .cache/mixterioso/previews
+
 
 def _is_tty() -> bool:
     try:
@@ -72,8 +86,7 @@ def _read_offset_file(offset_path: Path) -> Optional[float]:
 
 
 def _write_offset_file(offset_path: Path, offset: float) -> None:
-    offset_path.parent.mkdir(parents=True, exist_ok=True)
-    offset_path.write_text(f"{offset:.2f}\n", encoding="utf-8")
+    atomic_write_text(offset_path, f"{offset:.2f}\n")
 
 
 def _find_audio_path(mixes_dir: Path, slug: str) -> Path:
@@ -92,21 +105,11 @@ def _find_audio_path(mixes_dir: Path, slug: str) -> Path:
 
 
 def _load_timings_csv(csv_path: Path) -> List[Tuple[float, str]]:
-    rows: List[Tuple[float, str]] = []
-    with csv_path.open("r", encoding="utf-8", newline="") as f:
-        reader = csv.DictReader(f)
-        for r in reader:
-            try:
-                t = float((r.get("time_secs") or "").strip())
-            except Exception:
-                continue
-            txt = (r.get("text") or "").strip()
-            rows.append((t, txt))
-    rows.sort(key=lambda x: x[0])
-    return rows
+    # Drift correction (timings/<slug>.warp.json) is applied like the renderer does.
+    return [(t, txt.strip()) for t, txt, _ in load_timeline(csv_path, warp=True).rows()]
 
 
-def _choose_preview_window(events: List[Tuple[float, str]]) -> Tuple[float, float]:
+def choose_preview_window(events: List[Tuple[float, str]]) -> Tuple[float, float]:
     if not events:
         return 0.0, MIN_DUR
 
@@ -154,51 +157,182 @@ def _terminate_proc(proc: subprocess.Popen) -> None:
             pass
 
 
-def _play_with_ffplay(audio_path: Path, *, start: float, dur: float) -> subprocess.Popen:
-    ffplay = shutil.which("ffplay")
-    if not ffplay:
-        raise RuntimeError("ffplay not found")
-    cmd = [
-        ffplay,
-        "-hide_banner",
-        "-loglevel", "error",
-        "-nodisp",
-        "-autoexit",
-        "-ss", f"{start:.3f}",
-        "-t", f"{dur:.3f}",
-        str(audio_path),
-    ]
-    # Prevent ffplay from consuming terminal stdin
-    return subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+class _PcmPlayer:
+    """One long-lived ffplay reading mono s16le PCM from stdin.
 
+    play() hands a buffer to a writer thread that stays FEED_AHEAD_SECS ahead of
+    real time; stop()/play() bump a generation counter so the previous writer
+    quits after at most one chunk.
+    """
 
-def _ensure_audio_clip_ffmpeg(audio_path: Path, cache_dir: Path, *, start: float, dur: float) -> Path:
-    cache_dir.mkdir(parents=True, exist_ok=True)
-    key = f"{audio_path.stem}_preview_{int(start*1000)}_{int(dur*1000)}.wav"
-    out = cache_dir / key
-    if out.exists():
-        return out
+    def __init__(self, *, sr: int = PREVIEW_SR):
+        ffplay = shutil.which("ffplay")
+        if not ffplay:
+            raise RuntimeError("ffplay not found")
+        self.sr = sr
+        cmd = [
+            ffplay,
+            "-hide_banner",
+            "-loglevel", "error",
+            "-nodisp",
+            "-fflags", "nobuffer",
+            "-probesize", "32",
+            "-analyzeduration", "0",
+            "-f", "s16le",
+            "-ar", str(sr),
+            "-i", "pipe:0",
+        ]
+        # bufsize=0: each chunk is a single write (< PIPE_BUF), never split mid-sample
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, bufsize=0)
+        self._lock = threading.Lock()
+        self._gen = 0
+        self._end_at = 0.0
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def play(self, pcm: bytes) -> None:
+        with self._lock:
+            self._gen += 1
+            gen = self._gen
+        self._end_at = time.time() + len(pcm) / float(2 * self.sr)
+        threading.Thread(target=self._feed, args=(gen, pcm), daemon=True).start()
+
+    def playing(self) -> bool:
+        return self.alive() and time.time() < self._end_at
+
+    def stop(self) -> None:
+        with self._lock:
+            self._gen += 1
+        self._end_at = 0.0
+
+    def close(self) -> None:
+        self.stop()
+        try:
+            if self.proc.stdin:
+                self.proc.stdin.close()
+        except Exception:
+            pass
+        _terminate_proc(self.proc)
+
+    def _feed(self, gen: int, pcm: bytes) -> None:
+        bps = 2 * self.sr
+        chunk = int(bps * FEED_CHUNK_SECS) & ~1
+        t0 = time.time()
+        pos = 0
+        while pos < len(pcm):
+            ahead = pos / float(bps) - (time.time() - t0)
+            if ahead > FEED_AHEAD_SECS:
+                time.sleep(ahead - FEED_AHEAD_SECS)
+                continue
+            with self._lock:
+                if gen != self._gen:
+                    return
+                try:
+                    self.proc.stdin.write(pcm[pos:pos + chunk])  # type: ignore[union-attr]
+                except (BrokenPipeError, OSError, ValueError):
+                    return
+            pos += chunk
 
-    ffmpeg = shutil.which("ffmpeg")
-    if not ffmpeg:
-        raise RuntimeError("ffmpeg not found (needed to slice a short preview clip when ffplay is unavailable)")
 
-    cmd = [
-        ffmpeg,
-        "-hide_banner",
-        "-loglevel", "error",
-        "-y",
-        "-ss", f"{start:.3f}",
-        "-t", f"{dur:.3f}",
-        "-i", str(audio_path),
-        "-vn",
-        "-acodec", "pcm_s16le",
-        "-ar", "48000",
-        "-ac", "2",
-        str(out),
-    ]
-    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    return out
+class _Playback:
+    """Uniform handle over the persistent player and a one-shot afplay process."""
+
+    def __init__(self, *, player: Optional[_PcmPlayer] = None, proc: Optional[subprocess.Popen] = None):
+        self.player = player
+        self.proc = proc
+
+    def poll(self) -> Optional[int]:
+        if self.player is not None:
+            return None if self.player.playing() else 0
+        return self.proc.poll() if self.proc is not None else 0
+
+    def stop(self) -> None:
+        if self.player is not None:
+            self.player.stop()
+        elif self.proc is not None:
+            _terminate_proc(self.proc)
+
+
+def _evict_previews(cache_dir: Path, *, max_bytes: int = PREVIEW_CACHE_MAX_BYTES, keep: Optional[Path] = None) -> None:
+    """Drop least recently used preview clips until the directory fits max_bytes."""
+    try:
+        files = [(p.stat(), p) for p in cache_dir.glob("*.wav")]
+    except Exception:
+        return
+    total = sum(st.st_size for st, _ in files)
+    for st, p in sorted(files, key=lambda x: x[0].st_mtime):
+        if total <= max_bytes:
+            break
+        if keep is not None and p == keep:
+            continue
+        try:
+            p.unlink()
+            total -= st.st_size
+        except Exception:
+            pass
+
+
+class _PreviewSession:
+    """Preview audio for one tuning session: PCM decoded once, replayed from memory."""
+
+    # (audio sha1, start ms, dur ms) -> mono s16le PCM at PREVIEW_SR
+    _pcm_cache: Dict[Tuple[str, int, int], bytes] = {}
+
+    def __init__(self, audio_path: Path, cache_dir: Path, *, start: float, dur: float):
+        self.audio_path = audio_path
+        self.cache_dir = cache_dir
+        self.start = start
+        self.dur = dur
+        self._player: Optional[_PcmPlayer] = None
+        self._key: Optional[Tuple[str, int, int]] = None
+
+    def key(self) -> Tuple[str, int, int]:
+        # Re-hashing is memoized by (size, mtime), so a re-mixed file gets a new key.
+        self._key = (file_sha1(self.audio_path), int(self.start * 1000), int(self.dur * 1000))
+        return self._key
+
+    def pcm(self) -> bytes:
+        key = self.key()
+        pcm = self._pcm_cache.get(key)
+        if pcm is None:
+            t0 = time.perf_counter()
+            pcm = decode_pcm_s16le(self.audio_path, sr=PREVIEW_SR, start_secs=self.start, max_secs=self.dur)
+            self._pcm_cache.clear()  # one window per session is all we replay
+            self._pcm_cache[key] = pcm
+            log("PREVIEW", f"Decoded preview window once ({len(pcm) / 1e6:.1f} MB) in {time.perf_counter() - t0:.2f}s", BLUE)
+        return pcm
+
+    def play(self) -> Tuple[_Playback, str]:
+        pcm = self.pcm()
+        try:
+            if self._player is None or not self._player.alive():
+                self._player = _PcmPlayer()
+            self._player.play(pcm)
+            return _Playback(player=self._player), "ffplay(stream)"
+        except Exception:
+            clip = self._clip_wav(pcm)
+            return _Playback(proc=_play_with_afplay(clip)), "afplay"
+
+    def _clip_wav(self, pcm: bytes) -> Path:
+        sha, start_ms, dur_ms = self._key or self.key()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        out = self.cache_dir / f"{sha[:16]}_{start_ms}_{dur_ms}.wav"
+        if out.exists():
+            out.touch()  # LRU
+            return out
+        with atomic_output(out, keep_suffix=False) as tmp, wave.open(str(tmp), "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(PREVIEW_SR)
+            w.writeframes(pcm)
+        _evict_previews(self.cache_dir, keep=out)
+        return out
+
+    def close(self) -> None:
+        if self._player is not None:
+            self._player.close()
+            self._player = None
 
 
 def _play_with_afplay(file_path: Path) -> subprocess.Popen:
@@ -226,17 +360,15 @@ def _read_preview_command_nonblocking() -> Optional[str]:
 
 
 def _preview(
-    audio_path: Path,
+    session: _PreviewSession,
     events: List[Tuple[float, str]],
     *,
-    timings_dir: Path,
-    preview_start: float,
-    preview_dur: float,
     offset: float,
 ) -> str:
     """Run preview. Returns one of:
     DONE, STOP, EARLIER, LATER, LOCK, ABORT
     """
+    preview_start, preview_dur = session.start, session.dur
     preview_end = preview_start + preview_dur
     sched = _build_schedule(events, preview_start=preview_start, preview_end=preview_end, offset=offset)
 
@@ -244,14 +376,7 @@ def _preview(
     if prior:
         log("PREVIEW", f"On-screen at start: {prior[-1]}", BLUE)
 
-    try:
-        proc = _play_with_ffplay(audio_path, start=preview_start, dur=preview_dur)
-        using = "ffplay"
-    except Exception:
-        cache_dir = timings_dir.parent / ".cache" / "mixterioso" / "previews"
-        clip = _ensure_audio_clip_ffmpeg(audio_path, cache_dir, start=preview_start, dur=preview_dur)
-        proc = _play_with_afplay(clip)
-        using = "ffmpeg+afplay"
+    proc, using = session.play()
 
     log("PREVIEW", f"start={preview_start:.2f}s dur={preview_dur:.2f}s offset={offset:+.2f}s player={using}", BLUE)
     log("PREVIEW", "Preview controls: Enter=stop, 1=earlier, 2=later, 4=lock, 5/q=abort", BLUE)
@@ -283,7 +408,7 @@ def _preview(
             cmd = _read_preview_command_nonblocking()
             if cmd is not None:
                 action = map_cmd(cmd)
-                _terminate_proc(proc)
+                proc.stop()
                 return action
 
             if i >= len(sched) or printed >= MAX_LINES_TO_PRINT:
@@ -304,18 +429,42 @@ def _preview(
             i += 1
 
     except KeyboardInterrupt:
-        _terminate_proc(proc)
+        proc.stop()
         log("PREVIEW", "Cancelled", YELLOW)
         return "STOP"
 
 
+def _render_draft(renderer_path: Path, *, slug: str, offset: float, start: float, dur: float) -> None:
+    """Render the preview window as a low-res MP4 via 4_mp4.py --draft and open it if possible."""
+    cmd = [
+        sys.executable,
+        str(renderer_path),
+        "--slug", slug,
+        "--offset", f"{offset:.3f}",
+        "--draft",
+        "--draft-start", f"{start:.3f}",
+        "--draft-dur", f"{dur:.3f}",
+    ]
+    t0 = time.perf_counter()
+    try:
+        subprocess.run(cmd, check=True, stdin=subprocess.DEVNULL, env=child_env())
+    except Exception as e:
+        log("DRAFT", f"Draft render failed: {e}", RED)
+        return
+    out = Path(renderer_path).resolve().parent.parent / "output" / f"{slug}.draft.mp4"
+    log("DRAFT", f"{out} ready in {time.perf_counter() - t0:.2f}s (offset={offset:+.2f}s)", GREEN)
+    opener = shutil.which("open") or shutil.which("xdg-open")
+    if opener:
+        subprocess.Popen([opener, str(out)], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
 def tune_offset(
     *,
     slug: str,
     base_offset: float,
     mixes_dir: Path,
     timings_dir: Path,
-    renderer_path=None,  # unused (kept for call compatibility)
+    renderer_path=None,  # 4_mp4.py, used for [6] draft video renders
 ) -> float:
     if not _is_tty():
         raise RuntimeError("--confirm-offset requires an interactive TTY")
@@ -333,8 +482,35 @@ def tune_offset(
     if not events:
         raise RuntimeError(f"Timings CSV has no usable rows: {csv_path}")
 
-    preview_start, preview_dur = _choose_preview_window(events)
-
+    preview_start, preview_dur = choose_preview_window(events)
+    session = _PreviewSession(
+        audio_path,
+        timings_dir.parent / ".cache" / "mixterioso" / "previews",
+        start=preview_start,
+        dur=preview_dur,
+    )
+    try:
+        return _tune_loop(
+            slug=slug,
+            offset=offset,
+            offset_path=offset_path,
+            events=events,
+            session=session,
+            renderer_path=renderer_path,
+        )
+    finally:
+        session.close()
+
+
+def _tune_loop(
+    *,
+    slug: str,
+    offset: float,
+    offset_path: Path,
+    events: List[Tuple[float, str]],
+    session: _PreviewSession,
+    renderer_path=None,
+) -> float:
     while True:
         print()
         print("----------------------------------------")
@@ -346,6 +522,8 @@ def tune_offset(
         print("[3] Play preview (audio + terminal border cues)")
         print("[4] Lock offset and continue")
         print("[5] Abort")
+        if renderer_path:
+            print("[6] Draft video (preview window, low-res)")
         choice = (input("> ") or "").strip().lower()
 
         if choice in ("1", "e", "earlier"):
@@ -355,14 +533,7 @@ def tune_offset(
         elif choice in ("3", "p", "preview"):
             # Allow on-the-fly adjust during preview
             while True:
-                result = _preview(
-                    audio_path,
-                    events,
-                    timings_dir=timings_dir,
-                    preview_start=preview_start,
-                    preview_dur=preview_dur,
-                    offset=offset,
-                )
+                result = _preview(session, events, offset=offset)
                 if result == "EARLIER":
                     offset -= STEP
                     continue  # immediate replay
@@ -382,6 +553,8 @@ def tune_offset(
             return offset
         elif choice in ("5", "q", "quit", "abort"):
             raise SystemExit(1)
+        elif choice in ("6", "d", "draft") and renderer_path:
+            _render_draft(renderer_path, slug=slug, offset=offset, start=session.start, dur=session.dur)
         else:
             log("REVIEW", "Invalid input", YELLOW)
 
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Model-free global lyric offset estimate.
+
+Cross-correlates a vocal onset envelope (vocals stem or mix) with an impulse
+train built from every timings CSV line start, via FFT, and returns the lag
+that best lines the lyrics up with the audio:
+
+    render time = csv time + offset_secs
+
+No Whisper model is loaded; a 4-minute song takes a fraction of a second
+(dominated by the ffmpeg decode).
+"""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+from .audio_io import decode_mono_f32, frame_rms_db
+
+ENV_SR = 8000
+ENV_HOP_MS = 10.0  # envelope frame rate = 100 Hz
+ACTIVITY_DB_ABOVE_FLOOR = 6.0
+IMPULSE_SIGMA_SECS = 0.08
+MAX_LAG_SECS = 20.0
+PEAK_EXCLUSION_SECS = 0.75
+
+
+@dataclass
+class OffsetEstimate:
+    offset_secs: float
+    # 1 - (runner-up peak / best peak), in [0, 1]; higher = less ambiguous
+    confidence: float
+    # (best peak - mean) / std over the searched lags
+    peak_z: float
+
+
+def onset_envelope(audio: np.ndarray, *, sr: int = ENV_SR, hop_ms: float = ENV_HOP_MS) -> np.ndarray:
+    """Half-wave rectified log-energy rise, gated to active frames, zero-mean/unit-var."""
+    db = frame_rms_db(audio, sr=sr, hop_ms=hop_ms)
+    if db.size < 2:
+        return np.zeros(db.size, dtype=np.float32)
+    floor = float(np.percentile(db, 20.0))
+    flux = np.maximum(np.diff(db, prepend=db[0]), 0.0)
+    flux *= db >= floor + ACTIVITY_DB_ABOVE_FLOOR
+    std = float(flux.std())
+    return ((flux - flux.mean()) / std).astype(np.float32) if std > 0 else flux.astype(np.float32)
+
+
+def impulse_train(starts: Sequence[float], n_frames: int, *, fps: float, sigma_secs: float = IMPULSE_SIGMA_SECS) -> np.ndarray:
+    """Gaussian-smoothed impulses at each line start (frames outside [0, n) dropped)."""
+    train = np.zeros(n_frames, dtype=np.float32)
+    idx = np.rint(np.asarray(starts, dtype=np.float64) * fps).astype(np.int64)
+    idx = idx[(idx >= 0) & (idx < n_frames)]
+    np.add.at(train, idx, 1.0)
+    half = max(1, int(3 * sigma_secs * fps))
+    x = np.arange(-half, half + 1, dtype=np.float32) / (sigma_secs * fps)
+    kernel = np.exp(-0.5 * x * x)
+    return np.convolve(train, kernel / kernel.sum(), mode="same").astype(np.float32)
+
+
+def best_lag(env: np.ndarray, imp: np.ndarray, *, fps: float, max_lag_secs: float = MAX_LAG_SECS) -> Optional[OffsetEstimate]:
+    """FFT cross-correlation of env against imp, searched over +/- max_lag_secs."""
+    n = len(env)
+    if n == 0 or not imp.any():
+        return None
+    nfft = 1 << int(np.ceil(np.log2(2 * n)))
+    corr = np.fft.irfft(np.fft.rfft(env, nfft) * np.conj(np.fft.rfft(imp, nfft)), nfft)
+
+    max_lag = min(int(max_lag_secs * fps), n - 1)
+    lags = np.arange(-max_lag, max_lag + 1)
+    vals = corr[lags % nfft]  # negative lags wrap to the end of the circular result
+
+    k = int(np.argmax(vals))
+    peak = float(vals[k])
+    if peak <= 0:
+        return None
+    excl = int(PEAK_EXCLUSION_SECS * fps)
+    rest = np.concatenate((vals[: max(0, k - excl)], vals[k + excl + 1:]))
+    runner_up = float(rest.max()) if rest.size else 0.0
+    confidence = float(np.clip(1.0 - max(runner_up, 0.0) / peak, 0.0, 1.0))
+    std = float(vals.std())
+    peak_z = (peak - float(vals.mean())) / std if std > 0 else 0.0
+    return OffsetEstimate(offset_secs=float(lags[k]) / fps, confidence=confidence, peak_z=peak_z)
+
+
+def estimate_global_offset(
+    audio_path: Path | str,
+    line_starts: Sequence[float],
+    *,
+    max_lag_secs: float = MAX_LAG_SECS,
+) -> Optional[OffsetEstimate]:
+    if not line_starts:
+        return None
+    audio = decode_mono_f32(audio_path, sr=ENV_SR, af="highpass=f=120,lowpass=f=4000")
+    fps = 1000.0 / ENV_HOP_MS
+    env = onset_envelope(audio, sr=ENV_SR, hop_ms=ENV_HOP_MS)
+    imp = impulse_train(line_starts, len(env), fps=fps)
+    return best_lag(env, imp, fps=fps, max_lag_secs=max_lag_secs)
+
+
+def main() -> int:
+    from .common import Paths
+    from .timeline import load_timeline
+
+    ap = argparse.ArgumentParser(description="Estimate a global lyric offset by onset cross-correlation")
+    ap.add_argument("--slug", required=True)
+    ap.add_argument("--audio", default=None, help="Override audio (default: vocals stem, else mixes/<slug>.wav)")
+    ap.add_argument("--max-lag", type=float, default=MAX_LAG_SECS)
+    args = ap.parse_args()
+
+    paths = Paths.from_scripts_dir(Path(__file__).resolve().parent)
+    audio = Path(args.audio) if args.audio else None
+    if audio is None:
+        for p in (paths.separated / "htdemucs" / args.slug / "vocals.wav", paths.mixes / f"{args.slug}.wav", paths.mixes / f"{args.slug}.mp3"):
+            if p.exists():
+                audio = p
+                break
+    if audio is None:
+        print("No audio found.")
+        return 1
+
+    tl = load_timeline(paths.timings / f"{args.slug}.csv")
+    starts = [t for t, _, _ in tl.rows(nonempty=True)]
+    est = estimate_global_offset(audio, starts, max_lag_secs=args.max_lag)
+    if est is None:
+        print("No offset estimate.")
+        return 0
+    print(f"offset_secs={est.offset_secs:+.3f}")
+    print(f"confidence={est.confidence:.3f}")
+    print(f"peak_z={est.peak_z:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
+# end of offset_xcorr.py
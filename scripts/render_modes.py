@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+"""Alternative video pipelines for 4_mp4.py.
+
+The lyric video only changes at ASS event boundaries, so instead of a constant
+frame rate we can emit one frame per on-screen state.
+
+VFR (--vfr):
+- the boundaries (title card end, every lyric start/end) split [0, duration)
+  into states
+- an ffconcat list repeats one black PNG with each state's duration, so frame
+  i is stamped at boundary i (microsecond precision)
+- the subtitles filter renders each frame at its own pts, i.e. the state that
+  starts there; -fps_mode vfr keeps exactly one encoded frame per state
+- the output is capped with -t duration rather than -shortest, which can
+  drop the last few states of such a sparse stream
+
+Segmented (--segments N):
+- the song is cut into N pieces at lyric boundaries snapped to the frame grid,
+  so every segment's frames sit on the same timestamps a single pass would use
+- each segment gets its slice of the ASS events and is encoded (video only) in
+  a worker pool sized to the cores; every segment starts on a keyframe
+- segments are joined with the concat demuxer (-c:v copy) and the audio is
+  encoded once in that final mux
+
+Incremental (--incremental):
+- fixed ~SEGMENT_SECS segments, cut at the nearest lyric boundary so an edit
+  to one line moves at most the cuts around it
+- closed-GOP segments cached in .cache/mixterioso/segments/<slug>/<key>.mp4,
+  key = hash of the ASS events visible in the segment + render settings
+- only missing segments are encoded; the MP4 is re-assembled by stream copy
+  and segments no longer referenced are pruned
+
+Multi-target (--profiles):
+- one ffmpeg process: a black canvas + subtitles per ASS layout, split/scaled
+  to every profile sharing that layout, one encode per output, and the single
+  cached audio track stream-copied into all of them
+
+Side outputs (thumbnail / poster JPEG, optional preview GIF) are tapped off the
+rendered frame stream with split + trim, in the same ffmpeg run as the CFR
+render, or from a short standalone frame-source pass for the other modes; the
+finished MP4 is never decoded again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import shutil
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .ass_slice import event_boundaries, slice_events
+from .common import atomic_output, atomic_outputs, atomic_write_text, log, BLUE, CYAN, GREEN
+from .encoders import keyframe_times, video_args
+
+# Frames per GOP for VFR output (a frame is a lyric state, ~2-5 s each)
+VFR_GOP_FRAMES = 30
+MP4_TIMESCALE = 1000  # ms timestamps in the mp4 track
+
+THUMB_AT_SECS = 0.5  # title card
+GIF_SECS = 6.0
+GIF_WIDTH = 480
+
+SEGMENT_SECS = 20.0  # nominal incremental segment length
+CLOSED_GOP_ARGS = ["-flags", "+cgop"]
+
+
+def state_boundaries(boundaries: Sequence[float], duration: float) -> List[float]:
+    """0 plus every boundary inside (0, duration), sorted and de-duplicated to 1 ms."""
+    out = [0.0]
+    for t in sorted(boundaries):
+        t = round(float(t), 3)
+        if out[-1] < t < duration:
+            out.append(t)
+    return out
+
+
+def black_frame(cache_dir: Path, width: int, height: int) -> Path:
+    """A cached black PNG of the output size."""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    png = cache_dir / f"black_{width}x{height}.png"
+    if not png.exists():
+        with atomic_output(png) as tmp:
+            subprocess.run(
+                [
+                    "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+                    "-f", "lavfi", "-i", f"color=c=black:s={width}x{height}",
+                    "-frames:v", "1", str(tmp),
+                ],
+                check=True,
+            )
+    return png
+
+
+def write_ffconcat(list_path: Path, image: Path, starts: Sequence[float], duration: float) -> int:
+    """One entry per state; returns the number of frames."""
+    lines = ["ffconcat version 1.0"]
+    entry = f"file '{image.as_posix()}'"
+    for i, t in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else duration
+        lines += [entry, f"duration {max(end - t, 0.001):.6f}"]
+    # The concat demuxer ignores the last entry's duration unless the file is listed again.
+    lines.append(entry)
+    atomic_write_text(list_path, "\n".join(lines) + "\n")
+    return len(starts)
+
+
+def render_vfr(
+    *,
+    ass_path: Path,
+    audio_path: Path,
+    out_path: Path,
+    boundaries: Sequence[float],
+    duration: float,
+    width: int,
+    height: int,
+    cache_dir: Path,
+    audio_args: Sequence[str],
+) -> Path:
+    """Encode one frame per distinct on-screen state, timed by the ASS boundaries, muxed with audio."""
+    starts = state_boundaries(boundaries, duration)
+    image = black_frame(cache_dir, width, height)
+    list_path = ass_path.with_suffix(".ffconcat")
+    frames = write_ffconcat(list_path, image, starts, duration)
+
+    t0 = time.perf_counter()
+    with atomic_output(out_path) as tmp:
+        cmd = [
+            "ffmpeg", "-y", "-hide_banner", "-loglevel", "warning",
+            "-f", "concat", "-safe", "0", "-i", str(list_path),
+            "-i", str(audio_path),
+            "-map", "0:v:0", "-map", "1:a:0",
+            "-vf", f"subtitles={ass_path}",
+            *video_args(fps=1.0, gop_frames=VFR_GOP_FRAMES),
+            "-fps_mode", "vfr",
+            "-video_track_timescale", str(MP4_TIMESCALE),
+            *audio_args,
+            "-movflags", "+faststart",
+            # Not -shortest: it can cut the sparse VFR stream before its last states.
+            "-t", f"{duration:.3f}",
+            str(tmp),
+        ]
+        log("FFMPEG", " ".join(cmd), BLUE)
+        subprocess.run(cmd, check=True)
+    log("VFR", f"Wrote {out_path}: {frames} frames for {duration:.1f}s in {time.perf_counter() - t0:6.2f} s", GREEN)
+    return out_path
+
+
+def side_output_graph(
+    src: str,
+    *,
+    fps: float,
+    thumb_path: Path,
+    poster_path: Optional[Path] = None,
+    poster_at: Optional[float] = None,
+    gif_path: Optional[Path] = None,
+    gif_start: float = 0.0,
+    main: Optional[str] = None,
+) -> Tuple[List[str], List[str]]:
+    """
+    Filter chains + output args that tap stills/previews off the frame stream [src].
+    If main is given, an untouched copy of the stream is left on label [main].
+    """
+    taps: List[Tuple[str, List[str]]] = []
+
+    def still(label: str, at: float, path: Path, first_at_or_after: bool) -> None:
+        k = math.ceil(at * fps - 1e-9) if first_at_or_after else int(at * fps)
+        taps.append((f"trim=start_frame={k}:end_frame={k + 1}[{label}]", ["-map", f"[{label}]", "-frames:v", "1", "-q:v", "2", "-update", "1", str(path)]))
+
+    still("thumb", THUMB_AT_SECS, thumb_path, False)
+    if poster_path is not None and poster_at is not None:
+        still("poster", max(0.0, poster_at), poster_path, True)
+    if gif_path is not None:
+        taps.append(
+            (
+                f"trim=start={gif_start:.3f}:duration={GIF_SECS:.3f},setpts=PTS-STARTPTS,"
+                f"scale={GIF_WIDTH}:-2:flags=lanczos,split[gifa][gifb];"
+                "[gifa]palettegen=max_colors=64[gifpal];[gifb][gifpal]paletteuse[gif]",
+                ["-map", "[gif]", "-loop", "0", str(gif_path)],
+            )
+        )
+
+    labels = ([main] if main else []) + [f"tap{i}" for i in range(len(taps))]
+    chains = [f"[{src}]split={len(labels)}" + "".join(f"[{l}]" for l in labels)] if len(labels) > 1 else [f"[{src}]null[{labels[0]}]"]
+    out_args: List[str] = []
+    for label, (chain, args) in zip(labels[-len(taps):], taps):
+        chains.append(f"[{label}]{chain}")
+        out_args += args
+    return chains, out_args
+
+
+def render_side_outputs(
+    *,
+    ass_path: Path,
+    width: int,
+    height: int,
+    fps: float,
+    duration: float,
+    thumb_path: Path,
+    poster_path: Optional[Path] = None,
+    poster_at: Optional[float] = None,
+    gif_path: Optional[Path] = None,
+    gif_start: float = 0.0,
+) -> None:
+    """Stills/preview straight from the frame source (black canvas + subtitles), up to the last needed frame."""
+    needed = max(THUMB_AT_SECS, poster_at or 0.0, (gif_start + GIF_SECS) if gif_path else 0.0) + 2.0 / fps
+    with atomic_outputs([thumb_path, poster_path, gif_path]) as (tmp_thumb, tmp_poster, tmp_gif):
+        chains, out_args = side_output_graph(
+            "frames",
+            fps=fps,
+            thumb_path=tmp_thumb,
+            poster_path=tmp_poster,
+            poster_at=poster_at,
+            gif_path=tmp_gif,
+            gif_start=gif_start,
+        )
+        cmd = [
+            "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+            "-f", "lavfi", "-i", f"color=c=black:s={width}x{height}:r={fps}:d={min(needed, max(duration, 1.0)):.3f}",
+            "-filter_complex", ";".join([f"[0:v]subtitles={ass_path}[frames]"] + chains),
+            *out_args,
+        ]
+        log("FFMPEG", " ".join(cmd), BLUE)
+        subprocess.run(cmd, check=True)
+
+
+def plan_segments(boundaries: Sequence[float], duration: float, n: int, *, fps: float) -> List[Tuple[float, float]]:
+    """Split [0, duration) into <= n segments cut at frame-grid-snapped lyric boundaries."""
+    end = math.ceil(duration * fps) / fps
+    snapped = sorted({round(round(t * fps) / fps, 6) for t in boundaries if 0 < t < duration})
+    cuts = [0.0]
+    for k in range(1, max(1, n)):
+        ideal = duration * k / n
+        cut = min(snapped, key=lambda t: abs(t - ideal)) if snapped else round(ideal * fps) / fps
+        if cuts[-1] < cut < end:
+            cuts.append(cut)
+    return list(zip(cuts, cuts[1:] + [end]))
+
+
+def encode_segment(
+    *,
+    sub_text: str,
+    work_dir: Path,
+    name: str,
+    dur: float,
+    width: int,
+    height: int,
+    fps: float,
+    threads: int,
+    extra_video_args: Sequence[str] = (),
+) -> Path:
+    """Video-only encode of one segment from its (already sliced, segment-time) ASS text."""
+    ass_path = work_dir / f"{name}.ass"
+    atomic_write_text(ass_path, sub_text)
+    kfs = keyframe_times(event_boundaries(sub_text), fps=fps, duration=dur)
+    out = work_dir / f"{name}.mp4"
+    with atomic_output(out) as tmp:
+        cmd = [
+            "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+            "-f", "lavfi", "-i", f"color=c=black:s={width}x{height}:r={fps}:d={dur:.6f}",
+            "-vf", f"subtitles={ass_path}",
+            *video_args(fps=fps, keyframes=kfs),
+            *extra_video_args,
+            "-threads", str(threads),
+            "-an",
+            str(tmp),
+        ]
+        subprocess.run(cmd, check=True)
+    ass_path.unlink(missing_ok=True)
+    return out
+
+
+def _encode_all(jobs: Sequence[dict], *, workers: int) -> None:
+    # ffmpeg does the work; threads only wait on the child processes.
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for f in [pool.submit(encode_segment, **job) for job in jobs]:
+            f.result()
+
+
+def concat_and_mux(
+    segments: Sequence[Path],
+    *,
+    audio_path: Path,
+    out_path: Path,
+    audio_args: Sequence[str],
+    list_path: Path,
+) -> None:
+    """Join video segments by stream copy and mux the audio in one pass."""
+    atomic_write_text(
+        list_path,
+        "ffconcat version 1.0\n" + "".join(f"file '{p.resolve().as_posix()}'\n" for p in segments),
+    )
+    with atomic_output(out_path) as tmp:
+        cmd = [
+            "ffmpeg", "-y", "-hide_banner", "-loglevel", "warning",
+            "-f", "concat", "-safe", "0", "-i", str(list_path),
+            "-i", str(audio_path),
+            "-map", "0:v:0", "-map", "1:a:0",
+            "-c:v", "copy",
+            *audio_args,
+            "-movflags", "+faststart",
+            "-shortest",
+            str(tmp),
+        ]
+        log("FFMPEG", " ".join(cmd), BLUE)
+        subprocess.run(cmd, check=True)
+
+
+def render_segmented(
+    *,
+    ass_path: Path,
+    audio_path: Path,
+    out_path: Path,
+    boundaries: Sequence[float],
+    duration: float,
+    width: int,
+    height: int,
+    fps: float,
+    segments: int,
+    work_dir: Path,
+    audio_args: Sequence[str],
+) -> Path:
+    """Encode N lyric-aligned segments in parallel, then concat (-c:v copy) + mux audio once."""
+    cores = os.cpu_count() or 1
+    plan = plan_segments(boundaries, duration, segments if segments > 0 else cores, fps=fps)
+    workers = max(1, min(len(plan), cores))
+    threads = max(1, cores // workers)
+    ass_text = ass_path.read_text(encoding="utf-8")
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+    work_dir.mkdir(parents=True, exist_ok=True)
+    log("SEGMENTS", f"{len(plan)} segments, {workers} parallel encodes x {threads} threads", CYAN)
+
+    t0 = time.perf_counter()
+    jobs = [
+        dict(
+            sub_text=slice_events(ass_text, a, b)[0],
+            work_dir=work_dir,
+            name=f"seg_{i:03d}",
+            dur=b - a,
+            width=width,
+            height=height,
+            fps=fps,
+            threads=threads,
+        )
+        for i, (a, b) in enumerate(plan)
+    ]
+    _encode_all(jobs, workers=workers)
+    parts = [work_dir / f"{job['name']}.mp4" for job in jobs]
+    t1 = time.perf_counter()
+
+    concat_and_mux(parts, audio_path=audio_path, out_path=out_path, audio_args=audio_args, list_path=work_dir / "concat.ffconcat")
+    shutil.rmtree(work_dir, ignore_errors=True)
+    log("SEGMENTS", f"Wrote {out_path}: video {t1 - t0:6.2f} s, concat+mux {time.perf_counter() - t1:6.2f} s", GREEN)
+    return out_path
+
+
+def plan_fixed_segments(
+    boundaries: Sequence[float],
+    duration: float,
+    *,
+    fps: float,
+    seg_secs: float = SEGMENT_SECS,
+) -> List[Tuple[float, float]]:
+    """Cuts near every seg_secs, moved to the closest lyric boundary within half a segment."""
+    end = math.ceil(duration * fps) / fps
+    snapped = sorted({round(round(t * fps) / fps, 6) for t in boundaries if 0 < t < duration})
+    cuts = [0.0]
+    k = 1
+    while k * seg_secs < end:
+        ideal = k * seg_secs
+        near = [t for t in snapped if abs(t - ideal) <= seg_secs / 2]
+        cut = min(near, key=lambda t: abs(t - ideal)) if near else round(ideal * fps) / fps
+        if cuts[-1] < cut < end:
+            cuts.append(cut)
+        k += 1
+    return list(zip(cuts, cuts[1:] + [end]))
+
+
+def segment_key(sub_text: str, dur: float, *, width: int, height: int, fps: float, settings: Sequence[str]) -> str:
+    payload = json.dumps([sub_text, round(dur, 6), width, height, fps, list(settings)], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:20]
+
+
+def _prune_segments(cache_dir: Path, keep: set) -> int:
+    removed = 0
+    for p in cache_dir.iterdir():
+        if p.is_file() and p.name.split(".", 1)[0] not in keep:
+            p.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+def render_incremental(
+    *,
+    ass_path: Path,
+    audio_path: Path,
+    out_path: Path,
+    boundaries: Sequence[float],
+    duration: float,
+    width: int,
+    height: int,
+    fps: float,
+    cache_dir: Path,
+    audio_args: Sequence[str],
+    seg_secs: float = SEGMENT_SECS,
+) -> Path:
+    """Re-encode only segments whose visible ASS events (or settings) changed, then re-assemble."""
+    plan = plan_fixed_segments(boundaries, duration, fps=fps, seg_secs=seg_secs)
+    ass_text = ass_path.read_text(encoding="utf-8")
+    settings = video_args(fps=fps) + CLOSED_GOP_ARGS
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    cores = os.cpu_count() or 1
+    keys: List[str] = []
+    jobs = []
+    for a, b in plan:
+        sub_text = slice_events(ass_text, a, b)[0]
+        key = segment_key(sub_text, b - a, width=width, height=height, fps=fps, settings=settings)
+        keys.append(key)
+        if not (cache_dir / f"{key}.mp4").exists() and all(j["name"] != key for j in jobs):
+            jobs.append(
+                dict(
+                    sub_text=sub_text,
+                    work_dir=cache_dir,
+                    name=key,
+                    dur=b - a,
+                    width=width,
+                    height=height,
+                    fps=fps,
+                    threads=1,
+                    extra_video_args=CLOSED_GOP_ARGS,
+                )
+            )
+
+    workers = max(1, min(len(jobs), cores))
+    for job in jobs:
+        job["threads"] = max(1, cores // workers)
+    log("SEGMENTS", f"{len(plan)} segments: {len(plan) - len(jobs)} cached, {len(jobs)} to encode", CYAN)
+
+    t0 = time.perf_counter()
+    _encode_all(jobs, workers=workers)
+    t1 = time.perf_counter()
+
+    parts = [cache_dir / f"{k}.mp4" for k in keys]
+    concat_and_mux(parts, audio_path=audio_path, out_path=out_path, audio_args=audio_args, list_path=cache_dir / "concat.ffconcat")
+    pruned = _prune_segments(cache_dir, set(keys) | {"concat"})
+    log(
+        "SEGMENTS",
+        f"Wrote {out_path}: video {t1 - t0:6.2f} s, concat+mux {time.perf_counter() - t1:6.2f} s, pruned {pruned} stale file(s)",
+        GREEN,
+    )
+    return out_path
+
+
+def render_multi(
+    *,
+    layouts: Dict[Path, List[Tuple[int, int, Path]]],
+    canvases: Dict[Path, Tuple[int, int]],
+    audio_path: Path,
+    audio_args: Sequence[str],
+    boundaries: Sequence[float],
+    duration: float,
+    fps: float,
+) -> List[Path]:
+    """
+    Render several outputs in one ffmpeg graph.
+
+    layouts maps each ASS file to the (width, height, out_path) targets drawn
+    from it; canvases gives the ASS file's PlayRes canvas size.
+    """
+    cmd = ["ffmpeg", "-y", "-hide_banner", "-loglevel", "warning"]
+    graph: List[str] = []
+    outputs: List[Tuple[str, Path]] = []
+    for i, (ass_path, targets) in enumerate(layouts.items()):
+        cw, ch = canvases[ass_path]
+        cmd += ["-f", "lavfi", "-i", f"color=c=black:s={cw}x{ch}:r={fps}:d={max(duration, 1.0)}"]
+        labels = [f"l{i}_{j}" for j in range(len(targets))]
+        if len(targets) == 1:
+            graph.append(f"[{i}:v]subtitles={ass_path}[{labels[0]}]")
+        else:
+            graph.append(f"[{i}:v]subtitles={ass_path},split={len(targets)}" + "".join(f"[{l}]" for l in labels))
+        for label, (w, h, out_path) in zip(labels, targets):
+            if (w, h) == (cw, ch):
+                outputs.append((label, out_path))
+            else:
+                graph.append(f"[{label}]scale={w}:{h}:flags=lanczos[o{label}]")
+                outputs.append((f"o{label}", out_path))
+
+    audio_idx = len(layouts)
+    cmd += ["-i", str(audio_path), "-filter_complex", ";".join(graph)]
+    vargs = video_args(fps=fps, keyframes=keyframe_times(boundaries, fps=fps, duration=duration or None))
+    t0 = time.perf_counter()
+    with atomic_outputs([p for _, p in outputs]) as tmps:
+        for (label, _), tmp in zip(outputs, tmps):
+            cmd += [
+                "-map", f"[{label}]", "-map", f"{audio_idx}:a:0",
+                *vargs,
+                *audio_args,
+                "-movflags", "+faststart",
+                "-shortest",
+                str(tmp),
+            ]
+
+        log("FFMPEG", " ".join(cmd), BLUE)
+        subprocess.run(cmd, check=True)
+    log("MULTI", f"Wrote {len(outputs)} outputs in {time.perf_counter() - t0:6.2f} s: " + ", ".join(p.name for _, p in outputs), GREEN)
+    return [p for _, p in outputs]
+
+
+# end of render_modes.py
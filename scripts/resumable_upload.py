@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""Crash-safe YouTube resumable uploads.
+
+Speaks the resumable upload protocol directly so the session survives the
+process: the session URI and the last byte offset the server confirmed are
+kept in meta/<slug>.upload.json, and a rerun asks the server where it stopped
+(PUT "bytes */<size>") and continues from there instead of byte zero.
+
+- retriable failures (connection errors, 5xx, 429) back off exponentially with jitter
+- chunk size is configurable (multiple of 256 KiB, as the API requires)
+- a 404/410 on the session or a changed file starts a new session
+- the endpoint is configurable, so the whole flow runs against
+  scripts/mock_youtube.py
+
+`session` is anything with requests.Session's request() — an
+AuthorizedSession for the real API, a plain requests.Session for the mock.
+
+Env:
+    MIXTERIOSO_YOUTUBE_ENDPOINT   API root (default https://www.googleapis.com)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from .common import atomic_write_text, log, CYAN, GREEN, YELLOW
+
+DEFAULT_ENDPOINT = "https://www.googleapis.com"
+CHUNK_ALIGN = 256 * 1024
+DEFAULT_CHUNK_BYTES = 32 * CHUNK_ALIGN  # 8 MiB
+MAX_RETRIES = 8
+BACKOFF_BASE_SECS = 1.0
+BACKOFF_MAX_SECS = 64.0
+SESSION_MAX_AGE_SECS = 6 * 24 * 3600  # the API keeps sessions for about a week
+RETRIABLE_STATUS = {429, 500, 502, 503, 504}
+
+ProgressFn = Callable[[int, int], None]
+
+
+class UploadError(RuntimeError):
+    pass
+
+
+class _Retriable(Exception):
+    pass
+
+
+def endpoint_from_env() -> str:
+    return os.environ.get("MIXTERIOSO_YOUTUBE_ENDPOINT", "").strip().rstrip("/") or DEFAULT_ENDPOINT
+
+
+def chunk_bytes(mb: float) -> int:
+    """MiB -> bytes, rounded up to the 256 KiB multiple the API requires."""
+    n = max(1, int(mb * 1024 * 1024))
+    return -(-n // CHUNK_ALIGN) * CHUNK_ALIGN
+
+
+def state_path(meta_dir: Path, slug: str) -> Path:
+    return meta_dir / f"{slug}.upload.json"
+
+
+def _file_key(path: Path) -> Dict[str, Any]:
+    st = path.stat()
+    return {"video_path": str(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _load_state(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return data if isinstance(data, dict) else None
+    except Exception:
+        return None
+
+
+def _save_state(path: Path, state: Dict[str, Any]) -> None:
+    atomic_write_text(path, json.dumps(state, indent=2) + "\n")
+
+
+def _backoff(attempt: int, why: str) -> None:
+    if attempt >= MAX_RETRIES:
+        raise UploadError(f"Giving up after {MAX_RETRIES} retries: {why}")
+    delay = min(BACKOFF_MAX_SECS, BACKOFF_BASE_SECS * (2 ** attempt)) * random.uniform(0.5, 1.0)
+    log("UPLOAD", f"{why}; retry {attempt + 1}/{MAX_RETRIES} in {delay:.1f}s", YELLOW)
+    time.sleep(delay)
+
+
+def _request(session, method: str, url: str, **kw):
+    """session.request that turns transport errors and retriable statuses into _Retriable."""
+    try:
+        resp = session.request(method, url, timeout=kw.pop("timeout", 120), **kw)
+    except Exception as e:  # connection reset, timeout, DNS...
+        raise _Retriable(f"{type(e).__name__}: {e}")
+    if resp.status_code in RETRIABLE_STATUS:
+        raise _Retriable(f"HTTP {resp.status_code}")
+    return resp
+
+
+def _confirmed_offset(resp) -> int:
+    """Bytes the server holds, from a 308's Range header ("bytes=0-N")."""
+    rng = resp.headers.get("Range", "")
+    if not rng:
+        return 0
+    return int(rng.rsplit("-", 1)[1]) + 1
+
+
+def _start_session(session, endpoint: str, metadata: Dict[str, Any], size: int) -> str:
+    url = f"{endpoint}/upload/youtube/v3/videos?uploadType=resumable&part=snippet,status"
+    attempt = 0
+    while True:
+        try:
+            resp = _request(
+                session, "POST", url,
+                json=metadata,
+                headers={"X-Upload-Content-Length": str(size), "X-Upload-Content-Type": "video/mp4"},
+            )
+            break
+        except _Retriable as e:
+            _backoff(attempt, str(e))
+            attempt += 1
+    if resp.status_code != 200 or "Location" not in resp.headers:
+        raise UploadError(f"Could not start upload session: HTTP {resp.status_code} {resp.text[:300]}")
+    return resp.headers["Location"]
+
+
+def _query_offset(session, uri: str, size: int):
+    """(offset, finished response or None); (None, None) if the session is gone."""
+    resp = _request(session, "PUT", uri, headers={"Content-Range": f"bytes */{size}", "Content-Length": "0"})
+    if resp.status_code in (200, 201):
+        return size, resp
+    if resp.status_code == 308:
+        return _confirmed_offset(resp), None
+    if resp.status_code in (404, 410):
+        return None, None
+    raise UploadError(f"Upload status query failed: HTTP {resp.status_code} {resp.text[:300]}")
+
+
+def saved_status(state_file: Path, video_path: Path, endpoint: Optional[str] = None) -> Optional[str]:
+    """"done" (this file was uploaded), "resume" (a live session exists) or None (a new insert)."""
+    endpoint = (endpoint or endpoint_from_env()).rstrip("/")
+    state = _load_state(state_file)
+    if state is None or state.get("endpoint") != endpoint:
+        return None
+    if any(state.get(k) != v for k, v in _file_key(video_path).items()):
+        return None
+    if state.get("video_id"):
+        return "done"
+    if state.get("session_uri") and time.time() - float(state.get("created_at", 0)) < SESSION_MAX_AGE_SECS:
+        return "resume"
+    return None
+
+
+def upload_resumable(
+    session,
+    video_path: Path,
+    metadata: Dict[str, Any],
+    *,
+    state_file: Path,
+    endpoint: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_BYTES,
+    progress: Optional[ProgressFn] = None,
+) -> str:
+    """Upload video_path (resuming a persisted session when possible); returns the video id."""
+    endpoint = (endpoint or endpoint_from_env()).rstrip("/")
+    if chunk_size % CHUNK_ALIGN:
+        raise ValueError(f"chunk_size must be a multiple of {CHUNK_ALIGN} bytes")
+    key = _file_key(video_path)
+    size = key["size"]
+
+    state = _load_state(state_file)
+    status = saved_status(state_file, video_path, endpoint)
+    if status == "done":
+        log("UPLOAD", f"Already uploaded: video_id={state['video_id']}", GREEN)
+        return str(state["video_id"])
+    fresh = status == "resume"
+
+    offset: Optional[int] = None
+    done = None
+    if fresh:
+        uri = str(state["session_uri"])
+        attempt = 0
+        while True:
+            try:
+                offset, done = _query_offset(session, uri, size)
+                break
+            except _Retriable as e:
+                _backoff(attempt, str(e))
+                attempt += 1
+        if offset is None:
+            log("UPLOAD", "Saved upload session expired; starting over", YELLOW)
+        else:
+            log("UPLOAD", f"Resuming upload at {offset}/{size} bytes ({100 * offset // max(1, size)}%)", CYAN)
+    if offset is None:
+        uri = _start_session(session, endpoint, metadata, size)
+        offset = 0
+        state = {**key, "endpoint": endpoint, "session_uri": uri, "offset": 0, "created_at": time.time()}
+        _save_state(state_file, state)
+        log("UPLOAD", f"Started upload session for {video_path.name} ({size} bytes)", CYAN)
+
+    attempt = 0
+    with video_path.open("rb") as f:
+        while done is None:
+            f.seek(offset)
+            chunk = f.read(chunk_size)
+            end = offset + len(chunk) - 1
+            try:
+                resp = _request(
+                    session, "PUT", uri,
+                    data=chunk,
+                    headers={"Content-Range": f"bytes {offset}-{end}/{size}", "Content-Type": "video/mp4"},
+                )
+            except _Retriable as e:
+                _backoff(attempt, str(e))
+                attempt += 1
+                try:
+                    offset, done = _query_offset(session, uri, size)
+                except _Retriable:
+                    continue
+                if offset is None:
+                    raise UploadError("Upload session expired mid-upload; rerun to start a new one")
+                continue
+
+            if resp.status_code in (200, 201):
+                done = resp
+                offset = size
+            elif resp.status_code == 308:
+                offset = _confirmed_offset(resp)
+                attempt = 0
+            elif resp.status_code in (404, 410):
+                state_file.unlink(missing_ok=True)
+                raise UploadError("Upload session expired mid-upload; rerun to start a new one")
+            else:
+                raise UploadError(f"Upload failed: HTTP {resp.status_code} {resp.text[:300]}")
+
+            state["offset"] = offset
+            _save_state(state_file, state)
+            if progress:
+                progress(offset, size)
+
+    video_id = str(done.json().get("id") or "")
+    if not video_id:
+        raise UploadError(f"Upload finished without a video id: {done.text[:300]}")
+    state["video_id"] = video_id
+    _save_state(state_file, state)
+    return video_id
+
+
+def set_thumbnail(session, video_id: str, thumb_path: Path, *, endpoint: Optional[str] = None) -> None:
+    endpoint = (endpoint or endpoint_from_env()).rstrip("/")
+    url = f"{endpoint}/upload/youtube/v3/thumbnails/set?videoId={video_id}&uploadType=media"
+    data = thumb_path.read_bytes()
+    attempt = 0
+    while True:
+        try:
+            resp = _request(session, "POST", url, data=data, headers={"Content-Type": "image/jpeg"})
+            break
+        except _Retriable as e:
+            _backoff(attempt, str(e))
+            attempt += 1
+    if resp.status_code != 200:
+        raise UploadError(f"Thumbnail upload failed: HTTP {resp.status_code} {resp.text[:300]}")
+
+
+# end of resumable_upload.py
@@ -18,6 +18,7 @@ import json
 import re
 import subprocess
 from dataclasses import dataclass
+from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
 from .common import (
@@ -265,13 +266,17 @@ def pick_youtube(candidates: List[YTEntry]) -> Optional[YTEntry]:
 # Downloads
 # ─────────────────────────────────────────────
 
+def _ytdlp_paths(paths: Paths, home: Path, slug: str) -> List[str]:
+    """Download and post-process in a scratch dir; yt-dlp moves only finished files into home."""
+    return ["-P", f"home:{home}", "-P", f"temp:{paths.cache / 'ytdlp' / slug}"]
+
+
 def download_mp3(entry: YTEntry, paths: Paths, *, slug: str, flags: IOFlags) -> bool:
     mp3_path = paths.mp3s / f"{slug}.mp3"
     if mp3_path.exists() and not should_write(mp3_path, flags, label="audio_mp3"):
         log("AUDIO", f"Reusing MP3: {mp3_path}")
         return True
 
-    outtmpl = str((paths.mp3s / slug).with_suffix(".%(ext)s"))
     url = f"https://www.youtube.com/watch?v={entry.video_id}"
 
     cmd = [
@@ -283,7 +288,8 @@ def download_mp3(entry: YTEntry, paths: Paths, *, slug: str, flags: IOFlags) ->
         "--retries", "10",
         "--fragment-retries", "10",
         "--user-agent", "Mozilla/5.0",
-        "-o", outtmpl,
+        *_ytdlp_paths(paths, paths.mp3s, slug),
+        "-o", f"{slug}.%(ext)s",
         url,
     ]
 
@@ -292,7 +298,6 @@ def download_mp3(entry: YTEntry, paths: Paths, *, slug: str, flags: IOFlags) ->
 
 
 def fetch_captions(entry: YTEntry, paths: Paths, *, slug: str, flags: IOFlags, lang_hint: Optional[str] = None) -> bool:
-    outtmpl = str((paths.timings / slug).with_suffix(".%(language)s.vtt"))
     url = f"https://www.youtube.com/watch?v={entry.video_id}"
 
     # Prefer the detected language first, but allow fallback
@@ -309,7 +314,8 @@ def fetch_captions(entry: YTEntry, paths: Paths, *, slug: str, flags: IOFlags, l
         "--sub-format", "vtt",
         "--force-ipv4",
         "--retries", "10",
-        "-o", outtmpl,
+        *_ytdlp_paths(paths, paths.timings, slug),
+        "-o", f"{slug}.%(language)s.vtt",
         url,
     ]
 
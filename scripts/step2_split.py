@@ -14,11 +14,14 @@ Stem levels are expressed as PERCENTAGES, not dB:
 
 from __future__ import annotations
 
+import os
+import shutil
 from pathlib import Path
 
 from .common import (
     IOFlags,
     Paths,
+    atomic_output,
     log,
     run_cmd,
     have_exe,
@@ -36,6 +39,17 @@ def _pct_to_gain(pct: float) -> float:
         return 1.0
 
 
+def _run_ffmpeg_to(cmd: list, out_path: Path, flags: IOFlags) -> None:
+    """Run ffmpeg (cmd without the output path) into a temp file, renamed to out_path on success."""
+    if flags.dry_run:
+        run_cmd(cmd + [str(out_path)], tag="FFMPEG", dry_run=True)
+        return
+    with atomic_output(out_path) as tmp:
+        rc = run_cmd(cmd + [str(tmp)], tag="FFMPEG")
+        if rc != 0 or not tmp.exists():
+            raise RuntimeError(f"Failed to produce {out_path} (ffmpeg exit {rc})")
+
+
 def _ensure_wav_from_audio(src_audio: Path, out_wav: Path, flags: IOFlags) -> None:
     """
     Ensure mixes/<slug>.wav exists and is not stale relative to src_audio.
@@ -61,12 +75,9 @@ def _ensure_wav_from_audio(src_audio: Path, out_wav: Path, flags: IOFlags) -> No
         str(src_audio),
         "-c:a",
         "pcm_s16le",
-        str(out_wav),
     ]
     log("MIX", f"Building WAV: {out_wav.name} (from {src_audio.name})", WHITE)
-    run_cmd(cmd, tag="FFMPEG", dry_run=flags.dry_run)
-    if not flags.dry_run and not out_wav.exists():
-        raise RuntimeError(f"Failed to produce {out_wav}")
+    _run_ffmpeg_to(cmd, out_wav, flags)
 
 
 def _encode_mp3_from_wav(src_wav: Path, out_mp3: Path, flags: IOFlags) -> None:
@@ -92,12 +103,9 @@ def _encode_mp3_from_wav(src_wav: Path, out_mp3: Path, flags: IOFlags) -> None:
         "libmp3lame",
         "-q:a",
         "2",
-        str(out_mp3),
     ]
     log("MIX", f"Encoding MP3: {out_mp3.name} (from {src_wav.name})", WHITE)
-    run_cmd(cmd, tag="FFMPEG", dry_run=flags.dry_run)
-    if not flags.dry_run and not out_mp3.exists():
-        raise RuntimeError(f"Failed to produce {out_mp3}")
+    _run_ffmpeg_to(cmd, out_mp3, flags)
 
 
 def _ensure_demucs_stems(paths: Paths, slug: str, src_mp3: Path, flags: IOFlags) -> Path:
@@ -118,6 +126,8 @@ def _ensure_demucs_stems(paths: Paths, slug: str, src_mp3: Path, flags: IOFlags)
     if not have_exe("demucs"):
         raise RuntimeError("demucs not found on PATH (required for --mix-mode stems or stem level overrides)")
 
+    # Demucs writes into a scratch dir; the finished stem dir is moved into place.
+    work = paths.separated / f".{slug}.{os.getpid()}.tmp"
     cmd = [
         "demucs",
         "-n",
@@ -129,22 +139,32 @@ def _ensure_demucs_stems(paths: Paths, slug: str, src_mp3: Path, flags: IOFlags)
         "-d", 
         "mps",
         "-o",
-        str(paths.separated),
+        str(work),
         str(src_mp3),
     ]
     log("SPLIT", f"Running Demucs ({model}) -> {paths.separated}", WHITE)
-    run_cmd(cmd, tag="DEMUCS", dry_run=flags.dry_run)
-
     if flags.dry_run:
+        run_cmd(cmd, tag="DEMUCS", dry_run=True)
         return stem_dir
 
-    # Validate output
-    if not stem_dir.exists():
-        raise RuntimeError(f"Demucs output directory not found: {stem_dir}")
+    try:
+        rc = run_cmd(cmd, tag="DEMUCS")
+        out_dir = work / model / src_mp3.stem
+
+        # Validate output
+        if rc != 0 or not out_dir.exists():
+            raise RuntimeError(f"Demucs output directory not found: {out_dir} (exit {rc})")
 
-    missing = [name for name in ("vocals", "bass", "drums", "other") if not (stem_dir / f"{name}.wav").exists()]
-    if missing:
-        raise RuntimeError(f"Demucs stems missing in {stem_dir}: {missing}")
+        missing = [name for name in ("vocals", "bass", "drums", "other") if not (out_dir / f"{name}.wav").exists()]
+        if missing:
+            raise RuntimeError(f"Demucs stems missing in {out_dir}: {missing}")
+
+        stem_dir.parent.mkdir(parents=True, exist_ok=True)
+        if stem_dir.exists():
+            shutil.rmtree(stem_dir)
+        os.replace(out_dir, stem_dir)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
 
     return stem_dir
 
@@ -197,7 +217,6 @@ def _mix_stems_to_wav(
         fc,
         "-c:a",
         "pcm_s16le",
-        str(out_wav),
     ]
 
     log(
@@ -205,10 +224,7 @@ def _mix_stems_to_wav(
         f"Stems mix -> {out_wav.name} | vocals={vocals_pct:.0f}% bass={bass_pct:.0f}% drums={drums_pct:.0f}% other={other_pct:.0f}%",
         WHITE,
     )
-    run_cmd(cmd, tag="FFMPEG", dry_run=flags.dry_run)
-
-    if not flags.dry_run and not out_wav.exists():
-        raise RuntimeError(f"Failed to produce {out_wav}")
+    _run_ffmpeg_to(cmd, out_wav, flags)
 
 
 def step2_split(
@@ -260,7 +276,8 @@ def step2_split(
             if flags.dry_run:
                 log("SPLIT", f"[dry-run] Would copy {src_mp3} -> {out_mp3}", YELLOW)
             else:
-                out_mp3.write_bytes(src_mp3.read_bytes())
+                with atomic_output(out_mp3) as tmp:
+                    shutil.copyfile(src_mp3, tmp)
                 log("SPLIT", f"Copied full mix to {out_mp3}", GREEN)
 
         _ensure_wav_from_audio(out_mp3, out_wav, flags)
@@ -8,20 +8,30 @@ Sources (auto-prefer):
 1) timings/<slug>.lrc
 2) timings/<slug>*.vtt  (captions / auto-captions)
 
+3) forced alignment of txts/<slug>.txt to the vocals stem (align_lyrics.py),
+   with per-line confidence in timings/<slug>.align.json
+
+Rolling YouTube auto-captions are collapsed to one row per distinct line; their
+inline word timings are kept in timings/<slug>.words.csv
+(line_index,word_index,time_secs,word).
+
 If no source exists, Step3 errors (human intervention required).
 """
 
 from __future__ import annotations
 
 import re
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Iterator, List, Optional, Tuple
 
-from .common import IOFlags, Paths, log, should_write, write_csv
+from .common import IOFlags, Paths, log, should_write, write_csv, write_json, YELLOW
 
 
 _TS_LRC = re.compile(r"\[(\d+):(\d+(?:\.\d+)?)\](.*)")
-_TS_VTT = re.compile(r"^(\d\d):(\d\d):(\d\d)\.(\d\d\d)\s+-->\s+")
+_TS_VTT = re.compile(r"^(?:(\d+):)?(\d\d):(\d\d)\.(\d\d\d)\s+-->\s+")
+_VTT_INLINE_TS = re.compile(r"<(?:(\d+):)?(\d\d):(\d\d)\.(\d\d\d)>")
+_VTT_TAG = re.compile(r"</?[^>]*>")
 
 
 def _parse_lrc(path: Path) -> List[Tuple[float, str]]:
@@ -52,36 +62,105 @@ def _parse_lrc(path: Path) -> List[Tuple[float, str]]:
     return dedup
 
 
-def _parse_vtt(path: Path) -> List[Tuple[float, str]]:
-    lines = path.read_text(encoding="utf-8", errors="replace").splitlines()
-    out: List[Tuple[float, str]] = []
+@dataclass
+class CaptionLine:
+    start: float
+    text: str
+    # Word-level start times from inline <hh:mm:ss.mmm> tags (empty when absent).
+    words: List[Tuple[float, str]] = field(default_factory=list)
+
+
+def _ts_secs(hh: Optional[str], mm: str, ss: str, ms: str) -> float:
+    return int(hh or 0) * 3600.0 + int(mm) * 60.0 + int(ss) + int(ms) / 1000.0
+
+
+def _split_inline_timed(raw: str, cue_start: float) -> Tuple[str, List[Tuple[float, str]]]:
+    """Strip inline tags from one caption line and collect word start times.
+
+    Text before the first inline timestamp starts at the cue start.
+    """
+    words: List[Tuple[float, str]] = []
+    t = cue_start
+    pos = 0
+    for m in _VTT_INLINE_TS.finditer(raw):
+        for w in _VTT_TAG.sub("", raw[pos:m.start()]).split():
+            words.append((t, w))
+        t = _ts_secs(*m.groups())
+        pos = m.end()
+    for w in _VTT_TAG.sub("", raw[pos:]).split():
+        words.append((t, w))
+    text = " ".join(w for _, w in words)
+    return text, words
+
+
+def _iter_vtt_cues(lines: List[str]) -> Iterator[Tuple[float, List[str]]]:
     i = 0
     while i < len(lines):
         m = _TS_VTT.match(lines[i].strip())
         if not m:
             i += 1
             continue
-        hh, mm, ss, ms = map(int, m.groups())
-        t0 = hh * 3600.0 + mm * 60.0 + ss + (ms / 1000.0)
+        t0 = _ts_secs(*m.groups())
         i += 1
 
+        # A cue ends at an empty line; YouTube cues start with a " " line, so do not strip here.
         texts: List[str] = []
-        while i < len(lines) and lines[i].strip() != "":
+        while i < len(lines) and lines[i] != "" and not _TS_VTT.match(lines[i].strip()):
             txt = lines[i].strip()
             # Skip metadata notes; keep actual caption text
             if txt and not txt.startswith("NOTE") and not txt.startswith("Kind:") and not txt.startswith("Language:"):
                 texts.append(txt)
             i += 1
-
-        text = " ".join(texts).strip()
-        if text:
-            out.append((t0, text))
+        yield t0, texts
         i += 1
 
-    out.sort(key=lambda x: x[0])
+
+def normalize_vtt_cues(lines: List[str]) -> List[CaptionLine]:
+    """Turn VTT cue blocks into distinct caption lines.
+
+    YouTube auto-captions are "rolling": each phrase is shown in a cue with inline
+    <c> word tags, then repeated untagged in a ~10ms cue and again as the top line
+    of the next cue. When the file has inline tags, tagged lines are the new
+    content and untagged lines are only kept if they were not on screen in the
+    previous cue. Files without inline tags keep one row per cue.
+    Single pass, O(total lines).
+    """
+    rolling = any(_VTT_INLINE_TS.search(ln) or "<c>" in ln for ln in lines)
+    out: List[CaptionLine] = []
+    prev_cue: set[str] = set()
+
+    for t0, texts in _iter_vtt_cues(lines):
+        cue_texts: set[str] = set()
+        if not rolling:
+            text = " ".join(_VTT_TAG.sub("", t).strip() for t in texts).strip()
+            text = " ".join(text.split())
+            if text:
+                out.append(CaptionLine(t0, text))
+            continue
+
+        for raw in texts:
+            tagged = _VTT_INLINE_TS.search(raw) is not None
+            text, words = _split_inline_timed(raw, t0)
+            if not text:
+                continue
+            cue_texts.add(text)
+            if not tagged and (text in prev_cue or (out and out[-1].text == text)):
+                continue
+            out.append(CaptionLine(words[0][0] if tagged else t0, text, words if tagged else []))
+        prev_cue = cue_texts
+
+    out.sort(key=lambda c: c.start)
     return out
 
 
+def _parse_vtt_lines(path: Path) -> List[CaptionLine]:
+    return normalize_vtt_cues(path.read_text(encoding="utf-8", errors="replace").splitlines())
+
+
+def _parse_vtt(path: Path) -> List[Tuple[float, str]]:
+    return [(c.start, c.text) for c in _parse_vtt_lines(path)]
+
+
 def choose_vtt_for_slug(paths: Paths, slug: str) -> Path | None:
     candidates = sorted(paths.timings.glob(f"{slug}*.vtt"))
     if not candidates:
@@ -100,6 +179,22 @@ def choose_vtt_for_slug(paths: Paths, slug: str) -> Path | None:
     return sorted(candidates, key=score)[0]
 
 
+def _align_plain_lyrics(paths: Paths, slug: str, flags: IOFlags) -> list:
+    if flags.dry_run:
+        log("SYNC", "[dry-run] Skipping forced alignment", YELLOW)
+        return []
+    try:
+        from .align_lyrics import align_slug
+    except Exception as e:
+        log("SYNC", f"Forced alignment unavailable: {e}", YELLOW)
+        return []
+    try:
+        return align_slug(paths, slug)
+    except Exception as e:
+        log("SYNC", f"Forced alignment failed: {e}", YELLOW)
+        return []
+
+
 def step3_sync(paths: Paths, *, slug: str, flags: IOFlags) -> str:
     csv_path = paths.timings / f"{slug}.csv"
     if csv_path.exists() and not should_write(csv_path, flags, label="timings_csv"):
@@ -108,6 +203,8 @@ def step3_sync(paths: Paths, *, slug: str, flags: IOFlags) -> str:
 
     lrc_path = paths.timings / f"{slug}.lrc"
     rows: List[Tuple[float, str]] = []
+    words: List[List[str]] = []
+    align_report: dict | None = None
     source = "none"
 
     if lrc_path.exists():
@@ -117,17 +214,37 @@ def step3_sync(paths: Paths, *, slug: str, flags: IOFlags) -> str:
     if not rows:
         vtt = choose_vtt_for_slug(paths, slug)
         if vtt is not None and vtt.exists():
-            rows = _parse_vtt(vtt)
+            cues = _parse_vtt_lines(vtt)
+            rows = [(c.start, c.text) for c in cues]
+            for li, c in enumerate(cues):
+                words.extend([str(li), str(wi), f"{t:.3f}", w] for wi, (t, w) in enumerate(c.words))
             source = "vtt"
 
     if not rows:
-        raise RuntimeError(f"No LRC/VTT timings found for slug={slug} in {paths.timings}")
+        aligned = _align_plain_lyrics(paths, slug, flags)
+        if aligned:
+            rows = [(a.start, a.text) for a in aligned]
+            for li, a in enumerate(aligned):
+                words.extend([str(li), str(wi), f"{t:.3f}", w] for wi, (t, w) in enumerate(a.words))
+            align_report = {"lines": [{"line_index": li, "time_secs": round(a.start, 3), "confidence": a.confidence, "text": a.text} for li, a in enumerate(aligned)]}
+            source = "align"
+
+    if not rows:
+        raise RuntimeError(f"No LRC/VTT timings (and no alignable txt + audio) for slug={slug} in {paths.timings}")
 
     csv_rows: List[List[str]] = []
     for idx, (t, txt) in enumerate(rows):
         csv_rows.append([str(idx), f"{t:.3f}", txt])
 
-    write_csv(csv_path, ["line_index", "time_secs", "text"], csv_rows, flags, label="timings_csv")
+    if not write_csv(csv_path, ["line_index", "time_secs", "text"], csv_rows, flags, label="timings_csv"):
+        # Declined at the overwrite prompt (existing CSV kept) or dry run.
+        return "csv" if csv_path.exists() else source
+    # Word timings and the alignment report describe this build: only refresh them alongside the line CSV.
+    if words:
+        words_path = paths.timings / f"{slug}.words.csv"
+        write_csv(words_path, ["line_index", "word_index", "time_secs", "word"], words, flags, label="timings_words")
+    if align_report is not None:
+        write_json(paths.timings / f"{slug}.align.json", align_report, flags, label="align_report")
     log("SYNC", f"Built timings CSV from {source}: {csv_path}")
     return source
 
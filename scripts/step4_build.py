@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
-import csv, subprocess
+import subprocess
 from pathlib import Path
-from .common import IOFlags, Paths, log, run_cmd, should_write, write_text
+from .audio_cache import audio_input_and_args
+from .common import IOFlags, Paths, atomic_output, log, run_cmd, should_write, write_text
+from .encoders import keyframe_times, video_args
+from .timeline import load_timeline
 
 VIDEO_WIDTH, VIDEO_HEIGHT = 854, 480
 FPS = 5
@@ -25,17 +28,7 @@ def step4_build(paths: Paths, *, slug: str, offset: float, flags: IOFlags) -> Pa
         log("MP4", f"Reusing existing video: {out_path}")
         return out_path
 
-    rows = []
-    with open(csv_path, "r", encoding="utf-8") as f:
-        r = csv.DictReader(f)
-        for row in r:
-            try:
-                t = float(row.get("time_secs", ""))
-            except Exception:
-                continue
-            txt = (row.get("text") or "").strip()
-            if txt:
-                rows.append((t, txt))
+    rows = [(t, txt.strip()) for t, txt, _ in load_timeline(csv_path, warp=True).rows(nonempty=True)]
     if not rows:
         raise RuntimeError(f"Timings CSV has no usable rows: {csv_path}")
 
@@ -51,30 +44,40 @@ def step4_build(paths: Paths, *, slug: str, offset: float, flags: IOFlags) -> Pa
         return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
 
     srt_lines = []
+    boundaries = []
     for i, (t, txt) in enumerate(rows, 1):
         start = t + offset
         end = (rows[i][0] + offset) if i < len(rows) else (dur + offset)
         if end <= start: end = start + 2.0
         start, end = max(0, start), max(0.5, end)
+        boundaries += [start, min(end, dur)]
         srt_lines += [str(i),
                       f"{_sec_to_srt(start)} --> {_sec_to_srt(min(end, dur))}",
                       txt, ""]
     write_text(srt_path, "\n".join(srt_lines), flags, label="srt")
 
     vf = f"subtitles='{srt_path}'"
+    if flags.dry_run:
+        mux_audio, audio_args = audio_path, ["-c:a", "aac"]
+    else:
+        mux_audio, audio_args = audio_input_and_args(audio_path, paths.cache)
     cmd = [
         "ffmpeg", "-y", "-hide_banner", "-loglevel", "warning",
         "-f", "lavfi", "-i",
         f"color=c=black:s={VIDEO_WIDTH}x{VIDEO_HEIGHT}:r={FPS}:d={dur}",
-        "-i", str(audio_path),
+        "-i", str(mux_audio),
         "-vf", vf,
-        "-c:v", "libx264", "-preset", "ultrafast", "-crf", "23",
-        "-pix_fmt", "yuv420p", "-r", str(FPS),
-        "-c:a", "aac", "-shortest", str(out_path)
+        *video_args(fps=FPS, keyframes=keyframe_times(boundaries, fps=FPS, duration=dur)),
+        "-r", str(FPS),
+        *audio_args, "-shortest",
     ]
-    rc = run_cmd(cmd, tag="FFMPEG", dry_run=flags.dry_run)
-    if rc != 0:
-        raise RuntimeError(f"ffmpeg failed ({rc})")
+    if flags.dry_run:
+        run_cmd(cmd + [str(out_path)], tag="FFMPEG", dry_run=True)
+        return out_path
+    with atomic_output(out_path) as tmp:
+        rc = run_cmd(cmd + [str(tmp)], tag="FFMPEG")
+        if rc != 0:
+            raise RuntimeError(f"ffmpeg failed ({rc})")
     log("MP4", f"Wrote {out_path}")
     return out_path
 # end of step4_build.py
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""Drift / piecewise time-warp correction between an LRC and the audio version.
+
+For LRCs made for a slightly different master (longer intro, extra bar, tempo
+drift), a single --offset cannot line everything up. This module runs a banded
+DTW between the lyric-start impulse train and the vocal onset envelope (both at
+WARP_FPS) and turns the path into a piecewise-linear time map:
+
+    audio time = warp(csv time) + offset
+
+The band is centred on the current offset, so the map only holds the residual
+drift; offset nudges in the tuner still apply on top. Memory is O(frames x band)
+(~1 MB for a 10-minute track), and each DTW row is a handful of NumPy ops
+(the horizontal moves use a prefix-min scan), so there is no per-cell Python loop.
+
+Output: timings/<slug>.warp.json, picked up by 4_mp4 (build_ass) and offset_tuner.
+
+Usage:
+    python3 -m scripts.time_warp --slug <slug>
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .audio_io import decode_mono_f32
+from .common import Paths, atomic_write_text, log, GREEN, YELLOW
+from .offset_xcorr import ENV_HOP_MS, ENV_SR, impulse_train, onset_envelope
+from .timeline import load_timeline, warp_path_for
+
+WARP_FPS = 10.0  # DTW frame rate (100 ms)
+BAND_SECS = 8.0  # max local deviation from the current offset
+STEP_PENALTY = 0.15  # cost of a non-diagonal move (keeps the path near slope 1)
+MIN_SLOPE = 0.8
+MAX_SLOPE = 1.25
+SIMPLIFY_TOL_SECS = 0.05
+SMOOTH_KNOTS = 5
+
+# Backpointers
+_DIAG, _UP, _LEFT = 0, 1, 2
+
+
+def _zscore(x: np.ndarray) -> np.ndarray:
+    std = float(x.std())
+    return (x - x.mean()) / std if std > 0 else x - x.mean()
+
+
+def banded_dtw(x: np.ndarray, y: np.ndarray, *, center: int, band: int, penalty: float = STEP_PENALTY) -> np.ndarray:
+    """Banded DTW of x (rows) against y (cols) around j = i + center.
+
+    Returns the warping path as an (n, 2) int array of (i, j), one j per row i
+    (the mean column when the path moves horizontally). Open begin/end.
+    """
+    n, m = len(x), len(y)
+    w = 2 * band + 1
+    ks = np.arange(w)
+    inf = np.inf
+
+    ptr = np.zeros((n, w), dtype=np.int8)
+    prev = np.full(w, inf)
+    for i in range(n):
+        j = i + center - band + ks
+        valid = (j >= 0) & (j < m)
+        c = np.full(w, inf)
+        c[valid] = (x[i] - y[j[valid]]) ** 2
+
+        if i == 0:
+            base = c.copy()
+            step = np.full(w, _DIAG, dtype=np.int8)
+        else:
+            up = np.append(prev[1:], inf) + penalty  # (i-1, j) sits one column to the right
+            step = np.where(prev <= up, _DIAG, _UP).astype(np.int8)
+            base = np.minimum(prev, up) + c
+
+        # Horizontal moves: cur[k] = min_{q<=k} base[q] + sum_{q<l<=k} (c[l] + penalty)
+        # Invalid columns only sit at the band edges, so zero cost there never creates a shortcut.
+        ch = np.where(valid, c + penalty, 0.0)
+        cs = np.cumsum(ch)
+        cur = cs + np.minimum.accumulate(base - cs)
+        left = cur < base - 1e-12
+        cur = np.where(left, cur, base)
+        step[left] = _LEFT
+        cur[~valid] = inf
+
+        ptr[i] = step
+        prev = cur
+
+    # Backtrack from the best cell in the last row.
+    k = int(np.argmin(prev))
+    cols: List[List[int]] = [[] for _ in range(n)]
+    i = n - 1
+    while i >= 0:
+        cols[i].append(i + center - band + k)
+        s = ptr[i, k]
+        if s == _LEFT and k > 0:
+            k -= 1
+        elif s == _UP:
+            i -= 1
+            k += 1
+        else:
+            i -= 1
+    return np.array([(r, int(np.mean(c))) for r, c in enumerate(cols)], dtype=np.int64)
+
+
+def _simplify(src: np.ndarray, dst: np.ndarray, tol: float) -> List[int]:
+    """Ramer-Douglas-Peucker on the (src, dst - src) curve; returns kept indices."""
+    keep = {0, len(src) - 1}
+    stack = [(0, len(src) - 1)]
+    delta = dst - src
+    while stack:
+        a, b = stack.pop()
+        if b - a < 2:
+            continue
+        t = (src[a + 1:b] - src[a]) / max(src[b] - src[a], 1e-9)
+        line = delta[a] + t * (delta[b] - delta[a])
+        err = np.abs(delta[a + 1:b] - line)
+        k = int(np.argmax(err))
+        if err[k] > tol:
+            mid = a + 1 + k
+            keep.add(mid)
+            stack += [(a, mid), (mid, b)]
+    return sorted(keep)
+
+
+def path_to_knots(path: np.ndarray, line_starts: Sequence[float], *, fps: float = WARP_FPS) -> List[Tuple[float, float]]:
+    """Sample the path at each line start and turn it into smoothed, monotone knots."""
+    starts = np.asarray(sorted(line_starts), dtype=np.float64)
+    if starts.size == 0 or len(path) == 0:
+        return []
+    rows = np.clip(np.rint(starts * fps).astype(np.int64), 0, len(path) - 1)
+    delta = path[rows, 1] / fps - path[rows, 0] / fps
+
+    # Median-smooth the per-line deltas to drop single-line jitter.
+    if delta.size >= SMOOTH_KNOTS:
+        h = SMOOTH_KNOTS // 2
+        padded = np.pad(delta, h, mode="edge")
+        windows = np.lib.stride_tricks.sliding_window_view(padded, SMOOTH_KNOTS)
+        delta = np.median(windows, axis=1)
+
+    dst = starts + delta
+    # Enforce a sane local tempo ratio between consecutive knots.
+    for k in range(1, len(dst)):
+        ds = starts[k] - starts[k - 1]
+        dst[k] = np.clip(dst[k], dst[k - 1] + MIN_SLOPE * ds, dst[k - 1] + MAX_SLOPE * ds)
+
+    keep = _simplify(starts, dst, SIMPLIFY_TOL_SECS)
+    return [(round(float(starts[k]), 3), round(float(dst[k]), 3)) for k in keep]
+
+
+def estimate_time_map(
+    audio_path: Path,
+    line_starts: Sequence[float],
+    *,
+    offset: float = 0.0,
+    band_secs: float = BAND_SECS,
+) -> List[Tuple[float, float]]:
+    """Knots (csv time, audio time - offset) for the given lyric line starts."""
+    audio = decode_mono_f32(audio_path, sr=ENV_SR, af="highpass=f=120,lowpass=f=4000")
+    env = onset_envelope(audio, sr=ENV_SR, hop_ms=ENV_HOP_MS)
+
+    # Pool the 100 Hz envelope down to WARP_FPS (max keeps short onsets).
+    pool = max(1, int(round((1000.0 / ENV_HOP_MS) / WARP_FPS)))
+    m = len(env) // pool
+    y = _zscore(env[: m * pool].reshape(m, pool).max(axis=1).astype(np.float64))
+
+    n = max(m, int(np.ceil(max(line_starts) * WARP_FPS)) + 1)
+    x = _zscore(impulse_train(line_starts, n, fps=WARP_FPS, sigma_secs=0.15).astype(np.float64))
+
+    path = banded_dtw(x, y, center=int(round(offset * WARP_FPS)), band=int(band_secs * WARP_FPS))
+    knots = path_to_knots(path, line_starts)
+    return [(s, d - offset) for s, d in knots]
+
+
+def write_time_map(path: Path, knots: List[Tuple[float, float]], *, audio_path: Path, offset: float) -> None:
+    data = {
+        "version": 1,
+        "audio": str(audio_path),
+        "offset_at_fit": offset,
+        "fps": WARP_FPS,
+        "band_secs": BAND_SECS,
+        "knots": [list(k) for k in knots],
+    }
+    atomic_write_text(path, json.dumps(data, indent=2) + "\n")
+
+
+def fit_slug(paths: Paths, slug: str, *, offset: float = 0.0, audio_path: Optional[Path] = None) -> Optional[Path]:
+    csv_path = paths.timings / f"{slug}.csv"
+    if audio_path is None:
+        for p in (paths.separated / "htdemucs" / slug / "vocals.wav", paths.mixes / f"{slug}.wav", paths.mixes / f"{slug}.mp3"):
+            if p.exists():
+                audio_path = p
+                break
+    if audio_path is None:
+        log("WARP", f"No audio for {slug}", YELLOW)
+        return None
+
+    starts = [t for t, _, _ in load_timeline(csv_path).rows(nonempty=True)]
+    if len(starts) < 2:
+        log("WARP", f"Not enough lyric lines to fit a time map: {csv_path}", YELLOW)
+        return None
+
+    knots = estimate_time_map(audio_path, starts, offset=offset)
+    out = warp_path_for(csv_path)
+    write_time_map(out, knots, audio_path=audio_path, offset=offset)
+    deltas = [d - s for s, d in knots]
+    log("WARP", f"Wrote {out} ({len(knots)} knots, residual drift {min(deltas):+.2f}s..{max(deltas):+.2f}s)", GREEN)
+    return out
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Fit a piecewise-linear LRC -> audio time map (banded DTW)")
+    ap.add_argument("--slug", required=True)
+    ap.add_argument("--offset", type=float, default=None, help="Band centre (default: timings/<slug>.offset or 0)")
+    ap.add_argument("--audio", default=None)
+    args = ap.parse_args()
+
+    paths = Paths.from_scripts_dir(Path(__file__).resolve().parent)
+    offset = args.offset
+    if offset is None:
+        try:
+            offset = float((paths.timings / f"{args.slug}.offset").read_text(encoding="utf-8").strip())
+        except Exception:
+            offset = 0.0
+    out = fit_slug(paths, args.slug, offset=offset, audio_path=Path(args.audio) if args.audio else None)
+    return 0 if out else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
+# end of time_warp.py
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""Array-backed lyric timeline shared by every timings CSV consumer.
+
+Canonical CSV schema (see step3_sync):
+  line_index,time_secs,text
+Fallback 2-column format (no header):
+  time_secs,text            (line_index is treated as 0)
+
+A Timeline holds start/end arrays sorted by start time. Offsets are applied as a
+view: `tl.shifted(0.5)` shares the arrays and only changes the offset added on
+access, so previews, renders and checks can all use one parse. A drift
+correction (TimeMap, timings/<slug>.warp.json) is applied the same way via
+`tl.warped(...)`, before the offset.
+
+`load_timeline()` parses each file once per process; results are cached by the
+SHA-1 of the file bytes, so an edited CSV is re-parsed and an unchanged one is not.
+The cache keeps the CACHE_MAX most recently used parses, so long-running
+processes (watch_inbox, offset_tuner) do not grow with every edit.
+"""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import io
+import json
+import math
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class TimeMap:
+    """Monotone piecewise-linear map from CSV time to audio time.
+
+    Knots are (src, dst) pairs; outside the knots the first/last delta is kept
+    (slope 1). Stored next to the timings as timings/<slug>.warp.json.
+    """
+
+    src: Tuple[float, ...]
+    dst: Tuple[float, ...]
+
+    @staticmethod
+    def _interp(xs: Tuple[float, ...], ys: Tuple[float, ...], t: float) -> float:
+        if not xs:
+            return t
+        if t <= xs[0]:
+            return t + (ys[0] - xs[0])
+        if t >= xs[-1]:
+            return t + (ys[-1] - xs[-1])
+        k = bisect_right(xs, t)
+        x0, x1, y0, y1 = xs[k - 1], xs[k], ys[k - 1], ys[k]
+        return y0 + (y1 - y0) * (t - x0) / (x1 - x0) if x1 > x0 else y0
+
+    def __call__(self, t: float) -> float:
+        return self._interp(self.src, self.dst, t)
+
+    def inverse(self, t: float) -> float:
+        return self._interp(self.dst, self.src, t)
+
+
+def warp_path_for(csv_path: Path) -> Path:
+    """timings/<slug>.csv -> timings/<slug>.warp.json"""
+    return Path(csv_path).with_suffix(".warp.json")
+
+
+def load_time_map(path: Path) -> Optional[TimeMap]:
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        knots = sorted((float(a), float(b)) for a, b in data.get("knots") or [])
+    except Exception:
+        return None
+    if not knots:
+        return None
+    return TimeMap(src=tuple(k[0] for k in knots), dst=tuple(k[1] for k in knots))
+
+
+@dataclass(frozen=True)
+class Timeline:
+    starts: array  # 'd', raw CSV seconds, ascending
+    ends: array  # 'd', next row start; +inf for the last row
+    texts: Tuple[str, ...]
+    line_index: array  # 'l'
+    digest: str = ""
+    offset: float = 0.0
+    # Optional drift correction applied before the offset (see time_warp.py).
+    time_map: Optional[TimeMap] = None
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def shifted(self, delta: float) -> "Timeline":
+        """Return a view with `delta` seconds added to every time (arrays are shared)."""
+        return replace(self, offset=self.offset + float(delta))
+
+    def warped(self, time_map: Optional[TimeMap]) -> "Timeline":
+        """Return a view with a piecewise-linear time map applied (arrays are shared)."""
+        return replace(self, time_map=time_map)
+
+    def _map(self, t: float) -> float:
+        tm = self.time_map
+        return (tm(t) if tm is not None else t) + self.offset
+
+    def start(self, i: int) -> float:
+        return self._map(self.starts[i])
+
+    def end(self, i: int) -> float:
+        return self._map(self.ends[i])
+
+    def index_at(self, t: float) -> Optional[int]:
+        """Row on screen at time t (offset applied), or None before the first row."""
+        t = t - self.offset
+        if self.time_map is not None:
+            t = self.time_map.inverse(t)
+        i = bisect_right(self.starts, t) - 1
+        return i if i >= 0 else None
+
+    def text_at(self, t: float) -> str:
+        i = self.index_at(t)
+        return self.texts[i] if i is not None else ""
+
+    def first_start(self, *, nonempty: bool = False) -> Optional[float]:
+        for i in range(len(self)):
+            if not nonempty or self.texts[i].strip():
+                return self.start(i)
+        return None
+
+    def rows(self, *, nonempty: bool = False) -> Iterator[Tuple[float, str, int]]:
+        """Yield (time_secs, text, line_index) with the time map and offset applied."""
+        for t, txt, li in zip(self.starts, self.texts, self.line_index):
+            if nonempty and not txt.strip():
+                continue
+            yield self._map(t), txt, li
+
+
+CACHE_MAX = 8
+
+_CACHE_LOCK = threading.Lock()
+_CACHE: "OrderedDict[str, Timeline]" = OrderedDict()  # sha1 of the CSV bytes -> parse
+
+
+def _parse_rows(text: str) -> List[Tuple[float, str, int]]:
+    reader = csv.reader(io.StringIO(text))
+    header = next(reader, None)
+    rows: List[Tuple[float, str, int]] = []
+    if header is None:
+        return rows
+
+    if "time_secs" in header:
+        idx_time = header.index("time_secs")
+        idx_li = header.index("line_index") if "line_index" in header else None
+        idx_text = header.index("text") if "text" in header else None
+        body = reader
+    else:
+        idx_time, idx_li, idx_text = 0, None, 1
+        body = iter([header, *reader])
+
+    for row in body:
+        if not row or len(row) <= idx_time:
+            continue
+        try:
+            t = float(row[idx_time].strip())
+        except ValueError:
+            continue
+        li = 0
+        if idx_li is not None and len(row) > idx_li:
+            try:
+                li = int(row[idx_li])
+            except ValueError:
+                li = 0
+        txt = row[idx_text] if idx_text is not None and len(row) > idx_text else ""
+        rows.append((t, txt, li))
+    return rows
+
+
+def timeline_from_rows(rows: List[Tuple[float, str, int]], *, digest: str = "") -> Timeline:
+    rows = sorted(rows, key=lambda r: r[0])
+    starts = array("d", (r[0] for r in rows))
+    ends = array("d", starts[1:])
+    ends.append(math.inf)
+    return Timeline(
+        starts=starts,
+        ends=ends,
+        texts=tuple(r[1] for r in rows),
+        line_index=array("l", (r[2] for r in rows)),
+        digest=digest,
+    )
+
+
+def load_timeline(csv_path: Path, *, warp: bool = False) -> Timeline:
+    """Load timings/<slug>.csv (cached by content hash). Raises FileNotFoundError if missing.
+
+    warp=True applies timings/<slug>.warp.json when present.
+    """
+    data = Path(csv_path).read_bytes()
+    digest = hashlib.sha1(data).hexdigest()
+    with _CACHE_LOCK:
+        tl = _CACHE.get(digest)
+        if tl is not None:
+            _CACHE.move_to_end(digest)
+    if tl is None:
+        rows = _parse_rows(data.decode("utf-8", errors="replace").lstrip("\ufeff"))
+        tl = timeline_from_rows(rows, digest=digest)
+        with _CACHE_LOCK:
+            _CACHE[digest] = tl
+            while len(_CACHE) > CACHE_MAX:
+                _CACHE.popitem(last=False)
+    if warp:
+        tl = tl.warped(load_time_map(warp_path_for(csv_path)))
+    return tl
+
+
+# end of timeline.py
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""What was uploaded, keyed by the rendered MP4's content hash.
+
+meta/uploads.sqlite maps (SHA-1 of output/<slug>.mp4, endpoint) to the
+video_id it became, with the title/privacy it was published with. Before an
+upload the uploaders ask plan():
+- "skip"    same bytes, same title/privacy: already live, nothing to do
+- "update"  same bytes, new title/privacy: metadata-only videos.update
+- "upload"  new content (or never uploaded): full upload
+
+Usage:
+    python3 -m scripts.upload_registry             # what is live, per slug
+    python3 -m scripts.upload_registry --slug my_song --all
+"""
+
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .common import Paths
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    slug         TEXT NOT NULL,
+    content_sha1 TEXT NOT NULL,
+    size_bytes   INTEGER NOT NULL,
+    endpoint     TEXT NOT NULL,
+    video_id     TEXT NOT NULL,
+    title        TEXT NOT NULL,
+    privacy      TEXT NOT NULL,
+    uploaded_at  REAL NOT NULL,
+    updated_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS uploads_content ON uploads (content_sha1, endpoint);
+CREATE INDEX IF NOT EXISTS uploads_slug ON uploads (slug, uploaded_at);
+CREATE UNIQUE INDEX IF NOT EXISTS uploads_video ON uploads (video_id, endpoint);
+"""
+
+
+@dataclass
+class UploadRecord:
+    slug: str
+    content_sha1: str
+    size_bytes: int
+    endpoint: str
+    video_id: str
+    title: str
+    privacy: str
+    uploaded_at: float
+    updated_at: float
+
+
+_COLUMNS = "slug, content_sha1, size_bytes, endpoint, video_id, title, privacy, uploaded_at, updated_at"
+
+
+class UploadRegistry:
+    """Short-lived connections per call, so the uploader threads can share one instance."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as db, db:
+            db.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(str(self.path), timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def find(self, content_sha1: str, endpoint: str) -> Optional[UploadRecord]:
+        """Latest upload of these exact bytes to endpoint."""
+        with closing(self._connect()) as db:
+            row = db.execute(
+                f"SELECT {_COLUMNS} FROM uploads WHERE content_sha1 = ? AND endpoint = ? ORDER BY uploaded_at DESC LIMIT 1",
+                (content_sha1, endpoint),
+            ).fetchone()
+        return UploadRecord(*row) if row else None
+
+    def plan(self, content_sha1: str, endpoint: str, *, title: str, privacy: str) -> Tuple[str, Optional[UploadRecord]]:
+        """("skip" | "update" | "upload", existing record or None)."""
+        rec = self.find(content_sha1, endpoint)
+        if rec is None:
+            return "upload", None
+        if rec.title == title and rec.privacy == privacy:
+            return "skip", rec
+        return "update", rec
+
+    def record_upload(
+        self,
+        *,
+        slug: str,
+        content_sha1: str,
+        size_bytes: int,
+        endpoint: str,
+        video_id: str,
+        title: str,
+        privacy: str,
+    ) -> None:
+        now = time.time()
+        with closing(self._connect()) as db, db:
+            db.execute(
+                f"INSERT OR REPLACE INTO uploads ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (slug, content_sha1, size_bytes, endpoint, video_id, title, privacy, now, now),
+            )
+
+    def record_update(self, video_id: str, endpoint: str, *, title: str, privacy: str) -> None:
+        with closing(self._connect()) as db, db:
+            db.execute(
+                "UPDATE uploads SET title = ?, privacy = ?, updated_at = ? WHERE video_id = ? AND endpoint = ?",
+                (title, privacy, time.time(), video_id, endpoint),
+            )
+
+    def live(self, slug: Optional[str] = None, *, all_rows: bool = False) -> List[UploadRecord]:
+        """Newest upload per (slug, endpoint), or every upload with all_rows."""
+        where, args = ("WHERE slug = ?", (slug,)) if slug else ("", ())
+        if all_rows:
+            sql = f"SELECT {_COLUMNS} FROM uploads {where} ORDER BY slug, uploaded_at DESC"
+        else:
+            sql = (
+                f"SELECT {_COLUMNS} FROM uploads u {where} "
+                f"{'AND' if where else 'WHERE'} uploaded_at = "
+                "(SELECT MAX(uploaded_at) FROM uploads v WHERE v.slug = u.slug AND v.endpoint = u.endpoint) "
+                "ORDER BY slug"
+            )
+        with closing(self._connect()) as db:
+            return [UploadRecord(*r) for r in db.execute(sql, args).fetchall()]
+
+
+def registry_path(meta_dir: Path) -> Path:
+    return meta_dir / "uploads.sqlite"
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="List uploaded videos per slug (meta/uploads.sqlite)")
+    ap.add_argument("--slug", default=None)
+    ap.add_argument("--all", action="store_true", help="Every upload, not just the newest per slug")
+    args = ap.parse_args(argv)
+
+    paths = Paths.from_scripts_dir(Path(__file__).resolve().parent)
+    reg = UploadRegistry(registry_path(paths.meta))
+    rows = reg.live(args.slug, all_rows=args.all)
+    if not rows:
+        print("No uploads recorded.")
+        return 0
+    print(f"{'slug':32s} {'video_id':12s} {'privacy':9s} {'uploaded':16s} title")
+    for r in rows:
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(r.uploaded_at))
+        print(f"{r.slug[:32]:32s} {r.video_id:12s} {r.privacy:9s} {when:16s} {r.title}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
+# end of upload_registry.py
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""Watch mode: pick up hand-corrected timings and re-render only what changed.
+
+Watched locations:
+- timings_inbox/   dropped files, e.g. man-t-tienes-lo-que-quiero__lrclib.lrc
+- timings/         <slug>.lrc, <slug>.csv and <slug>.offset edits
+
+Inbox names are "<name>[__<source>].<ext>" where <name> is either the slug or
+"artist-title"; the slug is resolved against the known slugs (mp3s/, timings/,
+meta/). Dropped files are installed into timings/<slug>.<ext>.
+
+Actions per slug:
+- .lrc changed    -> rebuild timings/<slug>.csv (Step 3) and re-render
+- .csv changed    -> re-render
+- .offset changed -> re-render
+
+A persistent index (.cache/mixterioso/watch_index.json) stores the last seen
+(mtime_ns, size) of every watched file, so startup only stats the directories
+and edits made while the watcher was not running are still picked up. A slug's
+entries advance only once its edits were applied successfully; a failed rebuild
+or render is retried when the file changes again or the watcher restarts.
+
+Usage:
+    python3 -m scripts.watch_inbox             # poll forever
+    python3 -m scripts.watch_inbox --once      # process pending changes and exit
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from .common import IOFlags, Paths, atomic_output, atomic_write_text, log, run_cmd, slugify, GREEN, RED, WHITE, YELLOW
+from .journal import child_env, slug_lock
+from .step3_sync import step3_sync
+
+INDEX_VERSION = 1
+WATCH_EXTS = (".lrc", ".csv", ".offset")
+
+POLL_SECS = 1.0
+DEBOUNCE_SECS = 2.0
+
+Signature = Tuple[int, int]  # (mtime_ns, size)
+
+
+@dataclass
+class _Pending:
+    need_csv: bool = False
+    need_render: bool = False
+    # Files whose signature must stay unchanged for DEBOUNCE_SECS before acting.
+    files: Dict[str, Signature] = field(default_factory=dict)
+    last_change: float = 0.0
+
+
+# ─────────────────────────────────────────────
+# Index
+# ─────────────────────────────────────────────
+def _index_path(paths: Paths) -> Path:
+    return paths.cache / "watch_index.json"
+
+
+def _load_index(paths: Paths) -> Dict[str, Signature]:
+    p = _index_path(paths)
+    try:
+        data = json.loads(p.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+    if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+        return {}
+    files = data.get("files") or {}
+    return {k: (int(v[0]), int(v[1])) for k, v in files.items()}
+
+
+def _save_index(paths: Paths, index: Dict[str, Signature]) -> None:
+    atomic_write_text(_index_path(paths), json.dumps({"version": INDEX_VERSION, "files": index}))
+
+
+def _scan(paths: Paths) -> Dict[str, Signature]:
+    """Stat every watched file (os.scandir, no reads)."""
+    out: Dict[str, Signature] = {}
+    for d in (paths.inbox, paths.timings):
+        try:
+            it = os.scandir(d)
+        except FileNotFoundError:
+            continue
+        with it:
+            for e in it:
+                if not e.name.endswith(WATCH_EXTS) or not e.is_file():
+                    continue
+                st = e.stat()
+                out[str(Path(d.name) / e.name)] = (st.st_mtime_ns, st.st_size)
+    return out
+
+
+# ─────────────────────────────────────────────
+# Slug resolution
+# ─────────────────────────────────────────────
+def known_slugs(paths: Paths) -> Set[str]:
+    slugs: Set[str] = set()
+    for d, suffix in ((paths.mp3s, ".mp3"), (paths.timings, ".csv"), (paths.meta, ".step1.json")):
+        try:
+            names = os.listdir(d)
+        except FileNotFoundError:
+            continue
+        slugs.update(n[: -len(suffix)] for n in names if n.endswith(suffix))
+    return slugs
+
+
+def resolve_inbox_slug(name: str, known: Set[str]) -> Optional[str]:
+    """Map an inbox file name to a slug.
+
+    "man-t-tienes-lo-que-quiero__lrclib.lrc" -> "tienes_lo_que_quiero" when that
+    slug is known (artist prefix dropped), otherwise the slugified full name if known.
+    """
+    stem = name.rsplit(".", 1)[0].split("__", 1)[0]
+    cand = slugify(stem)
+    if cand in known:
+        return cand
+    best: Optional[str] = None
+    for s in known:
+        if cand.endswith("_" + s) and (best is None or len(s) > len(best)):
+            best = s
+    return best
+
+
+# ─────────────────────────────────────────────
+# Actions
+# ─────────────────────────────────────────────
+def _read_offset(paths: Paths, slug: str) -> float:
+    p = paths.timings / f"{slug}.offset"
+    try:
+        raw = p.read_text(encoding="utf-8", errors="ignore").strip()
+        return float(raw) if raw else 0.0
+    except Exception:
+        return 0.0
+
+
+def _install_inbox_file(paths: Paths, src: Path, slug: str, dry_run: bool) -> Path:
+    dst = paths.timings / f"{slug}{src.suffix}"
+    if dry_run:
+        log("WATCH", f"[dry-run] Would install {src.name} -> {dst}", YELLOW)
+        return dst
+    with atomic_output(dst, keep_suffix=False) as tmp:
+        shutil.copyfile(src, tmp)
+    log("WATCH", f"Installed {src.name} -> {dst}", GREEN)
+    return dst
+
+
+def _rebuild_csv(paths: Paths, slug: str, dry_run: bool) -> bool:
+    try:
+        step3_sync(paths, slug=slug, flags=IOFlags(force=True, dry_run=dry_run))
+        return True
+    except Exception as e:
+        log("WATCH", f"[{slug}] CSV rebuild failed: {e}", RED)
+        return False
+
+
+def _render(paths: Paths, slug: str, dry_run: bool) -> bool:
+    renderer = paths.scripts / "4_mp4.py"
+    offset = _read_offset(paths, slug)
+    cmd = [sys.executable, str(renderer), "--slug", slug, "--offset", str(offset)]
+    rc = run_cmd(cmd, env=child_env(), tag="RENDER", dry_run=dry_run)
+    return rc == 0
+
+
+# ─────────────────────────────────────────────
+# Watcher
+# ─────────────────────────────────────────────
+class InboxWatcher:
+    def __init__(self, paths: Paths, *, debounce_secs: float = DEBOUNCE_SECS, render: bool = True, dry_run: bool = False):
+        self.paths = paths
+        self.debounce_secs = debounce_secs
+        self.render = render
+        self.dry_run = dry_run
+        self.index = _load_index(paths)
+        self.pending: Dict[str, _Pending] = {}
+        # Signatures whose processing failed: not retried until the file changes again
+        # (or the watcher restarts, since the index was not advanced for them).
+        self.failed: Dict[str, Signature] = {}
+
+    def _classify(self, rel: str, known: Set[str]) -> Optional[Tuple[str, str]]:
+        """Return (slug, ext) for a changed file, or None if it maps to no slug."""
+        d, name = rel.split(os.sep, 1) if os.sep in rel else ("", rel)
+        if d == self.paths.inbox.name:
+            slug = resolve_inbox_slug(name, known)
+            return (slug, os.path.splitext(name)[1]) if slug else None
+        stem, ext = os.path.splitext(name)
+        # Ignore per-slug sidecars like <slug>.words.csv; only the canonical files count.
+        if "." in stem or stem not in known:
+            return None
+        return stem, ext
+
+    def poll(self) -> None:
+        now = time.time()
+        current = _scan(self.paths)
+        changed = [k for k, sig in current.items() if self.index.get(k) != sig]
+        removed = [k for k in self.index if k not in current]
+        for k in removed:
+            del self.index[k]
+
+        known = known_slugs(self.paths) if changed else set()
+        index_dirty = bool(removed)
+        for rel in changed:
+            hit = self._classify(rel, known)
+            if hit is None:
+                # Nothing to do for it; remember it so it is not reported again.
+                self.index[rel] = current[rel]
+                index_dirty = True
+                if rel.startswith(self.paths.inbox.name + os.sep):
+                    log("WATCH", f"No slug found for inbox file: {rel}", YELLOW)
+                continue
+            slug, ext = hit
+            # The index only advances once the slug is processed, so a pending (or
+            # failed) file keeps showing up as changed; only new signatures count.
+            if self.failed.get(rel) == current[rel]:
+                continue
+            if slug in self.pending and self.pending[slug].files.get(rel) == current[rel]:
+                continue
+            self.failed.pop(rel, None)
+            pend = self.pending.setdefault(slug, _Pending())
+            pend.files[rel] = current[rel]
+            pend.last_change = now
+            if ext == ".lrc":
+                pend.need_csv = True
+            pend.need_render = True
+            log("WATCH", f"[{slug}] change: {rel}", WHITE)
+
+        # Debounce: act only once every file for a slug has been quiet long enough.
+        for slug in list(self.pending):
+            pend = self.pending[slug]
+            if now - pend.last_change < self.debounce_secs:
+                continue
+            if any(current.get(rel) != sig for rel, sig in pend.files.items()):
+                pend.files = {rel: current[rel] for rel in pend.files if rel in current}
+                pend.last_change = now
+                continue
+            del self.pending[slug]
+            if self._apply(slug, pend):
+                index_dirty = True
+            else:
+                self.failed.update(pend.files)
+
+        if index_dirty and not self.dry_run:
+            _save_index(self.paths, self.index)
+
+    def _apply(self, slug: str, pend: _Pending) -> bool:
+        """Process one slug; on success advance the index for its files and our own writes."""
+        if self.dry_run:
+            return self._apply_locked(slug, pend)
+        with slug_lock(self.paths, slug, tag="WATCH"):
+            return self._apply_locked(slug, pend)
+
+    def _apply_locked(self, slug: str, pend: _Pending) -> bool:
+        written: List[Path] = []
+        for rel in pend.files:
+            if rel.startswith(self.paths.inbox.name + os.sep):
+                written.append(_install_inbox_file(self.paths, self.paths.root / rel, slug, self.dry_run))
+
+        if pend.need_csv:
+            if not _rebuild_csv(self.paths, slug, self.dry_run):
+                return False
+            written.append(self.paths.timings / f"{slug}.csv")
+        if pend.need_render and self.render:
+            if not _render(self.paths, slug, self.dry_run):
+                log("WATCH", f"[{slug}] render failed", RED)
+                return False
+            log("WATCH", f"[{slug}] re-rendered", GREEN)
+
+        # The edits that triggered this run, plus our own writes (installed files,
+        # rebuilt CSV) so they do not retrigger the slug. Other slugs' files are
+        # left alone: an edit made during a long render is still picked up.
+        self.index.update(pend.files)
+        if self.dry_run:
+            return True
+        for p in written:
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            self.index[str(Path(p.parent.name) / p.name)] = (st.st_mtime_ns, st.st_size)
+        return True
+
+    def run(self, *, once: bool = False, poll_secs: float = POLL_SECS) -> None:
+        log("WATCH", f"Watching {self.paths.inbox} and {self.paths.timings} ({len(self.index)} indexed files)")
+        while True:
+            self.poll()
+            if once and not self.pending:
+                return
+            time.sleep(poll_secs)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Watch timings_inbox/ and timings/ and re-render changed songs")
+    ap.add_argument("--once", action="store_true", help="Process pending changes and exit")
+    ap.add_argument("--debounce", type=float, default=DEBOUNCE_SECS, help="Seconds a file must be unchanged before acting")
+    ap.add_argument("--poll", type=float, default=POLL_SECS, help="Poll interval in seconds")
+    ap.add_argument("--no-render", action="store_true", help="Only rebuild CSVs, do not re-render")
+    ap.add_argument("--dry-run", action="store_true", help="Print actions without writing")
+    args = ap.parse_args(argv)
+
+    paths = Paths.from_scripts_dir(Path(__file__).resolve().parent)
+    paths.ensure()
+
+    watcher = InboxWatcher(paths, debounce_secs=args.debounce, render=not args.no_render, dry_run=args.dry_run)
+    try:
+        watcher.run(once=args.once, poll_secs=args.poll)
+    except KeyboardInterrupt:
+        log("WATCH", "Stopped", YELLOW)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
+# end of watch_inbox.py
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""Process-wide faster-whisper model pool + batched window transcription.
+
+Models are loaded lazily and kept in a small LRU keyed by
+(size, compute_type, cpu_threads), so repeated first-word guard passes,
+alignment and batch runs pay the model load once per process.
+
+transcribe_windows() sends every window of one audio buffer through a single
+BatchedInferencePipeline call (clip_timestamps) when available, and falls back
+to one model.transcribe() per window otherwise.
+
+Env:
+    MIXTERIOSO_WHISPER_POOL   max models kept loaded (default 2)
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .common import log, CYAN
+
+SR = 16000
+DEFAULT_COMPUTE_TYPE = "int8"
+DEFAULT_CPU_THREADS = 4
+BATCH_SIZE = 8
+MAX_CLIP_SECS = 30.0  # Whisper's receptive field; longer merged windows are split
+
+AsrWord = Tuple[float, float, str, float]  # (start, end, word, probability)
+PoolKey = Tuple[str, str, int]
+
+_LOCK = threading.Lock()
+_MODELS: "OrderedDict[PoolKey, Tuple[Any, Any]]" = OrderedDict()  # key -> (model, batched pipeline or None)
+
+
+def _max_models() -> int:
+    try:
+        return max(1, int(os.environ.get("MIXTERIOSO_WHISPER_POOL", "2")))
+    except ValueError:
+        return 2
+
+
+def _import_faster_whisper():
+    try:
+        import faster_whisper
+    except Exception as e:
+        raise RuntimeError(
+            "Missing dependency faster-whisper. Install with:\n"
+            "  pip3 install faster-whisper\n"
+            f"Original error: {e}"
+        )
+    return faster_whisper
+
+
+def _entry(size: str, compute_type: str, cpu_threads: int) -> Tuple[Any, Any]:
+    key: PoolKey = (size, compute_type, int(cpu_threads))
+    with _LOCK:
+        hit = _MODELS.get(key)
+        if hit is not None:
+            _MODELS.move_to_end(key)
+            return hit
+
+        fw = _import_faster_whisper()
+        t0 = time.perf_counter()
+        model = fw.WhisperModel(size, device="cpu", compute_type=compute_type, cpu_threads=int(cpu_threads))
+        batched_cls = getattr(fw, "BatchedInferencePipeline", None)
+        pipe = batched_cls(model=model) if batched_cls is not None else None
+        log("WHISPER", f"Loaded model {size} ({compute_type}, {cpu_threads} threads) in {time.perf_counter() - t0:.2f}s", CYAN)
+
+        _MODELS[key] = (model, pipe)
+        while len(_MODELS) > _max_models():
+            old, _ = _MODELS.popitem(last=False)
+            log("WHISPER", f"Evicted model {old[0]} ({old[1]}, {old[2]} threads)", CYAN)
+        return model, pipe
+
+
+def get_model(size: str, *, compute_type: str = DEFAULT_COMPUTE_TYPE, cpu_threads: int = DEFAULT_CPU_THREADS):
+    """Shared WhisperModel for (size, compute_type, cpu_threads); loaded on first use."""
+    return _entry(size, compute_type, cpu_threads)[0]
+
+
+def clear() -> None:
+    with _LOCK:
+        _MODELS.clear()
+
+
+def _merge_windows(windows: Sequence[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """Union of overlapping windows, split again to <= MAX_CLIP_SECS."""
+    merged: List[List[float]] = []
+    for s, e in sorted((float(s), float(e)) for s, e in windows if e > s):
+        if merged and s <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], e)
+        else:
+            merged.append([s, e])
+    out: List[Tuple[float, float]] = []
+    for s, e in merged:
+        while e - s > MAX_CLIP_SECS:
+            out.append((s, s + MAX_CLIP_SECS))
+            s += MAX_CLIP_SECS
+        out.append((s, e))
+    return out
+
+
+def _collect(segments, base: float, words: List[AsrWord]) -> None:
+    for seg in segments:
+        for w in seg.words or []:
+            if w.word and w.word.strip():
+                start = float(w.start if w.start is not None else seg.start)
+                end = float(w.end if w.end is not None else start)
+                words.append((base + start, base + end, w.word.strip(), float(w.probability or 0.0)))
+
+
+def transcribe_windows(
+    audio: np.ndarray,
+    windows: Sequence[Tuple[float, float]],
+    *,
+    model_size: str,
+    language: Optional[str] = None,
+    compute_type: str = DEFAULT_COMPUTE_TYPE,
+    cpu_threads: int = DEFAULT_CPU_THREADS,
+    batch_size: int = BATCH_SIZE,
+) -> List[List[AsrWord]]:
+    """Word-timestamped transcription of windows (seconds into a 16 kHz mono buffer).
+
+    Overlapping windows are transcribed once. Returns, per input window, the
+    words whose start falls inside it, with times in seconds into `audio`.
+    """
+    if not windows:
+        return []
+    clips = _merge_windows(windows)
+    model, pipe = _entry(model_size, compute_type, cpu_threads)
+
+    words: List[AsrWord] = []
+    t0 = time.perf_counter()
+    if pipe is not None:
+        segments, _ = pipe.transcribe(
+            audio,
+            language=language,
+            vad_filter=False,
+            # The batched pipeline slices audio by these values: sample indices, not seconds.
+            clip_timestamps=[{"start": int(s * SR), "end": int(e * SR)} for s, e in clips],
+            batch_size=batch_size,
+            word_timestamps=True,
+            beam_size=1,
+        )
+        # Segment times come back offset by their clip start, i.e. seconds into `audio`.
+        _collect(segments, 0.0, words)
+    else:
+        for s, e in clips:
+            segments, _ = model.transcribe(
+                audio[int(s * SR):int(e * SR)],
+                language=language,
+                beam_size=1,
+                vad_filter=False,
+                word_timestamps=True,
+                condition_on_previous_text=False,
+                temperature=0.0,
+            )
+            _collect(segments, s, words)
+    words.sort(key=lambda w: w[0])
+
+    secs = sum(e - s for s, e in clips)
+    mode = "batched" if pipe is not None else "sequential"
+    log("WHISPER", f"Transcribed {len(clips)} window(s), {secs:.1f}s audio in {time.perf_counter() - t0:.2f}s ({mode}, model={model_size})", CYAN)
+
+    return [[w for w in words if s <= w[0] < e] for s, e in windows]
+
+
+# end of whisper_pool.py
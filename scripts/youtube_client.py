@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""Long-lived YouTube client shared by every upload in a process.
+
+- OAuth credentials are loaded once and refreshed only when they are within
+  REFRESH_MARGIN_SECS of expiry; refreshed tokens are written back to
+  youtube_token.json, so the next process starts with a valid token.
+- HTTP sessions (AuthorizedSession for Google, plain requests for a local
+  mock) are created once per thread and reused.
+- The googleapiclient service for non-media calls (videos.list/update) is
+  built on first use from a discovery document cached in
+  .cache/mixterioso/youtube_v3_discovery.json (build_from_document), so there
+  is no discovery fetch and no googleapiclient import for plain uploads.
+
+Google libraries are imported lazily; the mock endpoint needs none of them.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import json
+import os
+import sys
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Optional
+
+from . import resumable_upload
+from .common import atomic_write_text, log, CYAN, GREEN, RED, YELLOW
+
+# Scopes for uploading videos; videos.update (metadata-only re-uploads) needs force-ssl
+YOUTUBE_UPLOAD_SCOPE = [
+    "https://www.googleapis.com/auth/youtube.upload",
+    "https://www.googleapis.com/auth/youtube.force-ssl",
+]
+REFRESH_MARGIN_SECS = 300
+DISCOVERY_URL = "https://www.googleapis.com/discovery/v1/apis/youtube/v3/rest"
+DISCOVERY_MAX_AGE_SECS = 30 * 24 * 3600
+DISCOVERY_PATH = Path(__file__).resolve().parent.parent / ".cache" / "mixterioso" / "youtube_v3_discovery.json"
+
+
+# ─────────────────────────────────────────────
+# Secrets / OAuth helpers
+# ─────────────────────────────────────────────
+def load_secrets_path() -> Path:
+    """
+    Resolve the location of client_secret.json based on YOUTUBE_CLIENT_SECRETS_JSON.
+
+    Accepts:
+      - exact file path to client_secret.json
+      - directory containing client_secret.json
+    """
+    raw = os.getenv("YOUTUBE_CLIENT_SECRETS_JSON")
+
+    if not raw:
+        log("SECRETS", "YOUTUBE_CLIENT_SECRETS_JSON is not set.", RED)
+        sys.exit(1)
+
+    p = Path(raw).expanduser()
+
+    if p.is_file():
+        return p
+
+    if p.is_dir():
+        guess = p / "client_secret.json"
+        if guess.exists():
+            return guess
+
+    log("SECRETS", f"Invalid secrets path: {p}", RED)
+    sys.exit(1)
+
+
+def _needs_refresh(creds) -> bool:
+    if creds.token is None:
+        return True
+    expiry = getattr(creds, "expiry", None)
+    if expiry is None:
+        return False
+    # google-auth keeps expiry as a naive UTC datetime
+    left = (expiry - dt.datetime.utcnow()).total_seconds()
+    return left < REFRESH_MARGIN_SECS
+
+
+def _token_scopes(token_path: Path) -> set:
+    """Scopes recorded in a saved token (what the user consented to)."""
+    try:
+        granted = json.loads(token_path.read_text(encoding="utf-8")).get("scopes") or []
+    except Exception:
+        return set()
+    return set(granted.split() if isinstance(granted, str) else granted)
+
+
+def get_credentials(secrets_path: Path):
+    """
+    Get or create OAuth credentials for the YouTube upload scopes.
+
+    Token is stored as youtube_token.json next to client_secret.json. A token
+    saved before a scope was added is discarded and the consent flow re-run.
+    """
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+
+    token_path = secrets_path.parent / "youtube_token.json"
+    creds = None
+
+    missing = set(YOUTUBE_UPLOAD_SCOPE) - _token_scopes(token_path) if token_path.exists() else set()
+    if missing:
+        log("OAUTH", f"Saved token lacks {', '.join(sorted(missing))}; asking for consent again", YELLOW)
+
+    # Try to load existing token
+    if token_path.exists() and not missing:
+        try:
+            creds = Credentials.from_authorized_user_file(
+                str(token_path),
+                YOUTUBE_UPLOAD_SCOPE,
+            )
+        except Exception:
+            creds = None
+
+    # Refresh only when close to expiry; run the OAuth flow if that is not possible
+    if creds and _needs_refresh(creds) and creds.refresh_token:
+        try:
+            log("OAUTH", "Refreshing existing OAuth token...", CYAN)
+            creds.refresh(Request())
+            atomic_write_text(token_path, creds.to_json())
+        except Exception:
+            creds = None
+
+    if not creds or _needs_refresh(creds):
+        from google_auth_oauthlib.flow import InstalledAppFlow
+
+        log("OAUTH", "Running OAuth login flow...", CYAN)
+        flow = InstalledAppFlow.from_client_secrets_file(
+            str(secrets_path),
+            scopes=YOUTUBE_UPLOAD_SCOPE,
+        )
+        # This opens a browser and listens on localhost
+        creds = flow.run_local_server(port=0)
+        atomic_write_text(token_path, creds.to_json())
+        log("OAUTH", f"Saved OAuth token to {token_path}", GREEN)
+
+    return creds
+
+
+# ─────────────────────────────────────────────
+# Discovery document
+# ─────────────────────────────────────────────
+def discovery_document(session=None) -> dict:
+    """youtube v3 discovery doc: local cache, refreshed monthly; stale cache beats no cache."""
+    cached: Optional[dict] = None
+    try:
+        cached = json.loads(DISCOVERY_PATH.read_text(encoding="utf-8"))
+        if time.time() - DISCOVERY_PATH.stat().st_mtime < DISCOVERY_MAX_AGE_SECS:
+            return cached
+    except Exception:
+        cached = None
+
+    try:
+        if session is not None:
+            resp = session.request("GET", DISCOVERY_URL, timeout=30)
+            resp.raise_for_status()
+            doc = resp.json()
+        else:
+            from urllib.request import urlopen
+
+            with urlopen(DISCOVERY_URL, timeout=30) as r:
+                doc = json.loads(r.read().decode("utf-8"))
+    except Exception as e:
+        if cached is not None:
+            log("YOUTUBE", f"Discovery refresh failed ({e}); using cached document", YELLOW)
+            return cached
+        raise
+
+    atomic_write_text(DISCOVERY_PATH, json.dumps(doc))
+    return doc
+
+
+# ─────────────────────────────────────────────
+# Client
+# ─────────────────────────────────────────────
+class YouTubeClient:
+    """Credentials + per-thread HTTP sessions + lazily built API service for one endpoint."""
+
+    def __init__(self, endpoint: str) -> None:
+        self.endpoint = endpoint.rstrip("/")
+        self.uses_oauth = self.endpoint == resumable_upload.DEFAULT_ENDPOINT
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._creds: Any = None
+        self._token_path: Optional[Path] = None
+        self._service: Any = None
+
+    def credentials(self):
+        with self._lock:
+            if self._creds is None:
+                t0 = time.perf_counter()
+                secrets_path = load_secrets_path()
+                self._token_path = secrets_path.parent / "youtube_token.json"
+                self._creds = get_credentials(secrets_path)
+                log("YOUTUBE", f"Credentials ready in {time.perf_counter() - t0:.2f}s", CYAN)
+            elif _needs_refresh(self._creds) and self._creds.refresh_token:
+                from google.auth.transport.requests import Request
+
+                log("OAUTH", "Token near expiry; refreshing", CYAN)
+                self._creds.refresh(Request())
+                atomic_write_text(self._token_path, self._creds.to_json())
+            return self._creds
+
+    def session(self):
+        """This thread's HTTP session (created on first use)."""
+        if self.uses_oauth:
+            creds = self.credentials()
+        sess = getattr(self._local, "session", None)
+        if sess is None:
+            if self.uses_oauth:
+                from google.auth.transport.requests import AuthorizedSession
+
+                sess = AuthorizedSession(creds)
+            else:
+                import requests
+
+                log("UPLOAD", f"Using endpoint {self.endpoint} (no OAuth)", YELLOW)
+                sess = requests.Session()
+            self._local.session = sess
+        return sess
+
+    def service(self):
+        """googleapiclient resource for non-media calls, built once from the cached discovery doc."""
+        with self._lock:
+            if self._service is not None:
+                return self._service
+        from googleapiclient.discovery import build_from_document
+
+        doc = discovery_document(self.session() if self.uses_oauth else None)
+        kwargs: dict = {"credentials": self.credentials()} if self.uses_oauth else {}
+        if not self.uses_oauth:
+            import httplib2
+
+            kwargs["http"] = httplib2.Http()
+            kwargs["client_options"] = {"api_endpoint": f"{self.endpoint}/youtube/v3/"}
+        svc = build_from_document(doc, **kwargs)
+        with self._lock:
+            self._service = self._service or svc
+            return self._service
+
+
+@lru_cache(maxsize=4)
+def _client_for(endpoint: str) -> YouTubeClient:
+    return YouTubeClient(endpoint)
+
+
+def get_client(endpoint: Optional[str] = None) -> YouTubeClient:
+    """The process-wide client for endpoint (default: MIXTERIOSO_YOUTUBE_ENDPOINT or Google)."""
+    return _client_for((endpoint or resumable_upload.endpoint_from_env()).rstrip("/"))
+
+
+# end of youtube_client.py
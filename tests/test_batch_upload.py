@@ -0,0 +1,140 @@
+"""run_batch() and QuotaTracker against scripts/mock_youtube.py with a fake clock."""
+
+import datetime as dt
+import json
+import os
+import threading
+import time
+
+import pytest
+import requests
+
+from scripts import mock_youtube, resumable_upload
+from scripts.batch_upload import QUOTA_COSTS, QUOTA_TZ, QuotaTracker, UploadJob, run_batch
+from scripts.resumable_upload import CHUNK_ALIGN
+
+
+class FakeClock:
+    def __init__(self, start: dt.datetime) -> None:
+        self.now = start
+        self.slept = []
+
+    def __call__(self) -> dt.datetime:
+        return self.now
+
+    def sleep(self, secs: float) -> None:
+        self.slept.append(secs)
+        self.now += dt.timedelta(seconds=secs)
+
+
+class FakeUploader:
+    """The bits of 5_upload.py run_batch uses, uploading straight to the mock."""
+
+    def __init__(self, meta_dir, *, hold=0.0):
+        self.META_DIR = meta_dir
+        self.hold = hold
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def open_session(self, endpoint):
+        return requests.Session()
+
+    def publish(self, session, slug, video_path, title, description, tags, *, privacy, endpoint, chunk_size, progress):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.hold)
+            video_id = resumable_upload.upload_resumable(
+                session, video_path, {"snippet": {"title": title}},
+                state_file=resumable_upload.state_path(self.META_DIR, slug),
+                endpoint=endpoint, chunk_size=chunk_size,
+            )
+        finally:
+            with self.lock:
+                self.active -= 1
+        return video_id, "upload"
+
+    def extract_thumbnail(self, video_path, thumb_path, time_sec):
+        thumb_path.write_bytes(b"\xff\xd8jpeg")
+
+    def set_thumbnail(self, session, video_id, thumb_path, *, endpoint):
+        resumable_upload.set_thumbnail(session, video_id, thumb_path, endpoint=endpoint)
+
+
+@pytest.fixture
+def srv(tmp_path):
+    server = mock_youtube.start(tmp_path / "server")
+    yield server
+    server.shutdown()
+
+
+def _jobs(tmp_path, n):
+    jobs = []
+    for i in range(n):
+        path = tmp_path / "output" / f"song_{i}.mp4"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(os.urandom(CHUNK_ALIGN + i + 1))
+        jobs.append(UploadJob(f"song_{i}", path, f"Song {i} (Karaoke)", []))
+    return jobs
+
+
+def _run(uploader, jobs, srv, quota, workers):
+    return run_batch(
+        uploader, jobs, endpoint=srv.endpoint, privacy="unlisted", quota=quota,
+        workers=workers, chunk_size=CHUNK_ALIGN, wait=True,
+    )
+
+
+def test_pool_bounds_concurrent_uploads(tmp_path, srv):
+    uploader = FakeUploader(tmp_path / "meta", hold=0.1)
+    quota = QuotaTracker(tmp_path / "quota.json", daily_limit=100000)
+
+    outcomes = _run(uploader, _jobs(tmp_path, 6), srv, quota, workers=2)
+
+    assert sorted(o.status for o in outcomes) == ["uploaded"] * 6
+    assert uploader.peak == 2
+    assert srv.state.calls["videos.insert"] == 6
+
+
+def test_quota_charged_per_call(tmp_path, srv):
+    clock = FakeClock(dt.datetime(2026, 3, 10, 12, 0, tzinfo=QUOTA_TZ))
+    quota = QuotaTracker(tmp_path / "quota.json", clock=clock, sleep=clock.sleep)
+
+    _run(FakeUploader(tmp_path / "meta"), _jobs(tmp_path, 2), srv, quota, workers=2)
+
+    saved = json.loads((tmp_path / "quota.json").read_text(encoding="utf-8"))
+    assert saved["calls"] == {"videos.insert": 2, "thumbnails.set": 2}
+    assert saved["used"] == 2 * (1600 + 50) == 2 * (QUOTA_COSTS["videos.insert"] + QUOTA_COSTS["thumbnails.set"])
+    assert srv.state.calls == {"videos.insert": 2, "thumbnails.set": 2}
+    assert quota.remaining() == 10000 - 3300
+    assert clock.slept == []
+
+
+def test_waits_for_pacific_midnight_when_insert_does_not_fit(tmp_path, srv):
+    # 23:00 Pacific; one insert + thumbnail leaves 350 units, less than the next insert.
+    clock = FakeClock(dt.datetime(2026, 3, 10, 23, 0, tzinfo=QUOTA_TZ))
+    quota = QuotaTracker(tmp_path / "quota.json", daily_limit=2000, clock=clock, sleep=clock.sleep)
+
+    outcomes = _run(FakeUploader(tmp_path / "meta"), _jobs(tmp_path, 2), srv, quota, workers=1)
+
+    assert sorted(o.status for o in outcomes) == ["uploaded", "uploaded"]
+    assert sum(clock.slept) == pytest.approx(3600.0)
+    assert clock.now.date() == dt.date(2026, 3, 11)
+    saved = json.loads((tmp_path / "quota.json").read_text(encoding="utf-8"))
+    assert saved["day"] == "2026-03-11"
+    assert saved["used"] == 1650
+    assert srv.state.calls["videos.insert"] == 2
+
+
+def test_reserve_without_wait_defers(tmp_path):
+    clock = FakeClock(dt.datetime(2026, 3, 10, 23, 0, tzinfo=QUOTA_TZ))
+    quota = QuotaTracker(tmp_path / "quota.json", daily_limit=2000, clock=clock, sleep=clock.sleep)
+    stop = threading.Event()
+
+    assert quota.reserve("videos.insert", wait=False, stop=stop)
+    assert not quota.reserve("videos.insert", wait=False, stop=stop)
+    assert quota.reserve("thumbnails.set", wait=False, stop=stop)
+    assert quota.remaining() == 350
+    assert clock.slept == []
@@ -0,0 +1,117 @@
+"""scan() and plan_eviction() rules of scripts/cache_gc.py on a throwaway tree."""
+
+import os
+import time
+
+import pytest
+
+from scripts import journal
+from scripts.cache_gc import CacheItem, plan_eviction, scan
+from scripts.common import Paths
+from scripts.journal import slug_lock
+
+OLD = time.time() - 30 * 86400
+
+
+@pytest.fixture
+def paths(tmp_path, monkeypatch):
+    monkeypatch.delenv(journal.LOCKS_ENV, raising=False)
+    p = Paths.from_scripts_dir(tmp_path / "scripts")
+    p.ensure()
+    return p
+
+
+def _touch(path, size=10, when=OLD):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"\0" * size)
+    os.utime(path, (when, when))
+    return path
+
+
+def _scanned(paths):
+    return {it.path.relative_to(paths.root).as_posix(): it for it in scan(paths)}
+
+
+def test_sources_and_deliverables_are_never_scanned(paths):
+    keep = [
+        paths.mp3s / "song.mp3",
+        paths.txts / "song.txt",
+        paths.timings / "song.lrc",
+        paths.timings / "song.offset.json",
+        paths.meta / "song.journal.json",
+        paths.mixes / "song.mp3",
+        paths.output / "song.mp4",
+        paths.output / "song.jpg",
+        paths.cache / "quota.json",
+    ]
+    for p in keep:
+        _touch(p)
+    _touch(paths.output / "song.ass")
+    _touch(paths.output / "song.draft.mp4")
+    _touch(paths.separated / "htdemucs" / "song" / "vocals.wav")
+
+    found = _scanned(paths)
+
+    assert set(found) == {"output/song.ass", "output/song.draft.mp4", "separated/htdemucs/song"}
+    assert {it.category for it in found.values()} == {"ass", "stems"}
+    assert all(it.slug == "song" for it in found.values())
+
+
+def test_mix_wav_only_evictable_while_its_mp3_exists(paths):
+    _touch(paths.mixes / "kept.wav")
+    _touch(paths.mixes / "song.wav")
+    _touch(paths.mixes / "other.wav")
+    _touch(paths.mp3s / "song.mp3")
+    _touch(paths.mixes / "other.mp3")
+
+    assert set(_scanned(paths)) == {"mixes/song.wav", "mixes/other.wav"}
+
+    (paths.mp3s / "song.mp3").unlink()
+    assert set(_scanned(paths)) == {"mixes/other.wav"}
+
+
+def test_dir_items_sum_their_files_and_take_the_newest_use(paths):
+    stems = paths.separated / "htdemucs" / "song"
+    _touch(stems / "vocals.wav", size=100, when=OLD)
+    _touch(stems / "no_vocals.wav", size=50, when=OLD + 3600)
+
+    item = _scanned(paths)["separated/htdemucs/song"]
+
+    assert item.size == 150
+    assert item.last_used == pytest.approx(OLD + 3600)
+
+
+@pytest.mark.skipif(journal.fcntl is None, reason="advisory locks need fcntl")
+def test_items_of_locked_slugs_are_skipped(paths):
+    _touch(paths.output / "busy.ass")
+    _touch(paths.separated / "htdemucs" / "busy" / "vocals.wav")
+    _touch(paths.output / "idle.ass")
+    _touch(paths.cache / "previews" / "clip.wav")  # no slug, never lock-checked
+
+    with slug_lock(paths, "busy"):
+        assert set(_scanned(paths)) == {"output/idle.ass", ".cache/mixterioso/previews/clip.wav"}
+    assert "output/busy.ass" in _scanned(paths)
+
+
+def _item(name, size, age, now):
+    return CacheItem("scratch", name, size, now - age)
+
+
+def test_plan_evicts_oldest_first_until_within_budget():
+    now = 1_000_000.0
+    items = [_item("b", 40, 2000, now), _item("a", 30, 5000, now), _item("c", 50, 1000, now), _item("d", 20, 3000, now)]
+
+    victims = plan_eviction(items, 80, min_age_secs=600, now=now)
+
+    # 140 total: drop a (oldest, -> 110), d (-> 90), b (-> 50); c is never needed.
+    assert [it.path for it in victims] == ["a", "d", "b"]
+    assert plan_eviction(items, 140, min_age_secs=600, now=now) == []
+
+
+def test_plan_skips_recently_used_items():
+    now = 1_000_000.0
+    items = [_item("fresh", 100, 60, now), _item("old", 10, 5000, now), _item("older", 10, 9000, now)]
+
+    victims = plan_eviction(items, 0, min_age_secs=600, now=now)
+
+    assert [it.path for it in victims] == ["older", "old"]
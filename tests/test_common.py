@@ -0,0 +1,63 @@
+"""Atomic artifact writes (common.atomic_output / atomic_write_text)."""
+
+import pytest
+
+from scripts.common import atomic_output, atomic_outputs, atomic_write_text
+
+
+def test_temp_then_rename(tmp_path):
+    out = tmp_path / "song.csv"
+    out.write_text("old\n", encoding="utf-8")
+
+    with atomic_output(out, keep_suffix=False) as tmp:
+        assert tmp.parent == out.parent and tmp != out
+        tmp.write_text("new\n", encoding="utf-8")
+        assert out.read_text(encoding="utf-8") == "old\n"  # readers still see the old file
+
+    assert out.read_text(encoding="utf-8") == "new\n"
+    assert [p.name for p in tmp_path.iterdir()] == ["song.csv"]
+
+
+def test_keep_suffix_puts_extension_last(tmp_path):
+    with atomic_output(tmp_path / "song.mp4") as tmp:
+        assert tmp.suffix == ".mp4" and ".tmp" in tmp.name
+        tmp.write_bytes(b"x")
+
+
+def test_failure_keeps_old_file_and_drops_temp(tmp_path):
+    out = tmp_path / "song.mp4"
+    out.write_bytes(b"old")
+
+    with pytest.raises(ValueError):
+        with atomic_output(out) as tmp:
+            tmp.write_bytes(b"half")
+            raise ValueError("tool failed")
+
+    assert out.read_bytes() == b"old"
+    assert [p.name for p in tmp_path.iterdir()] == ["song.mp4"]
+
+
+def test_missing_temp_raises_instead_of_keeping_stale_file(tmp_path):
+    out = tmp_path / "song.mp4"
+    out.write_bytes(b"old")
+
+    with pytest.raises(RuntimeError, match="was not produced"):
+        with atomic_output(out):
+            pass  # e.g. ffmpeg exited 0 without writing
+
+    assert out.read_bytes() == b"old"
+
+
+def test_atomic_outputs_passes_none_through(tmp_path):
+    a, b = tmp_path / "a.jpg", tmp_path / "b.gif"
+    with atomic_outputs([a, None, b]) as (ta, tn, tb):
+        assert tn is None
+        ta.write_bytes(b"a")
+        tb.write_bytes(b"b")
+    assert a.read_bytes() == b"a" and b.read_bytes() == b"b"
+
+
+def test_atomic_write_text(tmp_path):
+    out = tmp_path / "meta" / "song.json"
+    atomic_write_text(out, "{}\n")
+    assert out.read_text(encoding="utf-8") == "{}\n"
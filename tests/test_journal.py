@@ -0,0 +1,207 @@
+"""Per-slug locks, temp sweeping and the stage journal (scripts/journal.py)."""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from scripts import journal
+from scripts.common import Paths, temp_path_for
+from scripts.journal import SlugBusy, SlugJournal, slug_lock, slug_locked, sweep_temps
+
+ROOT = Path(__file__).resolve().parent.parent
+
+_HOLDER = """
+import sys, time
+from pathlib import Path
+from scripts.common import Paths
+from scripts.journal import slug_lock
+
+root = Path(sys.argv[1])
+with slug_lock(Paths.from_scripts_dir(root / "scripts"), "song"):
+    (root / "ready").touch()
+    while not (root / "release").exists():
+        time.sleep(0.02)
+"""
+
+_CHILD = """
+import sys
+from pathlib import Path
+from scripts import journal
+from scripts.common import Paths
+
+with journal.slug_lock(Paths.from_scripts_dir(Path(sys.argv[1]) / "scripts"), "song", wait=False):
+    print(journal.child_env()[journal.LOCKS_ENV])
+"""
+
+
+@pytest.fixture
+def paths(tmp_path, monkeypatch):
+    monkeypatch.delenv(journal.LOCKS_ENV, raising=False)
+    p = Paths.from_scripts_dir(tmp_path / "scripts")
+    p.ensure()
+    return p
+
+
+def _wait_for(path: Path, timeout: float = 10.0) -> None:
+    t0 = time.monotonic()
+    while not path.exists():
+        assert time.monotonic() - t0 < timeout, f"timed out waiting for {path}"
+        time.sleep(0.02)
+
+
+@pytest.mark.skipif(journal.fcntl is None, reason="advisory locks need fcntl")
+def test_lock_excludes_other_processes(paths):
+    env = {k: v for k, v in os.environ.items() if k != journal.LOCKS_ENV}
+    child = subprocess.Popen([sys.executable, "-c", _HOLDER, str(paths.root)], cwd=ROOT, env=env)
+    try:
+        _wait_for(paths.root / "ready")
+        assert slug_locked(paths, "song")
+        with pytest.raises(SlugBusy):
+            with slug_lock(paths, "song", wait=False):
+                pass
+        with slug_lock(paths, "other", wait=False):  # other slugs are independent
+            pass
+    finally:
+        (paths.root / "release").touch()
+        child.wait(timeout=10)
+
+    assert not slug_locked(paths, "song")
+    with slug_lock(paths, "song", wait=False):
+        with slug_lock(paths, "song", wait=False):  # re-entrant within a thread
+            assert journal.child_env()[journal.LOCKS_ENV] == "song"
+        assert slug_locked(paths, "song")
+    assert journal.LOCKS_ENV not in os.environ
+    assert journal.LOCKS_ENV not in journal.child_env()
+
+
+@pytest.mark.skipif(journal.fcntl is None, reason="advisory locks need fcntl")
+def test_lock_excludes_other_threads(paths):
+    entered, release = threading.Event(), threading.Event()
+    seen = {}
+
+    def hold():
+        with slug_lock(paths, "song"):
+            entered.set()
+            release.wait(10)
+
+    def contend():
+        try:
+            with slug_lock(paths, "song", wait=False):
+                seen["got"] = True
+        except SlugBusy:
+            seen["got"] = False
+        seen["env"] = journal.child_env().get(journal.LOCKS_ENV)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    try:
+        assert entered.wait(10)
+        other = threading.Thread(target=contend)
+        other.start()
+        other.join(10)
+        assert seen == {"got": False, "env": None}
+        assert journal.LOCKS_ENV not in os.environ
+    finally:
+        release.set()
+        holder.join(10)
+    assert not slug_locked(paths, "song")
+
+
+@pytest.mark.skipif(journal.fcntl is None, reason="advisory locks need fcntl")
+def test_child_inherits_lock_through_env(paths):
+    with slug_lock(paths, "song"):
+        # Without the handed-down slug the child would block on the lock file.
+        out = subprocess.run(
+            [sys.executable, "-c", _CHILD, str(paths.root)],
+            cwd=ROOT, env=journal.child_env(), capture_output=True, text=True, timeout=10, check=True,
+        ).stdout.split()
+    assert out == ["song"]
+
+
+def test_sweep_temps_removes_only_this_slugs_leftovers(paths):
+    stale = [
+        temp_path_for(paths.timings / "song.csv"),
+        temp_path_for(paths.output / "song.mp4", keep_suffix=True),
+        temp_path_for(paths.mixes / "song.wav", keep_suffix=True),
+    ]
+    kept = [
+        paths.timings / "song.csv",
+        temp_path_for(paths.timings / "song_two.csv"),
+        temp_path_for(paths.meta / "song.upload.json"),  # uploads write here without the lock
+    ]
+    for p in stale + kept:
+        p.write_text("x", encoding="utf-8")
+    (paths.cache / "ytdlp" / "song").mkdir(parents=True)
+
+    assert sweep_temps(paths, "song") == len(stale) + 1
+    assert not any(p.exists() for p in stale)
+    assert all(p.exists() for p in kept)
+    assert not (paths.cache / "ytdlp" / "song").exists()
+
+
+def test_lock_sweeps_leftovers(paths):
+    leftover = temp_path_for(paths.output / "song.mp4", keep_suffix=True)
+    leftover.write_bytes(b"half")
+    with slug_lock(paths, "song"):
+        assert not leftover.exists()
+
+
+def _artifact(path: Path, text: str) -> Path:
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def test_journal_resumes_after_last_committed_stage(paths):
+    mp3 = _artifact(paths.mp3s / "song.mp3", "audio")
+    wav = _artifact(paths.mixes / "song.wav", "mix")
+    j = SlugJournal.load(paths, "song")
+    j.begin("fetch")
+    assert j.commit("fetch", [mp3], {"query": "song"})
+    j.begin("mix")
+    assert j.commit("mix", [wav], {"vocals": 0})
+    j.begin("sync")  # killed here
+
+    j = SlugJournal.load(paths, "song")
+    assert j.interrupted == "sync"
+    assert j.committed("fetch", {"query": "song"})
+    assert j.committed("mix", {"vocals": 0})
+    assert not j.committed("sync")
+    assert not j.committed("mix", {"vocals": 50})  # different parameters re-run the stage
+
+
+def test_changed_output_uncommits_stage(paths):
+    wav = _artifact(paths.mixes / "song.wav", "mix")
+    j = SlugJournal.load(paths, "song")
+    j.commit("mix", [wav])
+    _artifact(wav, "a different mix")
+    assert not SlugJournal.load(paths, "song").committed("mix")
+
+
+def test_recommit_with_new_outputs_drops_later_stages(paths):
+    mp3 = _artifact(paths.mp3s / "song.mp3", "audio")
+    wav = _artifact(paths.mixes / "song.wav", "mix")
+    csv = _artifact(paths.timings / "song.csv", "rows")
+    j = SlugJournal.load(paths, "song")
+    j.commit("fetch", [mp3])
+    j.commit("mix", [wav])
+    j.commit("sync", [csv])
+
+    j.commit("mix", [wav])  # same result: downstream stays committed
+    assert j.committed("sync")
+
+    _artifact(wav, "remixed")
+    j.commit("mix", [wav])
+    assert j.committed("fetch") and j.committed("mix")
+    assert not j.committed("sync")
+    assert "sync" not in SlugJournal.load(paths, "song").data["stages"]
+
+
+def test_commit_refused_when_required_output_missing(paths):
+    j = SlugJournal.load(paths, "song")
+    assert not j.commit("render", [paths.output / "song.mp4"], required=[paths.output / "song.mp4"])
+    assert not j.committed("render")
@@ -0,0 +1,141 @@
+"""Planning helpers of scripts/render_modes.py, plus one real VFR encode when ffmpeg is present."""
+
+import shutil
+import subprocess
+
+import pytest
+
+from scripts.ass_slice import event_boundaries, seconds_to_ass_time, slice_events
+from scripts.render_modes import (
+    plan_fixed_segments,
+    plan_segments,
+    render_vfr,
+    segment_key,
+    state_boundaries,
+    write_ffconcat,
+)
+
+ASS_HEADER = """[Script Info]
+ScriptType: v4.00+
+PlayResX: 320
+PlayResY: 180
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Default,DejaVu Sans,24,&H00FFFFFF,&H00FFFFFF,&H00000000,&H00000000,0,0,0,0,100,100,0,0,1,1,0,5,10,10,10,1
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
+
+
+def _ass(events):
+    return ASS_HEADER + "".join(
+        f"Dialogue: 0,{seconds_to_ass_time(a)},{seconds_to_ass_time(b)},Default,,0,0,0,,{text}\n" for a, b, text in events
+    )
+
+
+# A minute of lyrics with the last lines close to the end, where a truncated render shows.
+EVENTS = [
+    (2.0, 9.0, "first"), (12.0, 20.0, "second"), (25.3, 31.0, "third"), (33.0, 40.0, "fourth"),
+    (44.8, 48.1, "fifth"), (48.1, 51.4, "sixth"), (51.4, 55.0, "seventh"),
+]
+
+
+def test_state_boundaries_dedupes_and_clips():
+    got = state_boundaries([5.0, 1.0004, 1.0, 0.0, -1.0, 10.0, 12.0, 3.0], 10.0)
+    assert got == [0.0, 1.0, 3.0, 5.0]
+    assert state_boundaries([], 10.0) == [0.0]
+
+
+def test_write_ffconcat_repeats_last_entry(tmp_path):
+    list_path = tmp_path / "song.ffconcat"
+    image = tmp_path / "black.png"
+
+    frames = write_ffconcat(list_path, image, [0.0, 1.5, 4.0, 4.0], 10.0)
+
+    lines = list_path.read_text(encoding="utf-8").splitlines()
+    entry = f"file '{image.as_posix()}'"
+    assert frames == 4
+    assert lines[0] == "ffconcat version 1.0"
+    assert lines[1:] == [
+        entry, "duration 1.500000",
+        entry, "duration 2.500000",
+        entry, "duration 0.001000",  # zero-length states still get a frame
+        entry, "duration 6.000000",
+        entry,  # listed again so the last duration is honoured
+    ]
+
+
+def test_plan_segments_cuts_on_snapped_boundaries():
+    plan = plan_segments([3.07, 6.11, 9.93], 12.0, 3, fps=5.0)
+    assert plan == [(0.0, 3.0), (3.0, 6.2), (6.2, 12.0)]
+    for a, b in plan:
+        assert round(a * 5) == pytest.approx(a * 5) and round(b * 5) == pytest.approx(b * 5)
+
+
+def test_plan_segments_edges():
+    assert plan_segments([3.0], 12.0, 1, fps=5.0) == [(0.0, 12.0)]
+    # No lyrics: cut on the frame grid nearest the even split; the end rounds up to a frame.
+    assert plan_segments([], 10.01, 2, fps=5.0) == [(0.0, 5.0), (5.0, 10.2)]
+    # Fewer usable boundaries than segments: duplicate cuts collapse.
+    assert plan_segments([6.0], 12.0, 4, fps=5.0) == [(0.0, 6.0), (6.0, 12.0)]
+
+
+def test_plan_fixed_segments_prefers_nearby_boundaries():
+    plan = plan_fixed_segments([18.9, 41.04, 61.0], 70.0, fps=10.0, seg_secs=20.0)
+    # 41.04 snaps to the 0.1 s frame grid; each cut moves to a boundary within seg_secs/2.
+    assert plan == [(0.0, 18.9), (18.9, 41.0), (41.0, 61.0), (61.0, 70.0)]
+    assert all(a < b for a, b in plan)
+    assert all(x[1] == y[0] for x, y in zip(plan, plan[1:]))
+
+
+def _keys(ass_text, plan, settings=("-crf", "30")):
+    return [
+        segment_key(slice_events(ass_text, a, b)[0], b - a, width=320, height=180, fps=5.0, settings=list(settings))
+        for a, b in plan
+    ]
+
+
+def test_segment_keys_only_change_where_lyrics_change():
+    ass_text = _ass(EVENTS)
+    plan = plan_fixed_segments(event_boundaries(ass_text), 60.0, fps=5.0, seg_secs=20.0)
+    assert len(plan) == 3
+    before = _keys(ass_text, plan)
+
+    edited = _ass([(a, b, "fixed typo" if text == "fifth" else text) for a, b, text in EVENTS])
+    after = _keys(edited, plan)
+
+    changed = [i for i, (x, y) in enumerate(zip(before, after)) if x != y]
+    assert changed == [next(i for i, (a, b) in enumerate(plan) if a <= 44.8 < b)]
+    assert _keys(ass_text, plan) == before
+    assert set(_keys(ass_text, plan, settings=("-crf", "26"))).isdisjoint(before)
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="needs ffmpeg with libass")
+def test_vfr_render_keeps_the_last_states(tmp_path):
+    duration = 60.0
+    ass_text = _ass(EVENTS)
+    ass_path = tmp_path / "song.ass"
+    ass_path.write_text(ass_text, encoding="utf-8")
+    audio = tmp_path / "song.wav"
+    subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi", "-i", f"sine=d={duration}", str(audio)],
+        check=True,
+    )
+    boundaries = event_boundaries(ass_text)
+    out = tmp_path / "song.mp4"
+
+    render_vfr(
+        ass_path=ass_path, audio_path=audio, out_path=out, boundaries=boundaries, duration=duration,
+        width=320, height=180, cache_dir=tmp_path / "cache", audio_args=["-c:a", "aac"],
+    )
+
+    # framemd5 rows: stream, dts, pts, duration, size, hash (pts in the 1 ms track timescale)
+    rows = subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-i", str(out), "-map", "0:v", "-c", "copy", "-f", "framemd5", "-"],
+        check=True, capture_output=True, text=True,
+    ).stdout.splitlines()
+    pts = sorted(int(r.split(",")[2]) / 1000.0 for r in rows if r and not r.startswith("#"))
+    assert len(pts) == len(state_boundaries(boundaries, duration))
+    assert pts[-1] >= max(boundaries) - 1e-3
@@ -0,0 +1,145 @@
+"""upload_resumable() against scripts/mock_youtube.py (no Google libraries needed)."""
+
+import json
+import os
+
+import pytest
+import requests
+
+from scripts import mock_youtube, resumable_upload
+from scripts.resumable_upload import CHUNK_ALIGN, state_path, upload_resumable
+
+BODY = {"snippet": {"title": "Song (Karaoke)"}, "status": {"privacyStatus": "unlisted"}}
+
+
+class RecordingSession(requests.Session):
+    """requests.Session that remembers the Content-Range of every upload PUT."""
+
+    def __init__(self):
+        super().__init__()
+        self.ranges = []
+
+    def request(self, method, url, **kw):
+        crange = (kw.get("headers") or {}).get("Content-Range", "")
+        if method == "PUT" and crange and not crange.startswith("bytes */"):
+            self.ranges.append(int(crange.split(" ", 1)[1].split("-", 1)[0]))
+        return super().request(method, url, **kw)
+
+
+class Crash(Exception):
+    pass
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(resumable_upload.time, "sleep", delays.append)
+    monkeypatch.setattr(resumable_upload.random, "uniform", lambda a, b: b)
+    return delays
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / "song.mp4"
+    path.write_bytes(os.urandom(3 * CHUNK_ALIGN + 1000))
+    return path
+
+
+def _serve(request, tmp_path, **kw):
+    srv = mock_youtube.start(tmp_path / "server", **kw)
+    request.addfinalizer(srv.shutdown)
+    return srv
+
+
+def _received(srv, video_id):
+    return (srv.state.store / f"{video_id}.mp4").read_bytes()
+
+
+def test_killed_upload_resumes_from_saved_offset(request, tmp_path, video, sleeps):
+    srv = _serve(request, tmp_path)
+    state_file = state_path(tmp_path / "meta", "song")
+
+    def crash_after_first_chunk(done, total):
+        raise Crash
+
+    with pytest.raises(Crash):
+        upload_resumable(
+            RecordingSession(), video, BODY, state_file=state_file,
+            endpoint=srv.endpoint, chunk_size=CHUNK_ALIGN, progress=crash_after_first_chunk,
+        )
+    saved = json.loads(state_file.read_text(encoding="utf-8"))
+    assert saved["offset"] == CHUNK_ALIGN
+    assert "video_id" not in saved
+
+    sess = RecordingSession()
+    video_id = upload_resumable(sess, video, BODY, state_file=state_file, endpoint=srv.endpoint, chunk_size=CHUNK_ALIGN)
+
+    assert sess.ranges[0] == saved["offset"]
+    assert sess.ranges == [CHUNK_ALIGN, 2 * CHUNK_ALIGN, 3 * CHUNK_ALIGN]
+    assert srv.state.calls["videos.insert"] == 1
+    assert _received(srv, video_id) == video.read_bytes()
+
+
+def test_dropped_chunk_resumes_at_server_offset(request, tmp_path, video, sleeps):
+    drop_after = CHUNK_ALIGN + 1000
+    srv = _serve(request, tmp_path, drop_after=drop_after)
+    sess = RecordingSession()
+
+    video_id = upload_resumable(
+        sess, video, BODY, state_file=state_path(tmp_path / "meta", "song"),
+        endpoint=srv.endpoint, chunk_size=CHUNK_ALIGN,
+    )
+
+    # The second chunk died after 1000 bytes; the retry continues from there, not from 0.
+    assert sess.ranges[:3] == [0, CHUNK_ALIGN, drop_after]
+    assert 0 not in sess.ranges[1:]
+    assert len(sleeps) == 1
+    assert _received(srv, video_id) == video.read_bytes()
+
+
+def test_503s_are_retried_with_backoff(request, tmp_path, video, sleeps, monkeypatch):
+    srv = _serve(request, tmp_path, fail_rate=1.0)
+    monkeypatch.setattr(mock_youtube.random, "random", lambda: 0.0)
+
+    def sleep(secs):
+        sleeps.append(secs)
+        if len(sleeps) == 3:
+            srv.state.fail_rate = 0.0
+
+    monkeypatch.setattr(resumable_upload.time, "sleep", sleep)
+    video_id = upload_resumable(
+        RecordingSession(), video, BODY, state_file=state_path(tmp_path / "meta", "song"),
+        endpoint=srv.endpoint, chunk_size=CHUNK_ALIGN,
+    )
+
+    base = resumable_upload.BACKOFF_BASE_SECS
+    assert sleeps == [base, 2 * base, 4 * base]
+    assert srv.state.calls["videos.insert"] == 1
+    assert _received(srv, video_id) == video.read_bytes()
+
+
+def test_503s_give_up_after_max_retries(request, tmp_path, video, sleeps, monkeypatch):
+    srv = _serve(request, tmp_path, fail_rate=1.0)
+    monkeypatch.setattr(mock_youtube.random, "random", lambda: 0.0)
+
+    with pytest.raises(resumable_upload.UploadError):
+        upload_resumable(
+            RecordingSession(), video, BODY, state_file=state_path(tmp_path / "meta", "song"),
+            endpoint=srv.endpoint, chunk_size=CHUNK_ALIGN,
+        )
+    assert len(sleeps) == resumable_upload.MAX_RETRIES
+
+
+def test_rerun_after_201_returns_stored_video_id(request, tmp_path, video, sleeps):
+    srv = _serve(request, tmp_path)
+    state_file = state_path(tmp_path / "meta", "song")
+
+    first = upload_resumable(RecordingSession(), video, BODY, state_file=state_file, endpoint=srv.endpoint, chunk_size=CHUNK_ALIGN)
+    assert json.loads(state_file.read_text(encoding="utf-8"))["video_id"] == first
+
+    sess = RecordingSession()
+    again = upload_resumable(sess, video, BODY, state_file=state_file, endpoint=srv.endpoint, chunk_size=CHUNK_ALIGN)
+
+    assert again == first
+    assert sess.ranges == []
+    assert srv.state.calls == {"videos.insert": 1}
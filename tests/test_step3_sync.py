@@ -0,0 +1,111 @@
+"""step3_sync(): VTT cue normalization and which timings files a build writes."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from scripts import step3_sync as sync
+from scripts.common import IOFlags, Paths
+
+
+@pytest.fixture
+def paths(tmp_path):
+    p = Paths.from_scripts_dir(tmp_path / "scripts")
+    p.ensure()
+    return p
+
+
+@pytest.fixture
+def aligned(monkeypatch):
+    lines = [
+        SimpleNamespace(start=1.0, text="hello darkness", words=[(1.0, "hello"), (1.4, "darkness")], confidence=0.9),
+        SimpleNamespace(start=3.0, text="my old friend", words=[(3.0, "my"), (3.2, "old"), (3.5, "friend")], confidence=0.4),
+    ]
+    monkeypatch.setattr(sync, "_align_plain_lyrics", lambda paths, slug, flags: lines)
+    return lines
+
+
+def test_align_report_written_with_csv(paths, aligned):
+    assert sync.step3_sync(paths, slug="song", flags=IOFlags()) == "align"
+
+    report = (paths.timings / "song.align.json").read_text(encoding="utf-8")
+    assert '"confidence": 0.4' in report
+    assert (paths.timings / "song.csv").exists()
+    assert (paths.timings / "song.words.csv").exists()
+
+
+def test_align_report_not_written_when_csv_kept(paths, aligned, monkeypatch):
+    csv_path = paths.timings / "song.csv"
+    csv_path.write_text("line_index,time_secs,text\n0,0.000,kept\n", encoding="utf-8")
+    # The CSV exists but the caller may rebuild; the overwrite prompt is answered "no".
+    monkeypatch.setattr(sync, "should_write", lambda path, flags, *, label: True)
+    monkeypatch.setattr(sync, "write_csv", lambda path, *a, **kw: False)
+
+    sync.step3_sync(paths, slug="song", flags=IOFlags(confirm=True))
+
+    assert not (paths.timings / "song.align.json").exists()
+    assert csv_path.read_text(encoding="utf-8").endswith("kept\n")
+
+
+# YouTube auto-captions: each phrase appears word-tagged, then untagged in a
+# ~10 ms cue, then again as the top line of the next cue.
+ROLLING_VTT = """WEBVTT
+Kind: captions
+Language: en
+
+00:00:00.320 --> 00:00:02.629 align:start position:0%
+ 
+hello<00:00:00.640><c> darkness</c><00:00:01.120><c> my</c><00:00:01.439><c> old</c><00:00:01.760><c> friend</c>
+
+00:00:02.629 --> 00:00:02.639 align:start position:0%
+hello darkness my old friend
+ 
+
+00:00:02.639 --> 00:00:05.270 align:start position:0%
+hello darkness my old friend
+I've<00:00:03.120><c> come</c><00:00:03.360><c> to</c><00:00:03.600><c> talk</c><00:00:03.920><c> with</c><00:00:04.160><c> you</c>
+
+00:00:05.270 --> 00:00:05.280 align:start position:0%
+I've come to talk with you
+ 
+
+00:00:05.280 --> 00:00:08.110 align:start position:0%
+I've come to talk with you
+again<00:00:05.920><c> hello</c><00:00:06.400><c> darkness</c>
+
+00:00:08.110 --> 00:00:08.120 align:start position:0%
+again hello darkness
+ 
+"""
+
+
+def test_rolling_auto_captions_collapse_to_one_row_per_line():
+    cues = sync.normalize_vtt_cues(ROLLING_VTT.splitlines())
+
+    assert [c.text for c in cues] == [
+        "hello darkness my old friend",
+        "I've come to talk with you",
+        "again hello darkness",  # repeats earlier words, but it is a new tagged line
+    ]
+    assert [c.start for c in cues] == pytest.approx([0.32, 2.639, 5.28])
+    expected = [
+        [(0.32, "hello"), (0.64, "darkness"), (1.12, "my"), (1.439, "old"), (1.76, "friend")],
+        [(2.639, "I've"), (3.12, "come"), (3.36, "to"), (3.6, "talk"), (3.92, "with"), (4.16, "you")],
+        [(5.28, "again"), (5.92, "hello"), (6.4, "darkness")],
+    ]
+    for cue, want in zip(cues, expected):
+        assert [w for _, w in cue.words] == [w for _, w in want]
+        assert [t for t, _ in cue.words] == pytest.approx([t for t, _ in want])
+
+
+def test_plain_vtt_keeps_one_row_per_cue():
+    vtt = """WEBVTT
+
+00:00:01.000 --> 00:00:03.000
+<i>First</i> line
+
+00:00:03.000 --> 00:00:05.000
+First line
+"""
+    cues = sync.normalize_vtt_cues(vtt.splitlines())
+    assert [(c.start, c.text, c.words) for c in cues] == [(1.0, "First line", []), (3.0, "First line", [])]
@@ -0,0 +1,69 @@
+"""Banded DTW backtracking and path -> knots on synthetic impulse trains."""
+
+import numpy as np
+import pytest
+
+from scripts.offset_xcorr import impulse_train
+from scripts.time_warp import WARP_FPS, _zscore, banded_dtw, path_to_knots
+
+
+def _line_starts(n=40, seed=3):
+    rng = np.random.default_rng(seed)
+    return list(np.cumsum(rng.uniform(2.0, 5.0, n)) + 4.0)
+
+
+def _train(starts, n):
+    return _zscore(impulse_train(starts, n, fps=WARP_FPS, sigma_secs=0.15).astype(np.float64))
+
+
+@pytest.mark.parametrize("shift", [0, 7, -4])
+def test_band_centred_on_true_shift_follows_the_diagonal(shift):
+    starts = _line_starts()
+    n = int((max(starts) + 5.0) * WARP_FPS)
+    x = _train(starts, n)
+    y = _train([t + shift / WARP_FPS for t in starts], n + abs(shift))
+
+    path = banded_dtw(x, y, center=shift, band=20)
+
+    assert path.shape == (n, 2)
+    assert list(path[:, 0]) == list(range(n))
+    # From the first to the last lyric line the path is exactly j = i + shift
+    # (before/after that both trains are flat, so any route costs the same).
+    first, last = (int(round(t * WARP_FPS)) for t in (min(starts), max(starts)))
+    inner = path[first:last + 1]
+    assert np.all(inner[:, 1] - inner[:, 0] == shift)
+
+
+def test_band_off_centre_still_finds_the_shift():
+    starts = _line_starts()
+    n = int((max(starts) + 5.0) * WARP_FPS)
+    x = _train(starts, n)
+    y = _train([t + 1.0 for t in starts], n + 10)
+
+    path = banded_dtw(x, y, center=4, band=20)  # band centred 0.6 s off the truth
+    rows = np.rint(np.asarray(starts) * WARP_FPS).astype(np.int64)
+    assert np.all(path[rows, 1] - path[rows, 0] == 10)
+
+
+def test_stretched_train_gives_growing_knot_delta():
+    starts = _line_starts()
+    stretch = 1.02
+    n = int((max(starts) * stretch + 5.0) * WARP_FPS)
+    x = _train(starts, n)
+    y = _train([t * stretch for t in starts], n)
+
+    path = banded_dtw(x, y, center=0, band=int(8.0 * WARP_FPS))
+    knots = path_to_knots(path, starts)
+
+    deltas = [d - s for s, d in knots]
+    assert len(knots) >= 2
+    assert all(b >= a for a, b in zip(deltas, deltas[1:]))
+    assert deltas[-1] > deltas[0]
+    assert deltas[-1] == pytest.approx(max(starts) * (stretch - 1.0), abs=0.25)
+    for s, d in knots:
+        assert d == pytest.approx(s * stretch, abs=0.25)
+
+
+def test_path_to_knots_empty():
+    assert path_to_knots(np.zeros((0, 2), dtype=np.int64), [1.0, 2.0]) == []
+    assert path_to_knots(np.array([[0, 0]]), []) == []
@@ -0,0 +1,118 @@
+"""Timeline lookups, offset/warp views, TimeMap and the parse cache."""
+
+from collections import OrderedDict
+
+import pytest
+
+from scripts import timeline
+from scripts.timeline import TimeMap, load_timeline, timeline_from_rows
+
+ROWS = [(3.0, "second", 1), (1.0, "first", 0), (5.0, "", 2)]
+
+
+@pytest.fixture
+def tl():
+    return timeline_from_rows(ROWS)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(timeline, "_CACHE", OrderedDict())
+
+
+def test_rows_sorted_with_open_last_end(tl):
+    assert list(tl.starts) == [1.0, 3.0, 5.0]
+    assert list(tl.ends) == [3.0, 5.0, float("inf")]
+    assert list(tl.rows(nonempty=True)) == [(1.0, "first", 0), (3.0, "second", 1)]
+
+
+@pytest.mark.parametrize(
+    "t, want",
+    [(0.0, None), (0.999, None), (1.0, 0), (2.999, 0), (3.0, 1), (4.999, 1), (5.0, 2), (1e9, 2)],
+)
+def test_index_at_boundaries(tl, t, want):
+    assert tl.index_at(t) == want
+
+
+def test_text_at(tl):
+    assert tl.text_at(0.5) == ""
+    assert tl.text_at(3.2) == "second"
+
+
+def test_shifted_view_shares_arrays(tl):
+    late = tl.shifted(0.5).shifted(0.25)
+    assert late.starts is tl.starts and late.texts is tl.texts
+    assert late.offset == 0.75
+    assert late.start(0) == 1.75 and late.end(0) == 3.75
+    assert late.index_at(1.7) is None and late.index_at(1.75) == 0
+    assert tl.start(0) == 1.0  # the original is untouched
+    assert late.first_start(nonempty=True) == 1.75
+
+
+def test_warped_view_applies_map_before_offset(tl):
+    tm = TimeMap(src=(0.0, 10.0), dst=(1.0, 12.0))  # +1 s at 0, +2 s at 10
+    view = tl.warped(tm).shifted(-1.0)
+    assert view.starts is tl.starts
+    assert view.start(1) == pytest.approx(tm(3.0) - 1.0)
+    assert [round(t, 6) for t, _, _ in view.rows()] == [round(tm(t) - 1.0, 6) for t in (1.0, 3.0, 5.0)]
+    for i in range(len(view)):
+        s = view.start(i)
+        assert view.index_at(s) == i
+        assert view.index_at(s - 1e-6) == (i - 1 if i else None)
+    assert tl.time_map is None
+
+
+def test_time_map_forward_and_inverse_round_trip():
+    tm = TimeMap(src=(10.0, 20.0, 40.0), dst=(10.5, 21.0, 41.5))
+    assert tm(15.0) == pytest.approx(15.75)
+    # Outside the knots the first/last delta is kept.
+    assert tm(0.0) == pytest.approx(0.5)
+    assert tm(100.0) == pytest.approx(101.5)
+    assert tm.inverse(101.5) == pytest.approx(100.0)
+    for t in (-30.0, 0.0, 10.0, 12.3, 20.0, 33.3, 40.0, 95.0):
+        assert tm.inverse(tm(t)) == pytest.approx(t)
+        assert tm(tm.inverse(t)) == pytest.approx(t)
+
+
+def test_empty_time_map_is_identity():
+    tm = TimeMap(src=(), dst=())
+    assert tm(7.5) == 7.5 and tm.inverse(7.5) == 7.5
+
+
+def test_load_timeline_caches_by_content(tmp_path):
+    csv_path = tmp_path / "song.csv"
+    csv_path.write_text("line_index,time_secs,text\n0,1.000,hello\n", encoding="utf-8")
+    first = load_timeline(csv_path)
+    assert load_timeline(csv_path) is first
+
+    csv_path.write_text("line_index,time_secs,text\n0,2.000,hello\n", encoding="utf-8")
+    edited = load_timeline(csv_path)
+    assert edited is not first and edited.start(0) == 2.0
+
+
+def test_load_timeline_applies_warp_file(tmp_path):
+    csv_path = tmp_path / "song.csv"
+    csv_path.write_text("1.000,hello\n5.000,world\n", encoding="utf-8")  # 2-column fallback
+    (tmp_path / "song.warp.json").write_text('{"knots": [[0, 0.5], [10, 11.5]]}', encoding="utf-8")
+
+    assert load_timeline(csv_path).time_map is None
+    warped = load_timeline(csv_path, warp=True)
+    assert warped.start(0) == pytest.approx(1.6)
+    assert warped.starts is load_timeline(csv_path).starts
+
+
+def test_cache_is_bounded_lru(tmp_path):
+    paths = []
+    for i in range(timeline.CACHE_MAX + 3):
+        p = tmp_path / f"song_{i}.csv"
+        p.write_text(f"line_index,time_secs,text\n0,{i}.000,line\n", encoding="utf-8")
+        paths.append(p)
+
+    keep = load_timeline(paths[0])
+    for p in paths[1:]:
+        load_timeline(p)
+        assert load_timeline(paths[0]) is keep  # recently used, never evicted
+
+    assert len(timeline._CACHE) == timeline.CACHE_MAX
+    assert keep.digest in timeline._CACHE
+    assert load_timeline(paths[1]).digest in timeline._CACHE
@@ -0,0 +1,42 @@
+"""transcribe_windows() against a fake batched pipeline (no faster-whisper needed)."""
+
+from types import SimpleNamespace
+
+import numpy as np
+
+from scripts import whisper_pool
+from scripts.whisper_pool import SR, transcribe_windows
+
+
+class FakePipe:
+    """Mimics BatchedInferencePipeline: clips are sample indices, segment times absolute seconds."""
+
+    def __init__(self):
+        self.clips = None
+
+    def transcribe(self, audio, *, clip_timestamps, **kwargs):
+        self.clips = clip_timestamps
+        segments = []
+        for clip in clip_timestamps:
+            assert isinstance(clip["start"], int) and isinstance(clip["end"], int)
+            chunk = audio[clip["start"]:clip["end"]]  # what vad.collect_chunks does
+            assert len(chunk) == clip["end"] - clip["start"]
+            t = clip["start"] / SR + 0.5
+            word = SimpleNamespace(word=" hi", start=t, end=t + 0.25, probability=0.9)
+            segments.append(SimpleNamespace(start=t, end=t + 0.25, words=[word]))
+        return iter(segments), None
+
+
+def test_batched_clips_are_integer_samples(monkeypatch):
+    pipe = FakePipe()
+    monkeypatch.setattr(whisper_pool, "_entry", lambda *a: (None, pipe))
+    audio = np.zeros(SR * 60, dtype=np.float32)
+
+    out = transcribe_windows(audio, [(1.5, 4.0), (3.0, 6.25), (40.0, 45.0)], model_size="tiny")
+
+    assert pipe.clips == [
+        {"start": int(1.5 * SR), "end": int(6.25 * SR)},
+        {"start": int(40.0 * SR), "end": int(45.0 * SR)},
+    ]
+    # Absolute segment times land in the right input windows.
+    assert [[w[0] for w in ws] for ws in out] == [[2.0], [], [40.5]]